@@ -1,4 +1,5 @@
 import os
+import re
 import uuid
 import base64
 import json
@@ -9,13 +10,27 @@ import boto3
 # Example: 'my_tasks.process_s3_object'
 CELERY_TASK_NAME = os.environ.get("CELERY_TASK_NAME")
 FUNCTION_NAME = os.environ.get("FUNCTION_NAME")
+# The Celery queue, or the asyncio worker's own queue (its ASYNC_SQS_QUEUE)
+# where that worker ingests the uploads.
 QUEUE_URL = os.environ.get("QUEUE_URL")
 QUEUE_NAME = os.environ.get("QUEUE_NAME")
 
+# SQS accepts at most 10 entries per send_message_batch call.
+SQS_BATCH_SIZE = 10
+
+# Upload keys are "<prefix>/<doc id>-<file name>", see create_upload_session.
+KEY_PATTERN = re.compile(
+    r"^(?:docs|temp)/([0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})-"
+)
+
 s3 = boto3.client("s3")
 sqs = boto3.client("sqs")
 
 
+class DispatchError(Exception):
+    """Raised when tasks could not be queued for some uploaded objects."""
+
+
 def create_celery_message(
     task_name,
     queue_name=QUEUE_NAME,
@@ -81,55 +96,95 @@ def create_celery_message(
     return message
 
 
+def get_doc_id(bucket, key):
+    """
+    Return the document id of an uploaded object.
+
+    The id is read from the object key, so most uploads need no S3 request;
+    keys that don't carry it fall back to the object's 'doc-id' metadata.
+    Uploads that replace an ingested document (see the server's
+    /document/replace route) need no marker: the worker re-ingests a
+    document it has already stored.
+    """
+    match = KEY_PATTERN.match(key)
+    if match:
+        return match.group(1)
+
+    response_head = s3.head_object(Bucket=bucket, Key=key)
+    return response_head.get("Metadata", {}).get("doc-id")
+
+
+def send_tasks(tasks):
+    """
+    Send (doc_id, key) tasks to the Celery queue in batches.
+    Returns the keys whose message could not be sent.
+    """
+    failed = []
+
+    for start in range(0, len(tasks), SQS_BATCH_SIZE):
+        batch = tasks[start : start + SQS_BATCH_SIZE]
+        entries = []
+        for index, (doc_id, key) in enumerate(batch):
+            message = create_celery_message(
+                task_name=CELERY_TASK_NAME, doc_id=doc_id, key=key
+            )
+            encoded_message = base64.b64encode(
+                json.dumps(message).encode("utf-8")
+            ).decode("utf-8")
+            entries.append({"Id": str(index), "MessageBody": encoded_message})
+
+        response = sqs.send_message_batch(QueueUrl=QUEUE_URL, Entries=entries)
+
+        for failure in response.get("Failed", []):
+            doc_id, key = batch[int(failure["Id"])]
+            print(f"Failed to send task for {key}: {failure.get('Message')}")
+            failed.append(key)
+
+    return failed
+
+
 def lambda_handler(event, context):
     """
-    This function is triggered by an S3 event. It extracts the object key
-    and a 'doc-id' from the object's metadata, then dispatches a Celery task
-    using IAM authentication.
+    This function is triggered by S3 events. For every record it takes the
+    object key and the doc id encoded in it (or the object's 'doc-id'
+    metadata), then dispatches the Celery tasks in batches.
+
+    S3 invokes the function asynchronously and ignores its return value, so
+    any failure to queue a task is raised: Lambda then retries the whole
+    event and finally hands it to the function's failure destination.
+    Retries may queue a document twice, which the worker tolerates since
+    vector ids are derived from the doc id.
     """
     try:
-        bucket = event["Records"][0]["s3"]["bucket"]["name"]
-        key = urllib.parse.unquote_plus(
-            event["Records"][0]["s3"]["object"]["key"], encoding="utf-8"
-        )
-        print(f"Processing object: s3://{bucket}/{key}")
-
-        response_head = s3.head_object(Bucket=bucket, Key=key)
-        metadata = response_head.get("Metadata", {})
-        doc_id = metadata.get("doc-id")
-
-        if not doc_id:
-            print(f"Error: 'doc-id' not found in metadata for object {key}. Aborting.")
-            # Return a success status to S3 to prevent retries for this known issue.
-            return {
-                "statusCode": 200,
-                "body": json.dumps("Missing doc-id in metadata."),
-            }
-
-        message = create_celery_message(
-            task_name=CELERY_TASK_NAME, doc_id=doc_id, key=key
-        )
-        encoded_message = base64.b64encode(json.dumps(message).encode("utf-8")).decode(
-            "utf-8"
-        )
-
-        print(
-            f"Sending task to Celery. Task: {CELERY_TASK_NAME}, Key: {key}, Doc ID: {doc_id}"
-        )
-
-        sqs.send_message(
-            QueueUrl=QUEUE_URL,
-            MessageBody=encoded_message,
-        )
-
-        print("Task sent successfully.")
+        tasks = []
+
+        for record in event.get("Records", []):
+            bucket = record["s3"]["bucket"]["name"]
+            key = urllib.parse.unquote_plus(
+                record["s3"]["object"]["key"], encoding="utf-8"
+            )
+            print(f"Processing object: s3://{bucket}/{key}")
+
+            doc_id = get_doc_id(bucket, key)
+            if not doc_id:
+                # Skipped rather than failed: retrying won't make the id appear.
+                print(f"Error: no doc id for object {key}. Skipping.")
+                continue
+
+            tasks.append((doc_id, key))
+
+        print(f"Sending {len(tasks)} tasks to Celery. Task: {CELERY_TASK_NAME}")
+        failed = send_tasks(tasks)
+
+        if failed:
+            raise DispatchError(f"Failed to dispatch tasks for: {failed}")
+
+        print("Tasks sent successfully.")
         return {
             "statusCode": 200,
-            "body": json.dumps(f"Successfully dispatched task for doc_id: {doc_id}"),
+            "body": json.dumps(f"Successfully dispatched {len(tasks)} tasks."),
         }
 
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
-        # Return an error to signal that the invocation failed.
-        # S3 may retry invoking the function based on your configuration.
-        return {"statusCode": 500, "body": json.dumps("An internal error occurred.")}
+        raise
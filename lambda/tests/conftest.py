@@ -0,0 +1,15 @@
+"""
+Run with `python -m pytest lambda/tests` from the repository root, with
+boto3, moto and pytest installed. AWS is replaced by moto.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "call_pdf_processor"))
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "test")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "test")
+os.environ.setdefault("CELERY_TASK_NAME", "app.tasks.process_pdf.process_pdf")
+os.environ.setdefault("QUEUE_NAME", "tasks")
@@ -0,0 +1,175 @@
+import json
+import uuid
+import base64
+import boto3
+import pytest
+from botocore.exceptions import ClientError
+from moto import mock_aws
+import lambda_function
+
+BUCKET = "uploads"
+DOC_ID = "0b5e7c9a-1f2d-4c3b-8a9e-5d6f7a8b9c0d"
+
+
+@pytest.fixture
+def aws(monkeypatch):
+    with mock_aws():
+        s3 = boto3.client("s3")
+        sqs = boto3.client("sqs")
+        s3.create_bucket(Bucket=BUCKET)
+        queue_url = sqs.create_queue(QueueName="tasks")["QueueUrl"]
+
+        monkeypatch.setattr(lambda_function, "s3", s3)
+        monkeypatch.setattr(lambda_function, "sqs", sqs)
+        monkeypatch.setattr(lambda_function, "QUEUE_URL", queue_url)
+        yield s3, sqs, queue_url
+
+
+def s3_event(*keys):
+    return {
+        "Records": [
+            {"s3": {"bucket": {"name": BUCKET}, "object": {"key": key}}} for key in keys
+        ]
+    }
+
+
+def received_tasks(sqs, queue_url):
+    """
+    (task name, kwargs) of every message on the queue.
+    """
+    tasks = []
+    while True:
+        messages = sqs.receive_message(QueueUrl=queue_url, MaxNumberOfMessages=10).get(
+            "Messages", []
+        )
+        if not messages:
+            return tasks
+        for message in messages:
+            envelope = json.loads(base64.b64decode(message["Body"]))
+            _, kwargs, _ = json.loads(base64.b64decode(envelope["body"]))
+            tasks.append((envelope["headers"]["task"], kwargs))
+            sqs.delete_message(
+                QueueUrl=queue_url, ReceiptHandle=message["ReceiptHandle"]
+            )
+
+
+class CountingHeads:
+    """
+    Wraps the S3 client, recording the key of every HEAD request.
+    """
+
+    def __init__(self, s3):
+        self.s3 = s3
+        self.heads = []
+
+    def head_object(self, Bucket, Key):
+        self.heads.append(Key)
+        return self.s3.head_object(Bucket=Bucket, Key=Key)
+
+
+def test_doc_id_is_read_from_the_key(aws, monkeypatch):
+    s3, sqs, queue_url = aws
+    key = f"docs/{DOC_ID}-report.pdf"
+    s3.put_object(Bucket=BUCKET, Key=key, Body=b"%PDF")
+    client = CountingHeads(s3)
+    monkeypatch.setattr(lambda_function, "s3", client)
+
+    lambda_function.lambda_handler(s3_event(key), None)
+
+    # Replacements are uploaded over the same key and sent the same way: the
+    # worker re-ingests a document it has already stored.
+    assert received_tasks(sqs, queue_url) == [
+        (lambda_function.CELERY_TASK_NAME, {"doc_id": DOC_ID, "key": key})
+    ]
+    assert client.heads == []
+
+
+def test_doc_id_falls_back_to_metadata(aws, monkeypatch):
+    s3, sqs, queue_url = aws
+    s3.put_object(
+        Bucket=BUCKET, Key="docs/report.pdf", Body=b"%PDF", Metadata={"doc-id": DOC_ID}
+    )
+    client = CountingHeads(s3)
+    monkeypatch.setattr(lambda_function, "s3", client)
+
+    lambda_function.lambda_handler(s3_event("docs/report.pdf"), None)
+
+    assert [kwargs["doc_id"] for _, kwargs in received_tasks(sqs, queue_url)] == [
+        DOC_ID
+    ]
+    assert client.heads == ["docs/report.pdf"]
+
+
+class FailingEntries:
+    """
+    Wraps the SQS client, reporting the entries with the given ids of every
+    batch as failed instead of sending them.
+    """
+
+    def __init__(self, sqs, failed_ids):
+        self.sqs = sqs
+        self.failed_ids = failed_ids
+        self.batch_sizes = []
+
+    def send_message_batch(self, QueueUrl, Entries):
+        self.batch_sizes.append(len(Entries))
+        sent = [entry for entry in Entries if entry["Id"] not in self.failed_ids]
+        response = self.sqs.send_message_batch(QueueUrl=QueueUrl, Entries=sent)
+        response["Failed"] = [
+            {"Id": entry["Id"], "Message": "Throttled"}
+            for entry in Entries
+            if entry["Id"] in self.failed_ids
+        ]
+        return response
+
+
+def upload(s3, count):
+    keys = [f"docs/{uuid.UUID(int=index)}-file.pdf" for index in range(count)]
+    for key in keys:
+        s3.put_object(Bucket=BUCKET, Key=key, Body=b"%PDF")
+    return keys
+
+
+def test_tasks_are_sent_in_batches(aws, monkeypatch):
+    s3, sqs, queue_url = aws
+    keys = upload(s3, 23)
+    client = FailingEntries(sqs, failed_ids=set())
+    monkeypatch.setattr(lambda_function, "sqs", client)
+
+    response = lambda_function.lambda_handler(s3_event(*keys), None)
+
+    assert response["statusCode"] == 200
+    assert client.batch_sizes == [10, 10, 3]
+    assert sorted(kwargs["key"] for _, kwargs in received_tasks(sqs, queue_url)) == (
+        sorted(keys)
+    )
+
+
+def test_partial_batch_failure_raises(aws, monkeypatch):
+    s3, sqs, queue_url = aws
+    keys = upload(s3, 3)
+    monkeypatch.setattr(lambda_function, "sqs", FailingEntries(sqs, failed_ids={"1"}))
+
+    with pytest.raises(lambda_function.DispatchError, match=keys[1]):
+        lambda_function.lambda_handler(s3_event(*keys), None)
+
+    assert len(received_tasks(sqs, queue_url)) == 2
+
+
+def test_send_error_raises(aws, monkeypatch):
+    s3, sqs, queue_url = aws
+    keys = upload(s3, 1)
+    monkeypatch.setattr(lambda_function, "QUEUE_URL", queue_url + "-missing")
+
+    with pytest.raises(ClientError):
+        lambda_function.lambda_handler(s3_event(*keys), None)
+
+
+def test_objects_without_doc_id_are_skipped(aws):
+    s3, sqs, queue_url = aws
+    s3.put_object(Bucket=BUCKET, Key="docs/untagged.pdf", Body=b"%PDF")
+
+    response = lambda_function.lambda_handler(s3_event("docs/untagged.pdf"), None)
+
+    assert response["statusCode"] == 200
+    assert received_tasks(sqs, queue_url) == []
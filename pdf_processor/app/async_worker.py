@@ -0,0 +1,518 @@
+"""
+asyncio ingestion worker, an alternative to the Celery prefork worker.
+
+It consumes the `process_pdf` messages the upload Lambda sends to its own
+queue, ASYNC_SQS_QUEUE, and runs the same steps as the task, but pipelines
+them: several documents are in flight at once, and within a document
+extraction/chunking, embedding and upserting run as concurrent stages
+connected by small queues. While one document downloads, another is encoded
+and a third is written to Chroma. Documents are not split into page ranges.
+
+The event loop only coordinates. Blocking S3, SQS and Chroma calls run in an
+I/O thread pool, chunking in a pool bounded by the number of documents in
+flight (extraction itself still uses the extraction process pool), and
+encoding in a small embedding pool that shares the micro-batcher.
+
+    python -m app.async_worker
+"""
+
+import copy
+import json
+import base64
+import signal
+import asyncio
+import logging
+import binascii
+import threading
+from contextlib import ExitStack, contextmanager
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Any, Callable, Iterator, Optional, TypeVar
+import boto3
+from app.config import get_settings
+from app.document_processing.chunker import Chunker, build_chunker
+from app.document_processing.document_loader import count_pages, get_content_hash
+from app.exceptions import DocumentLoadError
+from app.metrics import IngestMetrics, start_metrics_server
+from app.models.registry import get_embedder, get_embedding_service, warm_embedder
+from app.queue.progress import ProgressReporter
+from app.queue.sqs import flush_status_messages
+from app.startup import mark_not_ready, mark_ready, warm_up
+from app.store.s3 import get_s3_client
+from app.store.spool import IngestSpool
+from app.store.vector_store import get_vector_store
+from app.tasks.process_pdf import (
+    TRANSIENT_ERRORS,
+    discard_spool,
+    document_chunks,
+    download_unless_spooled,
+    extraction_limits,
+    failure_reason,
+    open_spool,
+    process_pdf,
+    register_content,
+    reingest_document,
+    replaces_stored_document,
+    retry_countdown,
+    reuse_duplicate,
+    send_status_update,
+)
+
+T = TypeVar("T")
+
+# Batches buffered between two pipeline stages of one document.
+STAGE_QUEUE_SIZE = 2
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+
+def decode_task(body: str) -> tuple[str, list[Any], dict[str, Any]]:
+    """
+    Return (task name, args, kwargs) of a Celery protocol 2 message as sent
+    by kombu's SQS transport or the upload Lambda: a base64-encoded JSON
+    envelope whose body is the JSON [args, kwargs, embed] list.
+    """
+    try:
+        envelope = json.loads(base64.b64decode(body, validate=True))
+    except (binascii.Error, ValueError):
+        envelope = json.loads(body)
+
+    payload = envelope["body"]
+    if envelope.get("properties", {}).get("body_encoding") == "base64":
+        payload = base64.b64decode(payload)
+    args, kwargs, _ = json.loads(payload)
+
+    return envelope["headers"]["task"], args, kwargs
+
+
+def process_pdf_arguments(doc_id, key, reingest=False) -> tuple[str, str, bool]:
+    return doc_id, key, reingest
+
+
+class AsyncIngestWorker:
+    """
+    Receives `process_pdf` messages and ingests up to `max_documents` of
+    them concurrently.
+
+    A message is deleted once its document succeeded or finally failed. On
+    a transient error it is left on the queue and made visible again after
+    the retry backoff, so the next attempt resumes from the spool, just like
+    a Celery retry; its receive count stands in for the retry count.
+    """
+
+    def __init__(
+        self,
+        queue_url: str,
+        max_documents: int,
+        max_downloads: int,
+        embed_threads: int,
+        io_threads: int,
+        visibility_timeout: int,
+    ):
+        self.queue_url = queue_url
+        self.max_documents = max(1, max_documents)
+        self.visibility_timeout = visibility_timeout
+
+        self.io_pool = ThreadPoolExecutor(io_threads, thread_name_prefix="ingest-io")
+        self.chunk_pool = ThreadPoolExecutor(
+            self.max_documents, thread_name_prefix="ingest-chunk"
+        )
+        self.embed_pool = ThreadPoolExecutor(
+            max(1, embed_threads), thread_name_prefix="ingest-embed"
+        )
+
+        self.documents = asyncio.Semaphore(self.max_documents)
+        self.downloads = asyncio.Semaphore(max(1, max_downloads))
+        self.stopping = asyncio.Event()
+        self.in_flight: set[asyncio.Task] = set()
+        self._chunkers: list[Chunker] = []
+        self._chunkers_lock = threading.Lock()
+
+    async def _run(self, pool: ThreadPoolExecutor, func: Callable[..., T], *args) -> T:
+        return await asyncio.get_running_loop().run_in_executor(pool, func, *args)
+
+    async def io(self, func: Callable[..., T], *args) -> T:
+        return await self._run(self.io_pool, func, *args)
+
+    @contextmanager
+    def borrow_chunker(self) -> Iterator[Chunker]:
+        """
+        Lend a chunker to one document at a time.
+
+        The embedder's tokenizer is used by encode calls in other threads, and
+        Rust tokenizers fail on concurrent use with different truncation
+        settings, so every chunker works on its own copy of the tokenizer.
+        """
+        with self._chunkers_lock:
+            chunker = self._chunkers.pop() if self._chunkers else None
+
+        if chunker is None:
+            embedder = get_embedder()
+            chunker = build_chunker(
+                settings.CHUNKER,
+                embedder=SimpleNamespace(
+                    tokenizer=copy.deepcopy(embedder.tokenizer),
+                    max_seq_length=embedder.max_seq_length,
+                ),
+                max_tokens=settings.CHUNK_MAX_TOKENS,
+                overlap_tokens=settings.CHUNK_OVERLAP_TOKENS,
+            )
+
+        try:
+            yield chunker
+        finally:
+            with self._chunkers_lock:
+                self._chunkers.append(chunker)
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self.stopping.set)
+
+        sqs = get_sqs_client()
+        logger.info(
+            f"Async worker consuming {self.queue_url} with up to "
+            f"{self.max_documents} documents in flight"
+        )
+
+        while not self.stopping.is_set():
+            await self.documents.acquire()
+            if self.stopping.is_set():
+                self.documents.release()
+                break
+
+            # Ask for as many messages as there are free document slots.
+            free = 1
+            while free < 10 and not self.documents.locked():
+                await self.documents.acquire()
+                free += 1
+
+            try:
+                response = await self.io(
+                    lambda: sqs.receive_message(
+                        QueueUrl=self.queue_url,
+                        MaxNumberOfMessages=free,
+                        WaitTimeSeconds=20,
+                        VisibilityTimeout=self.visibility_timeout,
+                        MessageSystemAttributeNames=["ApproximateReceiveCount"],
+                    )
+                )
+                messages = response.get("Messages", [])
+            except Exception as e:
+                logger.error(f"Failed to receive messages: {e}")
+                messages = []
+                await asyncio.sleep(1)
+
+            for _ in range(free - len(messages)):
+                self.documents.release()
+
+            for message in messages:
+                task = asyncio.create_task(self.handle(sqs, message))
+                self.in_flight.add(task)
+                task.add_done_callback(self.in_flight.discard)
+
+        logger.info(f"Stopping; waiting for {len(self.in_flight)} documents")
+        await asyncio.gather(*self.in_flight, return_exceptions=True)
+        await self.io(flush_status_messages)
+
+        for pool in (self.chunk_pool, self.embed_pool, self.io_pool):
+            pool.shutdown(wait=True)
+
+    async def handle(self, sqs, message: dict[str, Any]) -> None:
+        receipt = message["ReceiptHandle"]
+        heartbeat = asyncio.create_task(self.keep_invisible(sqs, receipt))
+
+        try:
+            try:
+                name, args, kwargs = decode_task(message["Body"])
+            except (KeyError, ValueError, TypeError) as e:
+                logger.error(f"Dropping undecodable message: {e}")
+                await self.io(self._delete, sqs, receipt)
+                return
+
+            receives = int(
+                message.get("Attributes", {}).get("ApproximateReceiveCount", 1)
+            )
+            if name != process_pdf.name:
+                # Only the Celery worker runs other tasks, and they are never
+                # sent to this queue: the message is left to the queue's
+                # redrive policy.
+                logger.error(f"Not handling misrouted {name} message")
+                return
+
+            doc_id, key, reingest = process_pdf_arguments(*args, **kwargs)
+            retries = receives - 1
+
+            retry = await self.process_document(doc_id, key, reingest, retries)
+            if retry:
+                await self.io(
+                    self._change_visibility, sqs, receipt, retry_countdown(retries)
+                )
+            else:
+                await self.io(self._delete, sqs, receipt)
+
+        except Exception as e:
+            # The message becomes visible again after its visibility timeout.
+            logger.exception(f"Failed to handle message: {e}")
+
+        finally:
+            heartbeat.cancel()
+            self.documents.release()
+
+    async def keep_invisible(self, sqs, receipt: str) -> None:
+        """
+        Extend the visibility timeout while a document is processed, so a
+        long document isn't handed to another consumer.
+        """
+        while True:
+            await asyncio.sleep(self.visibility_timeout / 2)
+            try:
+                await self.io(
+                    self._change_visibility, sqs, receipt, self.visibility_timeout
+                )
+            except Exception as e:
+                logger.warning(f"Failed to extend message visibility: {e}")
+
+    def _delete(self, sqs, receipt: str) -> None:
+        sqs.delete_message(QueueUrl=self.queue_url, ReceiptHandle=receipt)
+
+    def _change_visibility(self, sqs, receipt: str, timeout: int) -> None:
+        sqs.change_message_visibility(
+            QueueUrl=self.queue_url, ReceiptHandle=receipt, VisibilityTimeout=timeout
+        )
+
+    async def process_document(
+        self, doc_id: str, key: str, reingest: bool, retries: int
+    ) -> bool:
+        """
+        Ingest one document like `process_pdf` does, without splitting it.
+        Returns True if it should be retried.
+        """
+        metrics = IngestMetrics()
+        progress = ProgressReporter(doc_id, settings.PROGRESS_INTERVAL_MS / 1000)
+        spool = None if reingest else await self.io(open_spool, doc_id, key)
+
+        try:
+            reingest = reingest or await self.io(
+                replaces_stored_document, doc_id, spool
+            )
+
+            content_hash = None
+            with metrics.stage("dedup"):
+                if settings.DEDUPLICATE_DOCUMENTS:
+                    content_hash = await self.io(
+                        get_content_hash, settings.BUCKET_NAME, key, get_s3_client()
+                    )
+                reused = (
+                    not reingest
+                    and content_hash is not None
+                    and await self.io(reuse_duplicate, doc_id, content_hash)
+                )
+
+            if reused:
+                await self.io(send_status_update, doc_id, "success", None, metrics)
+                return False
+
+            with ExitStack() as stack:
+                chunker = stack.enter_context(self.borrow_chunker())
+                async with self.downloads:
+                    pdf_file = await self.io(
+                        download_unless_spooled, stack, key, metrics, spool
+                    )
+
+                if reingest:
+                    page_count = await self.io(
+                        count_pages,
+                        pdf_file,
+                        extraction_limits,
+                        settings.EXTRACT_WORKERS,
+                    )
+                    await self.io(progress.start, page_count)
+                    await self._run(
+                        self.chunk_pool,
+                        reingest_document,
+                        doc_id,
+                        pdf_file,
+                        metrics,
+                        progress,
+                        chunker,
+                    )
+                else:
+                    if pdf_file is None:
+                        page_count = spool.page_count
+                    else:
+                        page_count = await self.io(
+                            count_pages,
+                            pdf_file,
+                            extraction_limits,
+                            settings.EXTRACT_WORKERS,
+                        )
+                        if spool is not None:
+                            await self.io(setattr, spool, "page_count", page_count)
+                    await self.io(progress.start, page_count)
+                    await self.ingest_pipelined(
+                        doc_id, pdf_file, metrics, progress, spool, chunker
+                    )
+
+            if content_hash:
+                await self.io(register_content, doc_id, content_hash)
+
+            await self.io(discard_spool, spool)
+            await self.io(send_status_update, doc_id, "success", None, metrics)
+            return False
+
+        except Exception as e:
+            if (
+                isinstance(e, TRANSIENT_ERRORS)
+                and retries < settings.INGEST_MAX_RETRIES
+            ):
+                logger.warning(
+                    f"Retrying {doc_id} after transient error "
+                    f"({retries + 1}/{settings.INGEST_MAX_RETRIES}): {e}"
+                )
+                return True
+
+            await self.io(discard_spool, spool)
+            await self.io(
+                send_status_update, doc_id, "failed", failure_reason(e), metrics
+            )
+            return False
+
+    async def ingest_pipelined(
+        self,
+        doc_id: str,
+        pdf_file: Optional[IO[bytes]],
+        metrics: IngestMetrics,
+        progress: ProgressReporter,
+        spool: Optional[IngestSpool],
+        chunker: Chunker,
+    ) -> int:
+        """
+        `ingest_document_streaming` as three concurrent stages: producing
+        chunk batches, embedding them and upserting them. Each stage keeps
+        its own IngestMetrics, merged into `metrics` at the end, so stage
+        times add up to more than the wall time when stages overlap.
+        """
+        chunk_metrics = IngestMetrics()
+        embed_metrics = IngestMetrics()
+        upsert_metrics = IngestMetrics()
+        embedding_service = get_embedding_service(concurrent=True)
+        vector_store = get_vector_store()
+
+        to_embed: asyncio.Queue = asyncio.Queue(STAGE_QUEUE_SIZE)
+        to_upsert: asyncio.Queue = asyncio.Queue(STAGE_QUEUE_SIZE)
+
+        def open_batches():
+            return document_chunks(
+                pdf_file, doc_id, chunk_metrics, spool=spool, chunker=chunker
+            )
+
+        def embed(texts: list[str]):
+            with embed_metrics.stage("embed"):
+                return embedding_service.embed(texts)
+
+        def upsert(batch, embeddings) -> None:
+            with upsert_metrics.stage("upsert"):
+                vector_store.add_embeddings(batch, embeddings)
+
+        async def produce() -> None:
+            batches = await self._run(self.chunk_pool, open_batches)
+            index = 0
+            while True:
+                item = await self._run(self.chunk_pool, next, batches, None)
+                if item is None:
+                    break
+                await to_embed.put((index, *item))
+                index += 1
+            await to_embed.put(None)
+
+        async def encode() -> None:
+            while (item := await to_embed.get()) is not None:
+                index, batch, pages_done = item
+                stored = spool is not None and await self.io(spool.is_upserted, index)
+                embeddings = None
+                if spool is not None and not stored:
+                    embeddings = await self.io(spool.load_embeddings, index)
+                if not stored and embeddings is None:
+                    embeddings = await self._run(self.embed_pool, embed, batch.texts())
+                    if spool is not None:
+                        await self.io(spool.save_embeddings, index, embeddings)
+                await to_upsert.put(
+                    (index, batch, pages_done, None if stored else embeddings)
+                )
+            await to_upsert.put(None)
+
+        async def store() -> int:
+            chunk_count = 0
+            while (item := await to_upsert.get()) is not None:
+                index, batch, pages_done, embeddings = item
+                if embeddings is not None:
+                    await self.io(upsert, batch, embeddings)
+                    if spool is not None:
+                        await self.io(spool.mark_upserted, index)
+                chunk_count += len(batch)
+                await self.io(progress.report, pages_done, chunk_count)
+            return chunk_count
+
+        try:
+            async with asyncio.TaskGroup() as group:
+                group.create_task(produce())
+                group.create_task(encode())
+                stored = group.create_task(store())
+        except ExceptionGroup as e:
+            raise e.exceptions[0] from None
+
+        for stage_metrics in (chunk_metrics, embed_metrics, upsert_metrics):
+            metrics.merge(stage_metrics.to_dict())
+
+        chunk_count = stored.result()
+        if not chunk_count:
+            raise DocumentLoadError(
+                "Text extraction resulted in empty content.",
+                detail={"doc_id": doc_id},
+            )
+        return chunk_count
+
+
+def get_sqs_client():
+    return boto3.client(
+        "sqs",
+        region_name=settings.AWS_REGION,
+        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+        endpoint_url=settings.AWS_ENDPOINT_URL,
+    )
+
+
+def main():
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+    )
+
+    warm_up()
+    warm_embedder()
+    if settings.METRICS_PORT:
+        start_metrics_server(settings.METRICS_PORT)
+
+    if not settings.ASYNC_SQS_QUEUE:
+        raise SystemExit("ASYNC_SQS_QUEUE must be set to the asyncio worker's queue")
+
+    worker = AsyncIngestWorker(
+        queue_url=settings.ASYNC_SQS_QUEUE,
+        max_documents=settings.ASYNC_MAX_DOCUMENTS,
+        max_downloads=settings.ASYNC_MAX_DOWNLOADS,
+        embed_threads=settings.ASYNC_EMBED_THREADS,
+        io_threads=settings.ASYNC_IO_THREADS,
+        visibility_timeout=settings.ASYNC_VISIBILITY_TIMEOUT_S,
+    )
+    mark_ready(settings.READY_FILE, settings.STARTUP_BUDGET_S)
+    try:
+        asyncio.run(worker.run())
+    finally:
+        mark_not_ready(settings.READY_FILE)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,20 @@
+import os
+
+# Imported first so the startup profile's clock starts before everything else.
+from app.startup import mark_not_ready, mark_ready, warm_up
 from celery import Celery
+from celery.signals import (
+    worker_init,
+    worker_process_init,
+    worker_process_shutdown,
+    worker_ready,
+    worker_shutdown,
+)
 from kombu.utils.url import safequote
 from app.config import get_settings
+from app.models.registry import warm_embedder
+from app.queue.sqs import flush_status_messages
+from app.metrics import mark_process_dead, start_metrics_server
 
 settings = get_settings()
 
@@ -12,7 +26,15 @@ aws_secret_key_encoded = safequote(settings.AWS_SECRET_ACCESS_KEY)
 # Use encoded credentials in broker URL
 broker_url = f"sqs://{aws_access_key_encoded}:{aws_secret_key_encoded}@"
 
-celery_app = Celery("tasks", broker=broker_url, include=["app.tasks.process_pdf"])
+celery_app = Celery(
+    "tasks",
+    broker=broker_url,
+    backend=settings.CELERY_RESULT_BACKEND,
+    include=["app.tasks.process_pdf"],
+)
+
+# Only the page range tasks of split documents need their results stored.
+celery_app.conf.task_ignore_result = True
 
 celery_app.conf.task_default_queue = settings.CELERY_SQS_QUEUE_NAME
 celery_app.conf.broker_transport_options = {
@@ -25,3 +47,35 @@ celery_app.conf.broker_transport_options = {
         }
     },
 }
+
+
+@worker_init.connect
+def preload_models(**kwargs):
+    # Runs in the parent before the pool forks, so prefork children share the
+    # model weights copy-on-write instead of each loading their own copy.
+    warm_up()
+
+    if settings.METRICS_PORT:
+        start_metrics_server(settings.METRICS_PORT)
+
+
+@worker_process_init.connect
+def warm_models(**kwargs):
+    warm_embedder()
+
+
+@worker_ready.connect
+def signal_ready(**kwargs):
+    mark_ready(settings.READY_FILE, settings.STARTUP_BUDGET_S)
+
+
+@worker_shutdown.connect
+def signal_not_ready(**kwargs):
+    mark_not_ready(settings.READY_FILE)
+
+
+@worker_process_shutdown.connect
+def flush_status(**kwargs):
+    # Don't lose buffered status updates when a pool process exits.
+    flush_status_messages()
+    mark_process_dead(os.getpid())
@@ -1,4 +1,6 @@
 import os
+from functools import lru_cache
+from typing import Optional
 from dotenv import load_dotenv
 
 
@@ -8,15 +10,63 @@ class Settings:
     VDB_PORT: int
     COLLECTION_NAME: str
     VDB_SECRET_KEY: str
+    VDB_BATCH_SIZE: int
+    VDB_MAX_IN_FLIGHT: int
     DEBUG: bool
     CELERY_SQS_QUEUE: str
     CELERY_SQS_QUEUE_NAME: str
     SQS_QUEUE: str
     SQS_QUEUE_NAME: str
+    SQS_BATCH_SIZE: int
+    SQS_FLUSH_INTERVAL_MS: int
     AWS_SECRET_ACCESS_KEY: str
     AWS_ACCESS_KEY_ID: str
     BUCKET_NAME: str
     AWS_REGION: str
+    AWS_ENDPOINT_URL: Optional[str]
+    S3_PART_SIZE_MB: int
+    S3_MAX_CONCURRENCY: int
+    STREAMING_INGESTION: bool
+    CELERY_RESULT_BACKEND: Optional[str]
+    SPLIT_PAGE_THRESHOLD: int
+    SPLIT_PAGES_PER_TASK: int
+    METRICS_PORT: int
+    READY_FILE: str
+    STARTUP_BUDGET_S: float
+    EMBED_BATCH_SIZE: int
+    PROGRESS_INTERVAL_MS: int
+    SPOOL_URI: str
+    INGEST_MAX_RETRIES: int
+    INGEST_RETRY_BACKOFF_S: int
+    INGEST_RETRY_BACKOFF_MAX_S: int
+    ASYNC_MAX_DOCUMENTS: int
+    ASYNC_MAX_DOWNLOADS: int
+    ASYNC_EMBED_THREADS: int
+    ASYNC_IO_THREADS: int
+    ASYNC_VISIBILITY_TIMEOUT_S: int
+    ASYNC_SQS_QUEUE: Optional[str]
+    EXTRACT_WORKERS: int
+    EXTRACT_TIMEOUT_S: float
+    EXTRACT_CPU_LIMIT_S: int
+    EXTRACT_MEMORY_LIMIT_MB: int
+    CHUNKER: str
+    CHUNK_MAX_TOKENS: int
+    CHUNK_OVERLAP_TOKENS: int
+    EMBEDDING_MODEL: str
+    EMBEDDING_BACKEND: str
+    MODEL_CACHE_DIR: str
+    EMBEDDING_TOLERANCE: float
+    EMBED_TOKEN_BUDGET: int
+    EMBED_MAX_BATCH_SIZE: int
+    EMBED_MICROBATCH: Optional[bool]
+    EMBED_MICROBATCH_SIZE: int
+    EMBED_MICROBATCH_WAIT_MS: int
+    DEDUPLICATE_DOCUMENTS: bool
+    STRIP_BOILERPLATE: bool
+    BOILERPLATE_SAMPLE_PAGES: int
+    DEDUPLICATE_CHUNKS: bool
+    EMBED_CACHE_PATH: str
+    EMBED_CACHE_MAX_ENTRIES: int
 
     def __init__(self):
         load_dotenv()
@@ -26,16 +76,104 @@ class Settings:
         self.COLLECTION_NAME = os.environ["COLLECTION_NAME"]
         self.VDB_SECRET_KEY = os.environ["VDB_SECRET_KEY"]
         self.VDB_HEADER = os.environ.get("VDB_HEADER", "Authorization")
+        self.VDB_BATCH_SIZE = int(os.environ.get("VDB_BATCH_SIZE", "128"))
+        self.VDB_MAX_IN_FLIGHT = int(os.environ.get("VDB_MAX_IN_FLIGHT", "2"))
         self.DEBUG = os.environ.get("DEBUG", "false").lower() == "true"
         self.CELERY_SQS_QUEUE = os.environ["CELERY_SQS_QUEUE"]
         self.CELERY_SQS_QUEUE_NAME = os.environ["CELERY_SQS_QUEUE_NAME"]
+        self.CELERY_RESULT_BACKEND = os.environ.get("CELERY_RESULT_BACKEND") or None
         self.SQS_QUEUE = os.environ["SQS_QUEUE"]
         self.SQS_QUEUE_NAME = os.environ["SQS_QUEUE_NAME"]
+        self.SQS_BATCH_SIZE = int(os.environ.get("SQS_BATCH_SIZE", "10"))
+        self.SQS_FLUSH_INTERVAL_MS = int(os.environ.get("SQS_FLUSH_INTERVAL_MS", "200"))
         self.AWS_SECRET_ACCESS_KEY = os.environ["AWS_SECRET_ACCESS_KEY"]
         self.AWS_ACCESS_KEY_ID = os.environ["AWS_ACCESS_KEY_ID"]
         self.BUCKET_NAME = os.environ["BUCKET_NAME"]
         self.AWS_REGION = os.environ["AWS_REGION"]
+        # Points boto3 at a local stand-in such as moto or ElasticMQ.
+        self.AWS_ENDPOINT_URL = os.environ.get("AWS_ENDPOINT_URL") or None
+        self.S3_PART_SIZE_MB = int(os.environ.get("S3_PART_SIZE_MB", "8"))
+        self.S3_MAX_CONCURRENCY = int(os.environ.get("S3_MAX_CONCURRENCY", "8"))
+        self.METRICS_PORT = int(os.environ.get("METRICS_PORT", "9100"))
+        self.READY_FILE = os.environ.get("READY_FILE", "/tmp/worker-ready")
+        self.STARTUP_BUDGET_S = float(os.environ.get("STARTUP_BUDGET_S", "30"))
+        self.STREAMING_INGESTION = (
+            os.environ.get("STREAMING_INGESTION", "true").lower() == "true"
+        )
+        self.SPLIT_PAGE_THRESHOLD = int(os.environ.get("SPLIT_PAGE_THRESHOLD", "300"))
+        self.SPLIT_PAGES_PER_TASK = int(os.environ.get("SPLIT_PAGES_PER_TASK", "100"))
+        self.EMBED_BATCH_SIZE = int(os.environ.get("EMBED_BATCH_SIZE", "64"))
+        self.PROGRESS_INTERVAL_MS = int(os.environ.get("PROGRESS_INTERVAL_MS", "2000"))
+        # A local directory, or s3://bucket/prefix so retries on other workers
+        # find the checkpoints too; empty disables checkpointing.
+        self.SPOOL_URI = os.environ.get("SPOOL_URI", "ingest_spool")
+        self.INGEST_MAX_RETRIES = int(os.environ.get("INGEST_MAX_RETRIES", "5"))
+        self.INGEST_RETRY_BACKOFF_S = int(os.environ.get("INGEST_RETRY_BACKOFF_S", "2"))
+        self.INGEST_RETRY_BACKOFF_MAX_S = int(
+            os.environ.get("INGEST_RETRY_BACKOFF_MAX_S", "300")
+        )
+        # Only used by the asyncio worker (python -m app.async_worker).
+        self.ASYNC_MAX_DOCUMENTS = int(os.environ.get("ASYNC_MAX_DOCUMENTS", "4"))
+        self.ASYNC_MAX_DOWNLOADS = int(os.environ.get("ASYNC_MAX_DOWNLOADS", "2"))
+        self.ASYNC_EMBED_THREADS = int(os.environ.get("ASYNC_EMBED_THREADS", "2"))
+        self.ASYNC_IO_THREADS = int(os.environ.get("ASYNC_IO_THREADS", "16"))
+        self.ASYNC_VISIBILITY_TIMEOUT_S = int(
+            os.environ.get("ASYNC_VISIBILITY_TIMEOUT_S", "1800")
+        )
+        # The asyncio worker's own queue, which the upload Lambda sends to
+        # instead of the Celery queue (its QUEUE_URL). It never shares the
+        # Celery queue: that carries subtasks only the Celery worker runs.
+        self.ASYNC_SQS_QUEUE = os.environ.get("ASYNC_SQS_QUEUE") or None
+        self.EXTRACT_WORKERS = int(
+            os.environ.get("EXTRACT_WORKERS", str(os.cpu_count() or 1))
+        )
+        self.EXTRACT_TIMEOUT_S = float(os.environ.get("EXTRACT_TIMEOUT_S", "120"))
+        self.EXTRACT_CPU_LIMIT_S = int(os.environ.get("EXTRACT_CPU_LIMIT_S", "60"))
+        self.EXTRACT_MEMORY_LIMIT_MB = int(
+            os.environ.get("EXTRACT_MEMORY_LIMIT_MB", "1024")
+        )
+        self.CHUNKER = os.environ.get("CHUNKER", "sentence")
+        self.CHUNK_MAX_TOKENS = int(os.environ.get("CHUNK_MAX_TOKENS", "0"))
+        self.CHUNK_OVERLAP_TOKENS = int(os.environ.get("CHUNK_OVERLAP_TOKENS", "32"))
+        self.EMBEDDING_MODEL = os.environ.get("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+        self.EMBEDDING_BACKEND = os.environ.get("EMBEDDING_BACKEND", "torch")
+        self.MODEL_CACHE_DIR = os.environ.get("MODEL_CACHE_DIR", "model_cache")
+        self.EMBEDDING_TOLERANCE = float(os.environ.get("EMBEDDING_TOLERANCE", "0.01"))
+        self.EMBED_TOKEN_BUDGET = int(os.environ.get("EMBED_TOKEN_BUDGET", "8192"))
+        self.EMBED_MAX_BATCH_SIZE = int(os.environ.get("EMBED_MAX_BATCH_SIZE", "128"))
+        # The micro-batcher only merges requests of documents embedded at the
+        # same time in one process: in the asyncio worker or a Celery threads
+        # pool. Under the default prefork pool each process runs one task, so
+        # it would only add its wait. Unset, it is on in the asyncio worker
+        # and off for Celery tasks; set it to "true" for a threads pool.
+        microbatch = os.environ.get("EMBED_MICROBATCH")
+        self.EMBED_MICROBATCH = (
+            None if microbatch is None else microbatch.lower() == "true"
+        )
+        self.EMBED_MICROBATCH_SIZE = int(os.environ.get("EMBED_MICROBATCH_SIZE", "256"))
+        self.EMBED_MICROBATCH_WAIT_MS = int(
+            os.environ.get("EMBED_MICROBATCH_WAIT_MS", "10")
+        )
+        self.DEDUPLICATE_DOCUMENTS = (
+            os.environ.get("DEDUPLICATE_DOCUMENTS", "true").lower() == "true"
+        )
+        self.STRIP_BOILERPLATE = (
+            os.environ.get("STRIP_BOILERPLATE", "true").lower() == "true"
+        )
+        self.BOILERPLATE_SAMPLE_PAGES = int(
+            os.environ.get("BOILERPLATE_SAMPLE_PAGES", "20")
+        )
+        self.DEDUPLICATE_CHUNKS = (
+            os.environ.get("DEDUPLICATE_CHUNKS", "true").lower() == "true"
+        )
+        self.EMBED_CACHE_PATH = os.environ.get(
+            "EMBED_CACHE_PATH", "embedding_cache.sqlite3"
+        )
+        self.EMBED_CACHE_MAX_ENTRIES = int(
+            os.environ.get("EMBED_CACHE_MAX_ENTRIES", "200000")
+        )
 
 
+@lru_cache
 def get_settings():
     return Settings()
@@ -0,0 +1,152 @@
+import re
+import math
+import hashlib
+from collections import Counter
+from itertools import chain
+from typing import Iterable, Iterator, MutableMapping, Optional
+from app.document_processing.chunk_batch import ChunkBatch
+
+DIGITS = re.compile(r"\d+")
+WHITESPACE = re.compile(r"\s+")
+
+SAMPLE_PAGES = 20
+# Lines at the top and bottom of a page that may be a running header/footer.
+EDGE_LINES = 3
+# Share of sampled pages a line must repeat on to count as boilerplate. Below
+# 0.5, headers that alternate between even and odd pages would be missed.
+MIN_PAGE_FRACTION = 0.5
+MIN_SAMPLE_PAGES = 3
+
+
+def normalize_text(text: str) -> str:
+    """
+    Lower-case and collapse whitespace.
+    """
+    return WHITESPACE.sub(" ", text).strip().lower()
+
+
+def normalize(text: str) -> str:
+    """
+    `normalize_text` that also replaces numbers with '#', so "Page 3 of 120"
+    and "Page 4 of 120" normalize to the same line.
+    """
+    return normalize_text(DIGITS.sub("#", text))
+
+
+class BoilerplateStripper:
+    """
+    Removes running headers, footers and page numbers from extracted pages.
+
+    The first `sample_pages` pages are buffered to learn which lines repeat at
+    the same position (counted from the top or the bottom of the page) on at
+    least `min_fraction` of them; those lines are then stripped from every
+    page.
+    """
+
+    def __init__(
+        self,
+        sample_pages: int = SAMPLE_PAGES,
+        edge_lines: int = EDGE_LINES,
+        min_fraction: float = MIN_PAGE_FRACTION,
+    ):
+        self.sample_pages = max(1, sample_pages)
+        self.edge_lines = edge_lines
+        self.min_fraction = min_fraction
+        self.repeated: set[tuple[int, str]] = set()
+
+    def _edges(self, lines: list[str]) -> list[tuple[int, tuple[int, str]]]:
+        """
+        (line index, (position, normalized text)) for the edge lines of a page.
+        Positions count 0, 1, .. from the top and -1, -2, .. from the bottom.
+        """
+        content = [index for index, line in enumerate(lines) if line.strip()]
+        top = [
+            (index, (position, normalize(lines[index])))
+            for position, index in enumerate(content[: self.edge_lines])
+        ]
+        bottom = [
+            (index, (-position - 1, normalize(lines[index])))
+            for position, index in enumerate(reversed(content[-self.edge_lines :]))
+        ]
+        return top + bottom
+
+    def learn(self, texts: list[str]) -> None:
+        if len(texts) < MIN_SAMPLE_PAGES:
+            return
+
+        counts: Counter[tuple[int, str]] = Counter()
+        for text in texts:
+            counts.update({key for _, key in self._edges(text.split("\n"))})
+
+        threshold = max(2, math.ceil(self.min_fraction * len(texts)))
+        self.repeated = {key for key, count in counts.items() if count >= threshold}
+
+    def strip_page(self, text: str) -> tuple[str, int]:
+        """
+        Return the page without its boilerplate lines and how many were removed.
+        """
+        if not self.repeated:
+            return text, 0
+
+        lines = text.split("\n")
+        drop = {index for index, key in self._edges(lines) if key in self.repeated}
+        if not drop:
+            return text, 0
+
+        kept = [line for index, line in enumerate(lines) if index not in drop]
+        return "\n".join(kept), len(drop)
+
+    def strip(
+        self,
+        pages: Iterable[tuple[int, str]],
+        counts: Optional[MutableMapping[str, int]] = None,
+    ) -> Iterator[tuple[int, str]]:
+        """
+        Lazily strip (page_index, text) pages. The number of removed lines is
+        added to `counts["boilerplate_lines"]`.
+        """
+        pages = iter(pages)
+        sample = []
+        for page in pages:
+            sample.append(page)
+            if len(sample) >= self.sample_pages:
+                break
+
+        self.learn([text for _, text in sample])
+
+        for index, text in chain(sample, pages):
+            stripped, removed = self.strip_page(text)
+            if counts is not None and removed:
+                counts["boilerplate_lines"] += removed
+            yield index, stripped
+
+
+def dedupe_batches(
+    batches: Iterable[ChunkBatch],
+    counts: Optional[MutableMapping[str, int]] = None,
+) -> Iterator[ChunkBatch]:
+    """
+    Drop chunks whose text was already produced for the document, ignoring
+    case and whitespace. Unlike header and footer detection, numbers count:
+    chunks that differ only in a figure or a date are different content.
+    The number of dropped chunks is added to `counts["duplicate_chunks"]`.
+    """
+    seen: set[bytes] = set()
+    for batch in batches:
+        keep = []
+        for index, text in enumerate(batch.texts()):
+            digest = hashlib.blake2b(
+                normalize_text(text).encode("utf-8"), digest_size=16
+            ).digest()
+            if digest in seen:
+                continue
+            seen.add(digest)
+            keep.append(index)
+
+        if counts is not None and len(keep) < len(batch):
+            counts["duplicate_chunks"] += len(batch) - len(keep)
+
+        if len(keep) == len(batch):
+            yield batch
+        elif keep:
+            yield batch[keep]
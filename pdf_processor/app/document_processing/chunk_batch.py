@@ -0,0 +1,241 @@
+from dataclasses import dataclass
+from typing import Any, Optional, Union
+import numpy as np
+
+
+@dataclass(frozen=True)
+class ChunkBatch:
+    """
+    Chunks of one document stored column-wise: every chunk is a
+    [start, end) span of one shared `text` buffer, next to arrays of chunk
+    ids and, for chunkers that track them, pages.
+
+    Chunk texts are only sliced out of the buffer where they are needed (the
+    model, hashing and the vector store), instead of allocating a string and
+    a dict per chunk all through the pipeline.
+    """
+
+    doc_id: str
+    text: str
+    starts: np.ndarray
+    ends: np.ndarray
+    chunk_ids: np.ndarray
+    # Page of each chunk and where that page's text begins in `text`, so the
+    # page-relative character offsets can be derived.
+    pages: Optional[np.ndarray] = None
+    page_starts: Optional[np.ndarray] = None
+
+    @classmethod
+    def empty(cls, doc_id: str) -> "ChunkBatch":
+        none = np.zeros(0, dtype=np.int64)
+        return cls(doc_id, "", none, none, none)
+
+    @classmethod
+    def from_chunks(cls, chunks: list[dict[str, Any]]) -> "ChunkBatch":
+        """
+        Pack chunk dicts (text, doc_id, chunk_id and optionally page,
+        char_start, char_end) into a batch.
+        """
+        if not chunks:
+            return cls.empty("")
+
+        lengths = np.array([len(chunk["text"]) for chunk in chunks], dtype=np.int64)
+        ends = np.cumsum(lengths)
+        starts = ends - lengths
+
+        pages = page_starts = None
+        if "page" in chunks[0]:
+            pages = np.array([chunk["page"] for chunk in chunks], dtype=np.int64)
+            char_starts = np.array([chunk["char_start"] for chunk in chunks])
+            page_starts = starts - char_starts
+
+        return cls(
+            doc_id=chunks[0]["doc_id"],
+            text="".join(chunk["text"] for chunk in chunks),
+            starts=starts,
+            ends=ends,
+            chunk_ids=np.array([chunk["chunk_id"] for chunk in chunks], dtype=np.int64),
+            pages=pages,
+            page_starts=page_starts,
+        )
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __getitem__(self, index: Union[slice, np.ndarray, list]) -> "ChunkBatch":
+        """
+        A batch of the selected chunks, sharing this batch's text buffer.
+        """
+        return ChunkBatch(
+            doc_id=self.doc_id,
+            text=self.text,
+            starts=self.starts[index],
+            ends=self.ends[index],
+            chunk_ids=self.chunk_ids[index],
+            pages=None if self.pages is None else self.pages[index],
+            page_starts=None if self.page_starts is None else self.page_starts[index],
+        )
+
+    def with_id_offset(self, offset: int) -> "ChunkBatch":
+        return ChunkBatch(
+            doc_id=self.doc_id,
+            text=self.text,
+            starts=self.starts,
+            ends=self.ends,
+            chunk_ids=self.chunk_ids + offset,
+            pages=self.pages,
+            page_starts=self.page_starts,
+        )
+
+    def texts(self) -> list[str]:
+        text = self.text
+        return [
+            text[start:end]
+            for start, end in zip(self.starts.tolist(), self.ends.tolist())
+        ]
+
+    def ids(self) -> list[str]:
+        return [f"{self.doc_id}_{chunk_id}" for chunk_id in self.chunk_ids.tolist()]
+
+    def metadatas(self) -> list[dict[str, Any]]:
+        """
+        The metadata of every chunk: doc_id, chunk_id and, when the chunker
+        tracks them, page and character offsets within the page.
+        """
+        chunk_ids = self.chunk_ids.tolist()
+        if self.pages is None:
+            return [
+                {"doc_id": self.doc_id, "chunk_id": chunk_id} for chunk_id in chunk_ids
+            ]
+
+        return [
+            {
+                "doc_id": self.doc_id,
+                "chunk_id": chunk_id,
+                "page": page,
+                "char_start": char_start,
+                "char_end": char_end,
+            }
+            for chunk_id, page, char_start, char_end in zip(
+                chunk_ids,
+                self.pages.tolist(),
+                (self.starts - self.page_starts).tolist(),
+                (self.ends - self.page_starts).tolist(),
+            )
+        ]
+
+    def chunks(self) -> list[dict[str, Any]]:
+        """
+        The chunks as dicts of text and metadata.
+        """
+        return [
+            {"text": text, **metadata}
+            for text, metadata in zip(self.texts(), self.metadatas())
+        ]
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        A JSON-serializable form of the batch, read back by `from_dict`.
+        """
+        data = {
+            "doc_id": self.doc_id,
+            "text": self.text,
+            "starts": self.starts.tolist(),
+            "ends": self.ends.tolist(),
+            "chunk_ids": self.chunk_ids.tolist(),
+        }
+        if self.pages is not None:
+            data["pages"] = self.pages.tolist()
+            data["page_starts"] = self.page_starts.tolist()
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "ChunkBatch":
+        pages = data.get("pages")
+        return cls(
+            doc_id=data["doc_id"],
+            text=data["text"],
+            starts=np.array(data["starts"], dtype=np.int64),
+            ends=np.array(data["ends"], dtype=np.int64),
+            chunk_ids=np.array(data["chunk_ids"], dtype=np.int64),
+            pages=None if pages is None else np.array(pages, dtype=np.int64),
+            page_starts=(
+                None if pages is None else np.array(data["page_starts"], dtype=np.int64)
+            ),
+        )
+
+
+class ChunkBatchBuilder:
+    """
+    Collects chunk spans over a sequence of texts (pages, or a rolling
+    window of the document) and builds a ChunkBatch of every `batch_size`
+    spans. A text is only added to the batch's buffer once a span uses it.
+    """
+
+    def __init__(self, doc_id: str, batch_size: int, with_pages: bool = True):
+        self.doc_id = doc_id
+        self.batch_size = max(1, batch_size)
+        self.with_pages = with_pages
+        self._page = -1
+        self._text = ""
+        self._base: Optional[int] = None
+        self._reset()
+
+    def _reset(self) -> None:
+        self._parts: list[str] = []
+        self._length = 0
+        self._starts: list[int] = []
+        self._ends: list[int] = []
+        self._chunk_ids: list[int] = []
+        self._pages: list[int] = []
+        self._page_starts: list[int] = []
+        self._base = None
+
+    def set_text(self, text: str, page: int = -1) -> None:
+        """
+        Make `text` the text that following spans refer to.
+        """
+        self._text = text
+        self._page = page
+        self._base = None
+
+    def add(self, start: int, end: int, chunk_id: int) -> None:
+        """
+        Add the chunk spanning [start, end) of the current text.
+        """
+        if self._base is None:
+            self._base = self._length
+            self._parts.append(self._text)
+            self._length += len(self._text)
+
+        self._starts.append(self._base + start)
+        self._ends.append(self._base + end)
+        self._chunk_ids.append(chunk_id)
+        if self.with_pages:
+            self._pages.append(self._page)
+            self._page_starts.append(self._base)
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    @property
+    def full(self) -> bool:
+        return len(self._starts) >= self.batch_size
+
+    def build(self) -> ChunkBatch:
+        """
+        Return the batch of the spans added so far and start a new one.
+        """
+        batch = ChunkBatch(
+            doc_id=self.doc_id,
+            text="".join(self._parts),
+            starts=np.array(self._starts, dtype=np.int64),
+            ends=np.array(self._ends, dtype=np.int64),
+            chunk_ids=np.array(self._chunk_ids, dtype=np.int64),
+            pages=np.array(self._pages, dtype=np.int64) if self.with_pages else None,
+            page_starts=(
+                np.array(self._page_starts, dtype=np.int64) if self.with_pages else None
+            ),
+        )
+        self._reset()
+        return batch
@@ -0,0 +1,184 @@
+import re
+import logging
+from bisect import bisect_left
+from typing import Iterable, Iterator, Protocol
+from app.exceptions import DocumentLoadError
+from app.document_processing.chunk_batch import ChunkBatch, ChunkBatchBuilder
+from app.document_processing.document_loader import iter_chunk_batches
+
+# Sentence ends followed by whitespace, or blank lines between paragraphs.
+# Single newlines are left alone since PDF text uses them for line wraps.
+BOUNDARY_PATTERN = re.compile(r"(?<=[.!?])\s+|\n\s*\n")
+
+logger = logging.getLogger(__name__)
+
+
+class Chunker(Protocol):
+    def chunk(
+        self, pages: Iterable[tuple[int, str]], doc_id: str, batch_size: int
+    ) -> Iterator[ChunkBatch]: ...
+
+
+class FixedWindowChunker:
+    """
+    Fixed-size character windows over the whole document, as produced by
+    `chunk_text`. Kept for collections that were built with it.
+    """
+
+    def chunk(
+        self, pages: Iterable[tuple[int, str]], doc_id: str, batch_size: int
+    ) -> Iterator[ChunkBatch]:
+        return iter_chunk_batches(pages, doc_id=doc_id, batch_size=batch_size)
+
+
+class SentenceChunker:
+    """
+    Packs whole sentences into chunks measured in tokens of the embedding
+    model's own tokenizer, so no chunk is silently truncated by the model.
+
+    Chunks never cross a page; each one records its page and the character
+    span it covers in that page's text.
+    """
+
+    def __init__(self, tokenizer, max_tokens: int, overlap_tokens: int = 0):
+        self.tokenizer = tokenizer
+        self.max_tokens = max_tokens - tokenizer.num_special_tokens_to_add()
+        self.overlap_tokens = min(max(0, overlap_tokens), self.max_tokens // 2)
+
+        if self.max_tokens <= 0:
+            raise ValueError(f"max_tokens too small for tokenizer: {max_tokens}")
+
+    def _segments(self, text: str) -> list[tuple[int, int]]:
+        spans = []
+        position = 0
+        for match in BOUNDARY_PATTERN.finditer(text):
+            spans.append((position, match.start()))
+            position = match.end()
+        spans.append((position, len(text)))
+
+        segments = []
+        for start, end in spans:
+            while start < end and text[start].isspace():
+                start += 1
+            while end > start and text[end - 1].isspace():
+                end -= 1
+            if start < end:
+                segments.append((start, end))
+
+        return segments
+
+    def _sized_segments(self, text: str) -> Iterator[tuple[int, int, int]]:
+        """
+        Yield (char_start, char_end, token_count) for each sentence, splitting
+        sentences longer than the token budget on token boundaries.
+        """
+        encoding = self.tokenizer(
+            text,
+            add_special_tokens=False,
+            return_offsets_mapping=True,
+            verbose=False,
+        )
+        offsets = encoding["offset_mapping"]
+        token_starts = [start for start, _ in offsets]
+
+        for start, end in self._segments(text):
+            first = bisect_left(token_starts, start)
+            last = bisect_left(token_starts, end)
+            count = last - first
+
+            if count <= self.max_tokens:
+                yield start, end, count
+                continue
+
+            for window_start in range(first, last, self.max_tokens):
+                window_end = min(window_start + self.max_tokens, last)
+                yield (
+                    offsets[window_start][0],
+                    offsets[window_end - 1][1],
+                    window_end - window_start,
+                )
+
+    def chunk(
+        self, pages: Iterable[tuple[int, str]], doc_id: str, batch_size: int
+    ) -> Iterator[ChunkBatch]:
+        """
+        Yield the chunks in batches of `batch_size`, backed by the text of the
+        pages they come from.
+        """
+        builder = ChunkBatchBuilder(doc_id, batch_size)
+        chunk_id = 0
+
+        try:
+            for page, text in pages:
+                builder.set_text(text, page)
+                window: list[tuple[int, int, int]] = []
+                total = 0
+
+                for segment in self._sized_segments(text):
+                    count = segment[2]
+
+                    if window and total + count > self.max_tokens:
+                        builder.add(window[0][0], window[-1][1], chunk_id)
+                        chunk_id += 1
+                        if builder.full:
+                            yield builder.build()
+                        window, total = self._overlap(window)
+                        while window and total + count > self.max_tokens:
+                            total -= window.pop(0)[2]
+
+                    window.append(segment)
+                    total += count
+
+                if window:
+                    builder.add(window[0][0], window[-1][1], chunk_id)
+                    chunk_id += 1
+                    if builder.full:
+                        yield builder.build()
+
+            if len(builder):
+                yield builder.build()
+
+        except DocumentLoadError:
+            raise
+
+        except Exception as e:
+            logger.error(f"Error while chunking text: {e}")
+            raise DocumentLoadError(
+                f"Failed to chunk document with id: {doc_id}", detail=str(e)
+            ) from e
+
+    def _overlap(
+        self, window: list[tuple[int, int, int]]
+    ) -> tuple[list[tuple[int, int, int]], int]:
+        carried: list[tuple[int, int, int]] = []
+        total = 0
+        for segment in reversed(window[1:]):
+            if total + segment[2] > self.overlap_tokens:
+                break
+            carried.insert(0, segment)
+            total += segment[2]
+        return carried, total
+
+
+def build_chunker(
+    name: str, embedder=None, max_tokens: int = 0, overlap_tokens: int = 0
+) -> Chunker:
+    """
+    Create the chunker configured by `name` ("sentence" or "fixed").
+
+    The sentence chunker takes its tokenizer from the embedder and defaults to
+    the model's `max_seq_length` when `max_tokens` is not set.
+    """
+    if name == "fixed":
+        return FixedWindowChunker()
+
+    if name == "sentence":
+        if embedder is None:
+            raise ValueError("The sentence chunker needs an embedder's tokenizer.")
+        limit = embedder.max_seq_length
+        max_tokens = min(max_tokens, limit) if max_tokens > 0 else limit
+        return SentenceChunker(
+            embedder.tokenizer, max_tokens=max_tokens, overlap_tokens=overlap_tokens
+        )
+
+    raise ValueError(f"Unknown chunker: {name}")
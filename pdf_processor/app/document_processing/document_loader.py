@@ -1,23 +1,50 @@
-import io
-from typing import Any, Optional
+import mmap
+import tempfile
+from contextlib import contextmanager
+from typing import IO, Iterable, Iterator, MutableMapping, Optional
 from pypdf import PdfReader
 import logging
+from boto3.s3.transfer import TransferConfig
 from botocore.client import BaseClient
-from app.exceptions import DocumentLoadError
+from app.exceptions import (
+    DocumentDownloadError,
+    DocumentLoadError,
+    ExtractionLimitError,
+)
+from app.document_processing.boilerplate import BoilerplateStripper
+from app.document_processing.chunk_batch import ChunkBatch, ChunkBatchBuilder
+from app.document_processing.extraction import (
+    ExtractionLimits,
+    count_pdf_pages,
+    iter_pdf_pages_parallel,
+)
 
 
 CHUNK_SIZE = 300
 OVERLAP = 50
+DOWNLOAD_PART_SIZE = 8 * 1024 * 1024
+DOWNLOAD_CONCURRENCY = 8
 
 logger = logging.getLogger(__name__)
 
 
-def extract_text_from_pdf(file_data: bytes) -> str:
+def iter_pdf_pages(
+    pdf_file: IO[bytes], start: int = 0, end: Optional[int] = None
+) -> Iterator[tuple[int, str]]:
+    """
+    Yield (page_index, text) for each page, or for pages [start, end), parsing
+    one page at a time.
+
+    The file is memory-mapped, so pypdf reads from the page cache instead of
+    copying the document onto the Python heap.
+    """
     try:
-        pdf_file = io.BytesIO(file_data)
-        doc = PdfReader(pdf_file)
+        with mmap.mmap(pdf_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            doc = PdfReader(mapped)
+            stop = len(doc.pages) if end is None else min(end, len(doc.pages))
 
-        return "\n".join(page.extract_text() for page in doc.pages)
+            for index in range(start, stop):
+                yield index, doc.pages[index].extract_text()
 
     except Exception as e:
         logger.warning(f"Invalid PDF: {e}")
@@ -26,6 +53,16 @@ def extract_text_from_pdf(file_data: bytes) -> str:
         ) from e
 
 
+def count_pages(
+    pdf_file: IO[bytes], limits: Optional[ExtractionLimits] = None, workers: int = 1
+) -> int:
+    """
+    Number of pages in the PDF, read from its page tree without extracting
+    any text. With `limits`, the file is parsed in an extraction process.
+    """
+    return count_pdf_pages(pdf_file.name, limits or ExtractionLimits(), workers)
+
+
 # def extract_text_from_docx(file_data: bytes) -> str:
 #     try:
 #         docx_file = io.BytesIO(file_data)
@@ -40,21 +77,37 @@ def extract_text_from_pdf(file_data: bytes) -> str:
 #
 
 
-def chunk_text(text: str, doc_id: str) -> list[dict[str, Any]]:
-    chunks = []
-    start = 0
-    chunk_id = 0
+def _add_window(
+    builder: ChunkBatchBuilder, text: str, start: int, end: int, chunk_id: int
+) -> int:
+    """
+    Add text[start:end] without surrounding whitespace as a chunk, unless it
+    is blank. Returns the next chunk id.
+    """
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    if start == end:
+        return chunk_id
+
+    builder.add(start, end, chunk_id)
+    return chunk_id + 1
+
+
+def chunk_text(text: str, doc_id: str) -> ChunkBatch:
+    """
+    Split `text` into overlapping fixed-size windows, as one batch backed by
+    `text` itself.
+    """
     try:
-        while start < len(text):
+        builder = ChunkBatchBuilder(doc_id, batch_size=len(text) + 1, with_pages=False)
+        builder.set_text(text)
+        chunk_id = 0
+        for start in range(0, len(text), CHUNK_SIZE - OVERLAP):
             end = min(start + CHUNK_SIZE, len(text))
-            chunk_text = text[start:end].strip()
-            if chunk_text:
-                chunks.append(
-                    {"text": chunk_text, "doc_id": doc_id, "chunk_id": chunk_id}
-                )
-                chunk_id += 1
-            start += CHUNK_SIZE - OVERLAP
-        return chunks
+            chunk_id = _add_window(builder, text, start, end, chunk_id)
+        return builder.build()
 
     except Exception as e:
         logger.error(f"Error while chunking text: {e}")
@@ -63,39 +116,181 @@ def chunk_text(text: str, doc_id: str) -> list[dict[str, Any]]:
         ) from e
 
 
-def load_documents(
-    bucket: str, key: str, s3: BaseClient, doc_id: str
-) -> list[dict[str, Any]]:
-    """
-    Load and chunk documents from a folder.
-    Returns a list of dicts with: text, source, chunk_id
+def iter_chunk_batches(
+    pages: Iterable[tuple[int, str]], doc_id: str, batch_size: int
+) -> Iterator[ChunkBatch]:
     """
-    text: Optional[str] = None
+    Streaming counterpart of `chunk_text`, yielding batches of `batch_size`
+    chunks.
 
-    response = s3.get_object(Bucket=bucket, Key=key)
-    file_data = response["Body"].read()
-    content_type = response.get("ContentType")
+    Produces the same windows as chunking the newline-joined text of all pages,
+    but only keeps the text that has not been chunked yet, and the text of the
+    current batch, in memory.
+    """
+    builder = ChunkBatchBuilder(doc_id, batch_size, with_pages=False)
+    buffer = ""
+    position = 0
+    chunk_id = 0
+    first_page = True
 
     try:
-        text = extract_text_from_pdf(file_data)
-        # elif content_type == "docx":
-        #     text = extract_text_from_docx(file_data)
-        # else:
-        #     raise DocumentLoadError(
-        #         f"Unsupported content type: '{content_type}'", detail={"key": key}
-        #     )
-
-        if not text:
-            raise DocumentLoadError(
-                "Text extraction resulted in empty content.", detail={"key": key}
-            )
+        for _, page_text in pages:
+            # Chunks already added keep the previous buffer alive through the
+            # builder, so it is never modified in place.
+            if first_page:
+                buffer = page_text
+            else:
+                buffer = buffer[position:] + "\n" + page_text
+            position = 0
+            first_page = False
+            builder.set_text(buffer)
+
+            while len(buffer) - position >= CHUNK_SIZE:
+                end = position + CHUNK_SIZE
+                chunk_id = _add_window(builder, buffer, position, end, chunk_id)
+                position += CHUNK_SIZE - OVERLAP
+                if builder.full:
+                    yield builder.build()
 
-        file_chunks = chunk_text(text, doc_id=doc_id)
+        while position < len(buffer):
+            end = min(position + CHUNK_SIZE, len(buffer))
+            chunk_id = _add_window(builder, buffer, position, end, chunk_id)
+            position += CHUNK_SIZE - OVERLAP
+            if builder.full:
+                yield builder.build()
 
-        return file_chunks
+        if len(builder):
+            yield builder.build()
+
+    except DocumentLoadError:
+        raise
 
     except Exception as e:
-        logger.error(f"Failed to process file with key: {key} - {e}")
+        logger.error(f"Error while chunking text: {e}")
         raise DocumentLoadError(
-            "An unexpected error occurred during document loading.", detail=str(e)
+            f"Failed to chunk document with id: {doc_id}", detail=str(e)
         ) from e
+
+
+@contextmanager
+def open_document(
+    bucket: str,
+    key: str,
+    s3: BaseClient,
+    part_size: int = DOWNLOAD_PART_SIZE,
+    max_concurrency: int = DOWNLOAD_CONCURRENCY,
+) -> Iterator[IO[bytes]]:
+    """
+    Download an S3 object into a temporary file and yield it, so the document
+    is never held in memory as a whole. The file is removed on exit.
+
+    Objects larger than `part_size` are fetched with up to `max_concurrency`
+    ranged GETs in parallel, each written straight to its offset in the file.
+    """
+    transfer_config = TransferConfig(
+        multipart_threshold=part_size,
+        multipart_chunksize=part_size,
+        max_concurrency=max_concurrency,
+    )
+
+    with tempfile.NamedTemporaryFile(suffix=".pdf") as pdf_file:
+        try:
+            s3.download_fileobj(bucket, key, pdf_file, Config=transfer_config)
+            pdf_file.flush()
+            pdf_file.seek(0)
+
+        except Exception as e:
+            logger.error(f"Failed to download file with key: {key} - {e}")
+            raise DocumentDownloadError(
+                "Failed to download document from storage.", detail=str(e)
+            ) from e
+
+        yield pdf_file
+
+
+def get_content_hash(bucket: str, key: str, s3: BaseClient) -> Optional[str]:
+    """
+    Identify the object's content by its S3 ETag, without downloading it.
+    Returns None if the object can't be inspected.
+    """
+    try:
+        response = s3.head_object(Bucket=bucket, Key=key)
+        etag = response.get("ETag", "").strip('"')
+        return f"etag:{etag}" if etag else None
+
+    except Exception as e:
+        logger.warning(f"Could not read ETag for key: {key} - {e}")
+        return None
+
+
+def stream_pages(
+    pdf_file: IO[bytes],
+    extract_workers: int = 1,
+    limits: Optional[ExtractionLimits] = None,
+    start: int = 0,
+    end: Optional[int] = None,
+) -> Iterator[tuple[int, str]]:
+    """
+    Lazily extract a PDF, or pages [start, end) of it, yielding
+    (page_index, text) as pages are parsed.
+
+    With more than one extraction worker, or with extraction limits, pages
+    are extracted in separate processes from the file on disk and still come
+    out in page order.
+    """
+    if extract_workers > 1 or (limits is not None and limits.enabled):
+        return iter_pdf_pages_parallel(
+            pdf_file.name, workers=extract_workers, limits=limits, start=start, end=end
+        )
+
+    return iter_pdf_pages(pdf_file, start=start, end=end)
+
+
+def load_documents(
+    bucket: str,
+    key: str,
+    s3: BaseClient,
+    doc_id: str,
+    strip_boilerplate: bool = False,
+    counts: Optional[MutableMapping[str, int]] = None,
+    extract_workers: int = 1,
+    limits: Optional[ExtractionLimits] = None,
+) -> ChunkBatch:
+    """
+    Load and chunk documents from a folder.
+    Returns the chunks as one batch backed by the document's text.
+
+    Pages are extracted like `stream_pages` does, under the same limits.
+    """
+    text: Optional[str] = None
+
+    with open_document(bucket=bucket, key=key, s3=s3) as pdf_file:
+        try:
+            pages = stream_pages(pdf_file, extract_workers, limits)
+            if strip_boilerplate:
+                pages = BoilerplateStripper().strip(pages, counts=counts)
+            text = "\n".join(page_text for _, page_text in pages)
+            # elif content_type == "docx":
+            #     text = extract_text_from_docx(file_data)
+            # else:
+            #     raise DocumentLoadError(
+            #         f"Unsupported content type: '{content_type}'", detail={"key": key}
+            #     )
+
+            if not text:
+                raise DocumentLoadError(
+                    "Text extraction resulted in empty content.", detail={"key": key}
+                )
+
+            file_chunks = chunk_text(text, doc_id=doc_id)
+
+            return file_chunks
+
+        except ExtractionLimitError:
+            raise
+
+        except Exception as e:
+            logger.error(f"Failed to process file with key: {key} - {e}")
+            raise DocumentLoadError(
+                "An unexpected error occurred during document loading.", detail=str(e)
+            ) from e
@@ -0,0 +1,361 @@
+import os
+import mmap
+import time
+import signal
+import logging
+import resource
+import threading
+import multiprocessing
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing.process import AuthenticationString
+from typing import Iterator, Optional
+from pypdf import PdfReader
+from app.exceptions import DocumentLoadError, ExtractionLimitError
+
+PAGES_PER_TASK = 16
+
+logger = logging.getLogger(__name__)
+
+# Extraction processes are kept for the lifetime of the worker process so
+# each task doesn't pay for spawning them again. Every document borrows a
+# pool of its own (several may be extracted from threads of one process, see
+# app.async_worker), so a document that hits a limit only kills its own
+# extraction processes; idle pools are kept by (workers, memory_bytes).
+_idle_pools: dict[tuple[int, int], list["_ExtractionPool"]] = defaultdict(list)
+_idle_pools_pid: Optional[int] = None
+_pool_lock = threading.RLock()
+
+
+@dataclass(frozen=True)
+class ExtractionLimits:
+    """
+    Limits for extracting one document in the pool processes; 0 disables a
+    limit. `timeout` applies to the time one document waits for its pool,
+    `cpu_seconds` to each page range inside its process, and `memory_bytes`
+    to the address space of every pool process.
+    """
+
+    timeout: float = 0
+    cpu_seconds: int = 0
+    memory_bytes: int = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.timeout or self.cpu_seconds or self.memory_bytes)
+
+
+@contextmanager
+def _mapped_pdf(path: str) -> Iterator[PdfReader]:
+    # Opening by path makes pypdf read the whole file into memory; a mapping
+    # lets it read from the page cache instead.
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        yield PdfReader(m)
+
+
+def _init_process(memory_bytes: int) -> None:
+    # Pool processes only run pypdf, so a failed allocation surfaces as a
+    # MemoryError here instead of the OOM killer picking the worker.
+    if memory_bytes:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+
+
+def _limit_cpu(cpu_seconds: int) -> None:
+    # RLIMIT_CPU counts the whole life of the process, so the soft limit is
+    # moved to "now + cpu_seconds" for every call; exceeding it raises
+    # SIGXCPU, which terminates the process.
+    if not cpu_seconds:
+        return
+
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft = int(usage.ru_utime + usage.ru_stime) + cpu_seconds
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _count_pages(path: str, cpu_seconds: int = 0) -> int:
+    _limit_cpu(cpu_seconds)
+    with _mapped_pdf(path) as reader:
+        return len(reader.pages)
+
+
+def _extract_page_range(
+    path: str, start: int, end: int, cpu_seconds: int = 0
+) -> list[str]:
+    _limit_cpu(cpu_seconds)
+    with _mapped_pdf(path) as reader:
+        return [reader.pages[index].extract_text() for index in range(start, end)]
+
+
+@contextmanager
+def _allow_children() -> Iterator[None]:
+    """
+    Let Celery's prefork processes start the pool processes.
+
+    They are daemonic billiard processes, which billiard lets start children
+    and installs as multiprocessing's current process. Multiprocessing,
+    however, refuses to start children of a daemonic process and can't
+    pickle billiard's authkey for a spawned one. While pool processes start,
+    the current process is presented to it as a plain one; the pool
+    processes are shut down or killed by this module.
+    """
+    process = multiprocessing.current_process()
+    config = process._config
+    process._config = {
+        **{name: value for name, value in config.items() if name != "daemon"},
+        "authkey": AuthenticationString(bytes(config["authkey"])),
+    }
+    try:
+        yield
+    finally:
+        process._config = config
+
+
+class _ExtractionPool(ProcessPoolExecutor):
+    retired = False
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        # Pool processes are only started on submit.
+        with _pool_lock, _allow_children():
+            return super().submit(fn, *args, **kwargs)
+
+    def retire(self, kill: bool = False) -> None:
+        if kill:
+            # Stuck extractions never return, so their processes are killed
+            # rather than waited for.
+            for process in list(self._processes.values()):
+                process.kill()
+        self.shutdown(wait=False, cancel_futures=True)
+        self.retired = True
+
+    def terminated_by(self, sig: int) -> bool:
+        return any(
+            process.exitcode == -sig for process in list(self._processes.values())
+        )
+
+
+@contextmanager
+def _borrow_pool(workers: int, memory_bytes: int = 0) -> Iterator[_ExtractionPool]:
+    """
+    Lend a pool to one document, returning it to the idle pools afterwards
+    unless the document retired it.
+    """
+    global _idle_pools_pid
+
+    key = (workers, memory_bytes)
+    with _pool_lock:
+        if _idle_pools_pid != os.getpid():
+            # Pools of the parent process are unusable after a fork.
+            _idle_pools.clear()
+            _idle_pools_pid = os.getpid()
+        idle = _idle_pools[key]
+        pool = idle.pop() if idle else None
+
+    if pool is None:
+        # Spawned rather than forked: the worker already has torch threads
+        # running, and pypdf is all these processes need to import.
+        pool = _ExtractionPool(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_process,
+            initargs=(memory_bytes,),
+        )
+
+    try:
+        yield pool
+    finally:
+        if not pool.retired:
+            with _pool_lock:
+                if _idle_pools_pid == os.getpid():
+                    _idle_pools[key].append(pool)
+
+
+class _TimeBudget:
+    """
+    The time one document may wait for its pool, shared by all of its page
+    ranges. Time the consumer spends between pages isn't counted: ranges in
+    flight keep being extracted then, and are waited for afterwards.
+    """
+
+    def __init__(self, seconds: float):
+        self.remaining: Optional[float] = seconds or None
+
+    def result(self, future: Future):
+        if self.remaining is None:
+            return future.result()
+
+        waiting = time.monotonic()
+        try:
+            return future.result(timeout=self.remaining)
+        finally:
+            self.remaining = max(0.0, self.remaining - (time.monotonic() - waiting))
+
+
+def _result(
+    future: Future,
+    pool: _ExtractionPool,
+    budget: _TimeBudget,
+    limits: ExtractionLimits,
+):
+    """
+    Wait for a pool result, turning a hit limit into ExtractionLimitError
+    and retiring the document's pool.
+    """
+    try:
+        return budget.result(future)
+
+    except TimeoutError as e:
+        pool.retire(kill=True)
+        raise ExtractionLimitError(
+            f"Text extraction exceeded the {limits.timeout:g}s time limit.",
+            detail="timeout",
+        ) from e
+
+    except MemoryError as e:
+        pool.retire(kill=True)
+        raise ExtractionLimitError(
+            "Text extraction exceeded the memory limit.", detail="memory"
+        ) from e
+
+    except BrokenProcessPool as e:
+        pool.retire()
+        if pool.terminated_by(signal.SIGXCPU):
+            raise ExtractionLimitError(
+                f"Text extraction exceeded the {limits.cpu_seconds}s CPU limit.",
+                detail="cpu",
+            ) from e
+        if limits.enabled:
+            raise ExtractionLimitError(
+                "Text extraction process was terminated.", detail="terminated"
+            ) from e
+        raise
+
+
+def _iter_pages_serial(
+    reader: PdfReader, start: int, end: int
+) -> Iterator[tuple[int, str]]:
+    for index in range(start, end):
+        yield index, reader.pages[index].extract_text()
+
+
+def _iter_pages_parallel(
+    path: str,
+    start: int,
+    end: int,
+    workers: int,
+    pool: _ExtractionPool,
+    budget: _TimeBudget,
+    limits: ExtractionLimits,
+) -> Iterator[tuple[int, str]]:
+    span = max(1, min(PAGES_PER_TASK, -(-(end - start) // workers)))
+    ranges = iter((first, min(first + span, end)) for first in range(start, end, span))
+
+    def submit(first: int, last: int) -> tuple[int, Future]:
+        return first, pool.submit(
+            _extract_page_range, path, first, last, limits.cpu_seconds
+        )
+
+    # Only a couple of ranges per worker are in flight, so finished page texts
+    # don't pile up when the consumer (embedding) is slower than extraction.
+    pending: deque[tuple[int, Future]] = deque()
+
+    try:
+        for first, last in ranges:
+            pending.append(submit(first, last))
+            if len(pending) >= workers * 2:
+                first, future = pending.popleft()
+                for offset, text in enumerate(_result(future, pool, budget, limits)):
+                    yield first + offset, text
+
+        while pending:
+            first, future = pending.popleft()
+            for offset, text in enumerate(_result(future, pool, budget, limits)):
+                yield first + offset, text
+
+    finally:
+        for _, future in pending:
+            future.cancel()
+
+
+def _count_in_pool(
+    path: str, pool: _ExtractionPool, budget: _TimeBudget, limits: ExtractionLimits
+) -> int:
+    future = pool.submit(_count_pages, path, limits.cpu_seconds)
+    return _result(future, pool, budget, limits)
+
+
+def count_pdf_pages(path: str, limits: ExtractionLimits, workers: int = 1) -> int:
+    """
+    Number of pages of the PDF at `path`, read in a pool process under
+    `limits` (or in this process when no limit is set).
+    """
+    try:
+        if not limits.enabled:
+            with _mapped_pdf(path) as reader:
+                return len(reader.pages)
+
+        with _borrow_pool(max(1, workers), limits.memory_bytes) as pool:
+            return _count_in_pool(path, pool, _TimeBudget(limits.timeout), limits)
+
+    except DocumentLoadError:
+        raise
+
+    except Exception as e:
+        logger.warning(f"Invalid PDF: {e}")
+        raise DocumentLoadError(
+            "Failed to extract text from PDF.", detail=str(e)
+        ) from e
+
+
+def iter_pdf_pages_parallel(
+    path: str,
+    workers: int,
+    limits: Optional[ExtractionLimits] = None,
+    start: int = 0,
+    end: Optional[int] = None,
+) -> Iterator[tuple[int, str]]:
+    """
+    Yield (page_index, text) for pages [start, end) of the PDF at `path`
+    (all pages by default), in page order.
+
+    Pages are split into contiguous ranges that are extracted by a pool of
+    `workers` processes. With one worker, or a short document, pages are
+    extracted in the current process, unless `limits` are set: then every
+    page is extracted in the pool, and a document that exceeds a limit
+    raises ExtractionLimitError after its extraction processes were killed.
+    """
+    limits = limits or ExtractionLimits()
+    workers = max(1, workers)
+
+    try:
+        if not limits.enabled:
+            with _mapped_pdf(path) as reader:
+                page_count = len(reader.pages)
+                stop = page_count if end is None else min(end, page_count)
+
+                if workers <= 1 or stop - start <= PAGES_PER_TASK:
+                    yield from _iter_pages_serial(reader, start, stop)
+                    return
+
+        with _borrow_pool(workers, limits.memory_bytes) as pool:
+            budget = _TimeBudget(limits.timeout)
+            if limits.enabled:
+                page_count = _count_in_pool(path, pool, budget, limits)
+            stop = page_count if end is None else min(end, page_count)
+            yield from _iter_pages_parallel(
+                path, start, stop, workers, pool, budget, limits
+            )
+
+    except DocumentLoadError:
+        raise
+
+    except Exception as e:
+        logger.warning(f"Invalid PDF: {e}")
+        raise DocumentLoadError(
+            "Failed to extract text from PDF.", detail=str(e)
+        ) from e
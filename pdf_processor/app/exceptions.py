@@ -18,6 +18,18 @@ class DocumentLoadError(DocumentProcessingError):
     pass
 
 
+class DocumentDownloadError(DocumentLoadError):
+    """Raised when a document can't be downloaded from S3."""
+
+    pass
+
+
+class ExtractionLimitError(DocumentLoadError):
+    """Raised when extracting a document exceeds its time, CPU or memory limit."""
+
+    pass
+
+
 class EmbeddingError(DocumentProcessingError):
     """Raised when the embedding model fails."""
 
@@ -28,3 +40,9 @@ class VectorStoreError(DocumentProcessingError):
     """Raised when there's an issue with the vector database."""
 
     pass
+
+
+class VectorStoreUnavailableError(VectorStoreError):
+    """Raised when the vector database can't be reached or times out."""
+
+    pass
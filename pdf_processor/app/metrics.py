@@ -0,0 +1,177 @@
+import os
+import time
+import logging
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Callable, Iterable, Iterator, Optional, TypeVar
+from prometheus_client import (
+    CollectorRegistry,
+    Histogram,
+    multiprocess,
+    start_http_server,
+)
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+STAGE_SECONDS = Histogram(
+    "pdf_ingest_stage_seconds",
+    "Time spent in each ingestion stage per document.",
+    ["stage"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300),
+)
+TASK_SECONDS = Histogram(
+    "pdf_ingest_task_seconds",
+    "Total processing time per document.",
+    ["status"],
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600),
+)
+DOCUMENT_BYTES = Histogram(
+    "pdf_ingest_document_bytes",
+    "Size of ingested documents.",
+    buckets=(1e4, 1e5, 5e5, 1e6, 5e6, 1e7, 2e7, 5e7),
+)
+DOCUMENT_PAGES = Histogram(
+    "pdf_ingest_document_pages",
+    "Pages per ingested document.",
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500),
+)
+DOCUMENT_CHUNKS = Histogram(
+    "pdf_ingest_document_chunks",
+    "Chunks per ingested document.",
+    buckets=(1, 10, 50, 100, 250, 500, 1000, 2500, 5000, 10000),
+)
+
+
+class IngestMetrics:
+    """
+    Per-document stage timings and sizes for one `process_pdf` run.
+
+    Stages may nest (e.g. chunking pulls pages from extraction); a stage's
+    time excludes the time of stages running inside it, so the stage times
+    add up to the wall time of the instrumented work.
+    """
+
+    def __init__(self, started_at: Optional[float] = None):
+        # started_at is a wall clock time, so a run that continues in another
+        # process (a split document's callback) keeps counting from the start.
+        self.started_at = time.time() if started_at is None else started_at
+        self.started = time.perf_counter() - (time.time() - self.started_at)
+        self.stages: dict[str, float] = defaultdict(float)
+        self.items: dict[str, int] = defaultdict(int)
+        self.size_bytes: Optional[int] = None
+        self._children: list[float] = []
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        self._children.append(0.0)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.stages[name] += elapsed - self._children.pop()
+            if self._children:
+                self._children[-1] += elapsed
+
+    def timed(
+        self,
+        iterable: Iterable[T],
+        name: str,
+        count: Optional[Callable[[T], int]] = None,
+    ) -> Iterator[T]:
+        """
+        Attribute the time spent producing each item of a lazy iterable to
+        `name`, and count the items produced, or `count(item)` per item for
+        iterables of batches.
+        """
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            self.items[name] += 1 if count is None else count(item)
+            yield item
+
+    @property
+    def pages(self) -> int:
+        return self.items["extract"]
+
+    @property
+    def chunks(self) -> int:
+        return self.items["chunk"]
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "total_seconds": round(time.perf_counter() - self.started, 4),
+            "stages": {name: round(value, 4) for name, value in self.stages.items()},
+            "size_bytes": self.size_bytes,
+            "pages": self.pages,
+            "chunks": self.chunks,
+            "boilerplate_lines_removed": self.items["boilerplate_lines"],
+            "duplicate_chunks_removed": self.items["duplicate_chunks"],
+        }
+
+    def merge(self, summary: dict[str, Any]) -> None:
+        """
+        Add the stage times and counts of another run's `to_dict()`, e.g. of
+        the page ranges of a split document.
+        """
+        for name, value in summary.get("stages", {}).items():
+            self.stages[name] += value
+        self.items["extract"] += summary.get("pages", 0)
+        self.items["chunk"] += summary.get("chunks", 0)
+        self.items["boilerplate_lines"] += summary.get("boilerplate_lines_removed", 0)
+        self.items["duplicate_chunks"] += summary.get("duplicate_chunks_removed", 0)
+        if summary.get("size_bytes") is not None:
+            self.size_bytes = max(self.size_bytes or 0, summary["size_bytes"])
+
+    def observe(self, status: str) -> None:
+        """
+        Record this document in the worker's Prometheus histograms.
+        """
+        for name, value in self.stages.items():
+            STAGE_SECONDS.labels(stage=name).observe(value)
+        TASK_SECONDS.labels(status=status).observe(time.perf_counter() - self.started)
+        if self.size_bytes is not None:
+            DOCUMENT_BYTES.observe(self.size_bytes)
+        if self.pages:
+            DOCUMENT_PAGES.observe(self.pages)
+        if self.chunks:
+            DOCUMENT_CHUNKS.observe(self.chunks)
+
+
+def start_metrics_server(port: int) -> None:
+    """
+    Expose the histograms over HTTP.
+
+    The histograms are observed in the prefork pool processes, not in the
+    parent that serves them, so every process writes them to
+    PROMETHEUS_MULTIPROC_DIR and the server aggregates the files there. Call
+    this before the pool starts: files of earlier processes are removed, so
+    a restarted worker doesn't count their documents again.
+    """
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if not path:
+        logger.warning("PROMETHEUS_MULTIPROC_DIR is not set; metrics not exported")
+        return
+
+    os.makedirs(path, exist_ok=True)
+    own_suffix = f"_{os.getpid()}.db"
+    for name in os.listdir(path):
+        if name.endswith(".db") and not name.endswith(own_suffix):
+            os.remove(os.path.join(path, name))
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, path=path)
+    start_http_server(port, registry=registry)
+
+    logger.info(f"Serving Prometheus metrics on port {port}")
+
+
+def mark_process_dead(pid: int) -> None:
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        multiprocess.mark_process_dead(pid)
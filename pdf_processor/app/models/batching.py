@@ -0,0 +1,65 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class BatchingStats:
+    texts: int = 0
+    batches: int = 0
+    tokens: int = 0
+    padded_tokens: int = 0
+
+    @property
+    def padding_ratio(self) -> float:
+        """
+        Share of the encoded positions that were padding.
+        """
+        if not self.padded_tokens:
+            return 0.0
+        return 1 - self.tokens / self.padded_tokens
+
+    def __add__(self, other: "BatchingStats") -> "BatchingStats":
+        return BatchingStats(
+            texts=self.texts + other.texts,
+            batches=self.batches + other.batches,
+            tokens=self.tokens + other.tokens,
+            padded_tokens=self.padded_tokens + other.padded_tokens,
+        )
+
+
+def plan_batches(
+    lengths: list[int], token_budget: int, max_batch_size: int
+) -> tuple[list[list[int]], BatchingStats]:
+    """
+    Group text indices into batches of similar token length.
+
+    Texts are taken longest first, and a batch is closed once its padded size
+    (longest length times number of texts) would exceed `token_budget` or it
+    holds `max_batch_size` texts. Returns the batches and their statistics.
+    """
+    order = sorted(range(len(lengths)), key=lambda index: lengths[index], reverse=True)
+    batches: list[list[int]] = []
+    stats = BatchingStats(texts=len(lengths), tokens=sum(lengths))
+
+    current: list[int] = []
+    width = 0
+    for index in order:
+        length = max(1, lengths[index])
+        new_width = max(width, length)
+
+        if current and (
+            new_width * (len(current) + 1) > token_budget
+            or len(current) >= max_batch_size
+        ):
+            batches.append(current)
+            stats.padded_tokens += width * len(current)
+            current, new_width = [], length
+
+        current.append(index)
+        width = new_width
+
+    if current:
+        batches.append(current)
+        stats.padded_tokens += width * len(current)
+
+    stats.batches = len(batches)
+    return batches, stats
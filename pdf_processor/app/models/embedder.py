@@ -1,29 +1,148 @@
 import logging
+from dataclasses import replace
+from typing import Optional
 import numpy as np
-from sentence_transformers import SentenceTransformer
 from app.exceptions import EmbeddingError
+from app.models.backends import load_model
+from app.models.batching import BatchingStats, plan_batches
+from app.models.embedding_cache import CacheStats, EmbeddingCache
 
 logger = logging.getLogger(__name__)
 
 
 class Embedder:
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
+    def __init__(
+        self,
+        model_name: str = "all-MiniLM-L6-v2",
+        cache: Optional[EmbeddingCache] = None,
+        backend: str = "torch",
+        model_cache_dir: str = "model_cache",
+        tolerance: float = 0.01,
+        token_budget: int = 8192,
+        max_batch_size: int = 128,
+    ):
+        self.model_name = model_name
+        self.backend = backend
+        self.cache = cache
+        self.token_budget = token_budget
+        self.max_batch_size = max_batch_size
+        self.batching_stats = BatchingStats()
+        self.last_batching_stats = BatchingStats()
+
         try:
-            self.model = SentenceTransformer(model_name)
+            self.model = load_model(
+                model_name,
+                backend=backend,
+                cache_dir=model_cache_dir,
+                tolerance=tolerance,
+            )
         except Exception as e:
             logger.exception(f"Failed to load SentenceTransformer model: {model_name}")
             raise EmbeddingError(
                 "Failed to initialize the embedding model.", detail=str(e)
             ) from e
 
+    @property
+    def tokenizer(self):
+        return self.model.tokenizer
+
+    @property
+    def max_seq_length(self) -> int:
+        return self.model.max_seq_length
+
+    def cache_stats(self) -> Optional[CacheStats]:
+        """
+        Snapshot of the cache counters for this process, or None without a cache.
+        """
+        if self.cache is None:
+            return None
+        return replace(self.cache.stats)
+
+    def _token_lengths(self, texts: list[str]) -> list[int]:
+        encoded = self.tokenizer(
+            texts, truncation=True, max_length=self.max_seq_length, verbose=False
+        )
+        return [len(input_ids) for input_ids in encoded["input_ids"]]
+
+    def _encode(self, texts: list[str]) -> np.ndarray:
+        """
+        Encode texts in batches of similar token length, sized by a token
+        budget rather than a fixed count, and return them in input order.
+        """
+        if not texts:
+            dimension = self.model.get_sentence_embedding_dimension()
+            return np.empty((0, dimension), dtype=np.float32)
+
+        batches, stats = plan_batches(
+            self._token_lengths(texts), self.token_budget, self.max_batch_size
+        )
+        self.last_batching_stats = stats
+        self.batching_stats += stats
+
+        embeddings: Optional[np.ndarray] = None
+        for batch in batches:
+            encoded = self.model.encode(
+                [texts[index] for index in batch],
+                batch_size=len(batch),
+                show_progress_bar=False,
+                convert_to_numpy=True,
+            )
+            if embeddings is None:
+                embeddings = np.empty((len(texts), encoded.shape[1]), encoded.dtype)
+            embeddings[batch] = encoded
+
+        logger.debug(
+            f"Encoded {stats.texts} texts in {stats.batches} batches "
+            f"({stats.padding_ratio:.1%} padding)"
+        )
+        return embeddings
+
+    def _lookup(self, texts: list[str]) -> dict[int, np.ndarray]:
+        if self.cache is None:
+            return {}
+        try:
+            return self.cache.get_many(texts)
+        except Exception as e:
+            # The cache is only an optimisation; fall back to the model.
+            logger.warning(f"Embedding cache lookup failed: {e}")
+            return {}
+
+    def _store(self, texts: list[str], embeddings: np.ndarray) -> None:
+        if self.cache is None:
+            return
+        try:
+            self.cache.put_many(texts, embeddings)
+        except Exception as e:
+            logger.warning(f"Embedding cache write failed: {e}")
+
     def embed(self, texts: list[str]) -> np.ndarray:
         """
         Convert a list of text chunks into embeddings.
+
+        Texts already in the embedding cache are served from it; only the
+        misses are sent to the model.
         """
         try:
-            return self.model.encode(
-                texts, show_progress_bar=True, convert_to_numpy=True
-            )
+            cached = self._lookup(texts)
+            if not cached:
+                embeddings = self._encode(texts)
+                self._store(texts, embeddings)
+                return embeddings
+
+            missing = [index for index in range(len(texts)) if index not in cached]
+            if not missing:
+                return np.stack([cached[index] for index in range(len(texts))])
+
+            missing_texts = [texts[index] for index in missing]
+            encoded = self._encode(missing_texts)
+            self._store(missing_texts, encoded)
+
+            embeddings = np.empty((len(texts), encoded.shape[1]), dtype=encoded.dtype)
+            for index, vector in cached.items():
+                embeddings[index] = vector
+            embeddings[missing] = encoded
+            return embeddings
+
         except Exception as e:
             logger.exception("An error occurred while generating embeddings.")
             raise EmbeddingError(
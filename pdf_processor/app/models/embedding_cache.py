@@ -0,0 +1,138 @@
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Optional
+import numpy as np
+
+# SQLite limits the number of bound parameters per statement.
+QUERY_BATCH_SIZE = 500
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __sub__(self, other: "CacheStats") -> "CacheStats":
+        return CacheStats(
+            hits=self.hits - other.hits, misses=self.misses - other.misses
+        )
+
+
+class EmbeddingCache:
+    """
+    On-disk embedding cache keyed by a hash of the model name and the
+    whitespace-normalised chunk text, evicting least recently used entries
+    once `max_entries` is exceeded.
+    """
+
+    def __init__(self, path: str, model_name: str, max_entries: int):
+        self.path = path
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.stats = CacheStats()
+
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._conn_pid: Optional[int] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        # Connections must not be shared across a fork.
+        if self._conn is None or self._conn_pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    key TEXT PRIMARY KEY,
+                    vector BLOB NOT NULL,
+                    last_used INTEGER NOT NULL
+                );
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_last_used ON embeddings (last_used)"
+            )
+            conn.commit()
+            self._conn = conn
+            self._conn_pid = os.getpid()
+
+        return self._conn
+
+    def key(self, text: str) -> str:
+        normalised = " ".join(text.split())
+        return hashlib.sha256(
+            f"{self.model_name}\0{normalised}".encode("utf-8")
+        ).hexdigest()
+
+    def get_many(self, texts: list[str]) -> dict[int, np.ndarray]:
+        """
+        Return cached embeddings by position in `texts`, for the texts found.
+        """
+        keys = [self.key(text) for text in texts]
+        found: dict[str, np.ndarray] = {}
+
+        with self._lock:
+            conn = self._connection()
+            unique_keys = list(dict.fromkeys(keys))
+            for i in range(0, len(unique_keys), QUERY_BATCH_SIZE):
+                batch = unique_keys[i : i + QUERY_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    batch,
+                ).fetchall()
+                for key, vector in rows:
+                    found[key] = np.frombuffer(vector, dtype=np.float32)
+
+            if found:
+                now = time.time_ns()
+                conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+                conn.commit()
+
+        hits = {index: found[key] for index, key in enumerate(keys) if key in found}
+        self.stats.hits += len(hits)
+        self.stats.misses += len(texts) - len(hits)
+        return hits
+
+    def put_many(self, texts: list[str], embeddings: np.ndarray) -> None:
+        now = time.time_ns()
+        rows = [
+            (self.key(text), np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for text, vector in zip(texts, embeddings)
+        ]
+
+        with self._lock:
+            conn = self._connection()
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                rows,
+            )
+
+            (count,) = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+            if count > self.max_entries:
+                conn.execute(
+                    """
+                    DELETE FROM embeddings WHERE key IN (
+                        SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?
+                    )
+                    """,
+                    (count - self.max_entries,),
+                )
+            conn.commit()
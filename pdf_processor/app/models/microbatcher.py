@@ -0,0 +1,93 @@
+import os
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Optional
+import numpy as np
+from app.models.embedder import Embedder
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingMicroBatcher:
+    """
+    Merges embedding requests from concurrently running tasks in the same
+    worker process into shared encode calls.
+
+    A background thread takes the first pending request, then keeps collecting
+    more for up to `max_wait` seconds or until `max_batch_size` texts are
+    gathered, encodes them together and hands each task its own slice back.
+    """
+
+    def __init__(self, embedder: Embedder, max_batch_size: int, max_wait: float):
+        self.embedder = embedder
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+
+        self._queue: queue.Queue[tuple[list[str], Future]] = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._thread_pid: Optional[int] = None
+
+    def _ensure_thread(self) -> None:
+        # Threads don't survive a fork, so each pool process starts its own.
+        with self._lock:
+            if self._thread is not None and self._thread_pid == os.getpid():
+                return
+
+            self._queue = queue.Queue()
+            self._thread = threading.Thread(
+                target=self._run, name="embedding-microbatcher", daemon=True
+            )
+            self._thread.start()
+            self._thread_pid = os.getpid()
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """
+        Same contract as `Embedder.embed`; blocks until this request's
+        embeddings are ready.
+        """
+        self._ensure_thread()
+        future: Future = Future()
+        self._queue.put((texts, future))
+        return future.result()
+
+    def _collect(self) -> list[tuple[list[str], Future]]:
+        requests = [self._queue.get()]
+        count = len(requests[0][0])
+        deadline = time.monotonic() + self.max_wait
+
+        while count < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            requests.append(request)
+            count += len(request[0])
+
+        return requests
+
+    def _run(self) -> None:
+        while True:
+            requests = self._collect()
+            texts = [text for request_texts, _ in requests for text in request_texts]
+
+            try:
+                embeddings = self.embedder.embed(texts)
+            except Exception as e:
+                for _, future in requests:
+                    future.set_exception(e)
+                continue
+
+            if len(requests) > 1:
+                logger.debug(f"Merged {len(requests)} embedding requests into one")
+
+            offset = 0
+            for request_texts, future in requests:
+                future.set_result(embeddings[offset : offset + len(request_texts)])
+                offset += len(request_texts)
@@ -0,0 +1,99 @@
+import os
+import logging
+import threading
+from typing import Optional, Union
+from app.config import get_settings
+from app.models.embedder import Embedder
+from app.models.embedding_cache import EmbeddingCache
+from app.models.microbatcher import EmbeddingMicroBatcher
+
+logger = logging.getLogger(__name__)
+
+# One embedder per process. Under the prefork pool it is created in the parent
+# before forking, so every child starts with the weights already mapped.
+_embedder: Optional[Embedder] = None
+_warmed_pid: Optional[int] = None
+_batcher: Optional[EmbeddingMicroBatcher] = None
+_batcher_lock = threading.Lock()
+
+
+def load_embedder() -> Embedder:
+    """
+    Return the process-wide embedder, loading the model on first use.
+    """
+    global _embedder
+
+    if _embedder is None:
+        logger.info("Loading embedding model for worker process")
+        settings = get_settings()
+        cache = None
+        if settings.EMBED_CACHE_MAX_ENTRIES > 0:
+            cache = EmbeddingCache(
+                path=settings.EMBED_CACHE_PATH,
+                # Backends differ slightly numerically, so they don't share entries.
+                model_name=f"{settings.EMBEDDING_MODEL}:{settings.EMBEDDING_BACKEND}",
+                max_entries=settings.EMBED_CACHE_MAX_ENTRIES,
+            )
+        _embedder = Embedder(
+            model_name=settings.EMBEDDING_MODEL,
+            cache=cache,
+            backend=settings.EMBEDDING_BACKEND,
+            model_cache_dir=settings.MODEL_CACHE_DIR,
+            tolerance=settings.EMBEDDING_TOLERANCE,
+            token_budget=settings.EMBED_TOKEN_BUDGET,
+            max_batch_size=settings.EMBED_MAX_BATCH_SIZE,
+        )
+
+    return _embedder
+
+
+def warm_embedder() -> None:
+    """
+    Run a throwaway encode in the current process so lazy allocations and
+    thread pools are set up before the first task arrives.
+    """
+    global _warmed_pid
+
+    embedder = load_embedder()
+    if _warmed_pid == os.getpid():
+        return
+
+    embedder.embed(["warm up"])
+    _warmed_pid = os.getpid()
+    logger.info(f"Embedding model warmed in process {_warmed_pid}")
+
+
+def get_embedder() -> Embedder:
+    return load_embedder()
+
+
+def get_embedding_service(
+    concurrent: bool = False,
+) -> Union[Embedder, EmbeddingMicroBatcher]:
+    """
+    Return what tasks should call `embed` on: the shared micro-batcher when
+    enabled, so concurrent tasks in this process are encoded together, or
+    the embedder itself.
+
+    EMBED_MICROBATCH decides when set; otherwise only callers that embed
+    several documents concurrently in this process (`concurrent`) get the
+    micro-batcher.
+    """
+    global _batcher
+
+    settings = get_settings()
+    enabled = settings.EMBED_MICROBATCH
+    if enabled is None:
+        enabled = concurrent
+    if not enabled:
+        return load_embedder()
+
+    with _batcher_lock:
+        if _batcher is None:
+            _batcher = EmbeddingMicroBatcher(
+                load_embedder(),
+                max_batch_size=settings.EMBED_MICROBATCH_SIZE,
+                max_wait=settings.EMBED_MICROBATCH_WAIT_MS / 1000,
+            )
+
+    return _batcher
@@ -0,0 +1,109 @@
+import time
+import logging
+from typing import Iterable, Iterator, Optional, TypeVar
+from app.queue.sqs import publish_status_to_sqs
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class ProgressReporter:
+    """
+    Publishes "processing" status messages for one document while it is
+    ingested, at most once every `min_interval` seconds.
+
+    Progress is the fraction of pages whose chunks have been embedded and
+    stored, as counted by a `PageCounter`; the ETA extrapolates the time spent
+    so far.
+
+    The tasks of a split document each report their `page_range` against the
+    whole document's page count, along with the document's wall clock
+    `started_at`; the status consumer adds up the ranges and estimates the
+    ETA, since no single range knows how far the others are.
+    """
+
+    def __init__(
+        self,
+        doc_id: str,
+        min_interval: float,
+        total_pages: Optional[int] = None,
+        page_range: Optional[tuple[int, int]] = None,
+        started_at: Optional[float] = None,
+    ):
+        self.doc_id = doc_id
+        self.min_interval = min_interval
+        self.total_pages = total_pages
+        self.page_range = page_range
+        self.started_at = time.time() if started_at is None else started_at
+        self.started = time.monotonic()
+        self._last_sent: Optional[float] = None
+        self._last_progress = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.min_interval > 0
+
+    def start(self, total_pages: int) -> None:
+        self.total_pages = total_pages
+        self.report(pages_done=0, chunks_done=0, force=True)
+
+    def report(self, pages_done: int, chunks_done: int, force: bool = False) -> None:
+        if not self.enabled or not self.total_pages:
+            return
+
+        now = time.monotonic()
+        if (
+            not force
+            and self._last_sent is not None
+            and now - self._last_sent < self.min_interval
+        ):
+            return
+
+        # Never report less than before, e.g. if pages are counted differently
+        # than the document's page tree suggests.
+        progress = max(self._last_progress, min(pages_done / self.total_pages, 0.99))
+        elapsed = now - self.started
+        eta = elapsed * (1 - progress) / progress if progress > 0 else None
+
+        body = {
+            "doc_id": self.doc_id,
+            "status": "processing",
+            "progress": round(progress, 4),
+            "eta_seconds": None if eta is None else round(eta, 1),
+            "pages_done": pages_done,
+            "pages_total": self.total_pages,
+            "chunks_done": chunks_done,
+        }
+        if self.page_range is not None:
+            body.update(
+                eta_seconds=None,
+                page_range=list(self.page_range),
+                started_at=self.started_at,
+            )
+        publish_status_to_sqs(message_body=body)
+        self._last_sent = now
+        self._last_progress = progress
+
+
+class PageCounter:
+    """
+    Counts the pages a chunker has finished with, as it pulls them from
+    `count(pages)`. A page is only done once the chunker asks for the next
+    one, so a batch yielded mid-page does not count that page, and pages
+    read ahead by extraction or boilerplate sampling are not counted at all.
+    """
+
+    def __init__(self):
+        self.started = 0
+        self.exhausted = False
+
+    def count(self, pages: Iterable[T]) -> Iterator[T]:
+        for page in pages:
+            self.started += 1
+            yield page
+        self.exhausted = True
+
+    @property
+    def done(self) -> int:
+        return self.started if self.exhausted else max(0, self.started - 1)
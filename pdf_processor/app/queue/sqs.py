@@ -1,40 +1,192 @@
+import os
 import json
+import time
+import atexit
 import logging
+import threading
+from typing import Any, Optional
 import boto3
+from botocore.client import BaseClient
 from app.config import get_settings
 
+# SQS accepts at most 10 entries per send_message_batch call.
+MAX_BATCH_SIZE = 10
+
 logger = logging.getLogger(__name__)
 
 
-def publish_status_to_sqs(message_body: dict):
+class StatusPublisher:
     """
-    Publishes a raw JSON message to a specific Amazon SQS queue.
+    Buffers status messages and sends them to SQS with `send_message_batch`.
 
-    This function connects to your SQS broker and sends a message
-    without using the Celery task protocol.
+    A batch is sent as soon as `max_batch_size` messages are buffered, or
+    `flush_interval` seconds after the first buffered message. Entries that
+    SQS reports as failed are retried up to `max_retries` times.
+    """
 
-    Args:
-        queue_name (str): The name of the SQS queue (e.g., 'askpdf').
-        message_body (dict): The Python dictionary to be sent as the message body.
+    def __init__(
+        self,
+        client: BaseClient,
+        queue_url: str,
+        max_batch_size: int = MAX_BATCH_SIZE,
+        flush_interval: float = 0.5,
+        max_retries: int = 3,
+    ):
+        self.client = client
+        self.queue_url = queue_url
+        self.max_batch_size = min(max(1, max_batch_size), MAX_BATCH_SIZE)
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+
+        self._buffer: list[dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def publish(self, message_body: dict):
+        with self._lock:
+            self._buffer.append(message_body)
+            full = len(self._buffer) >= self.max_batch_size
+            self._ensure_thread()
+
+        if full:
+            self.flush()
+        else:
+            self._wakeup.set()
+
+    def flush(self):
+        """
+        Send everything buffered so far.
+        """
+        with self._send_lock:
+            while True:
+                with self._lock:
+                    batch = self._buffer[: self.max_batch_size]
+                    del self._buffer[: self.max_batch_size]
+                if not batch:
+                    return
+                self._send_batch(batch)
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._run, name="sqs-status-publisher", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Failed to flush status messages: {e}")
+
+    def _send_batch(self, batch: list[dict[str, Any]]):
+        entries = {
+            str(index): json.dumps(message) for index, message in enumerate(batch)
+        }
+
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(min(0.1 * 2**attempt, 2.0))
+
+            try:
+                response = self.client.send_message_batch(
+                    QueueUrl=self.queue_url,
+                    Entries=[
+                        {"Id": entry_id, "MessageBody": body}
+                        for entry_id, body in entries.items()
+                    ],
+                )
+            except Exception as e:
+                logger.warning(
+                    f"send_message_batch failed (attempt {attempt + 1}): {e}"
+                )
+                continue
+
+            failed = response.get("Failed", [])
+            for failure in failed:
+                if failure.get("SenderFault"):
+                    logger.error(
+                        f"SQS rejected status message {entries[failure['Id']]}: "
+                        f"{failure.get('Message')}"
+                    )
+            entries = {
+                failure["Id"]: entries[failure["Id"]]
+                for failure in failed
+                if not failure.get("SenderFault")
+            }
+
+            if not entries:
+                logger.info(
+                    f"Published {len(batch)} status messages to {self.queue_url}"
+                )
+                return
+
+        logger.error(
+            f"Failed to publish message to SQS queue '{self.queue_url}' "
+            f"after {self.max_retries} retries: {list(entries.values())}"
+        )
+
+
+_publisher: Optional[StatusPublisher] = None
+_publisher_pid: Optional[int] = None
+
+
+def get_publisher() -> StatusPublisher:
+    """
+    Return the process-wide publisher, creating its SQS client on first use.
     """
-    settings = get_settings()
+    global _publisher, _publisher_pid
 
-    try:
-        sqs = boto3.client(
+    if _publisher is None or _publisher_pid != os.getpid():
+        settings = get_settings()
+        client = boto3.client(
             "sqs",
             region_name=settings.AWS_REGION,
             aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
             aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+            endpoint_url=settings.AWS_ENDPOINT_URL,
         )
-
-        sqs.send_message(
-            QueueUrl=settings.SQS_QUEUE, MessageBody=json.dumps(message_body)
+        _publisher = StatusPublisher(
+            client,
+            queue_url=settings.SQS_QUEUE,
+            max_batch_size=settings.SQS_BATCH_SIZE,
+            flush_interval=settings.SQS_FLUSH_INTERVAL_MS / 1000,
         )
+        _publisher_pid = os.getpid()
+
+    return _publisher
+
+
+def flush_status_messages():
+    if _publisher is not None and _publisher_pid == os.getpid():
+        _publisher.flush()
+
+
+atexit.register(flush_status_messages)
+
 
-        logger.info(f"Successfully published message to SQS queue {settings.SQS_QUEUE}")
+def publish_status_to_sqs(message_body: dict):
+    """
+    Publishes a raw JSON message to a specific Amazon SQS queue.
+
+    This function connects to your SQS broker and sends a message
+    without using the Celery task protocol. Messages are buffered by the
+    process-wide publisher and sent in batches.
+
+    Args:
+        message_body (dict): The Python dictionary to be sent as the message body.
+    """
+    try:
+        get_publisher().publish(message_body)
         logger.info(f"Message Body: {json.dumps(message_body)}")
 
     except Exception as e:
         # It's good practice to log any potential errors.
-        logger.error(f"Failed to publish message to SQS queue '{settings.SQS_QUEUE}'.")
+        logger.error("Failed to queue status message for SQS.")
         logger.error(f"Exception: {e}")
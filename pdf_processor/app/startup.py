@@ -0,0 +1,191 @@
+"""
+Worker startup: the warm-up phase, the readiness signal and a profiler.
+
+Importing the worker's modules is kept cheap; torch, sentence-transformers
+and the model weights are loaded once, in `warm_up`, before the worker
+consumes tasks. When the worker is ready to accept its first task it writes
+the startup profile to `READY_FILE`, which the container health check tests.
+
+    python -m app.startup profile   # time each startup phase in-process
+    python -m app.startup bake      # fill MODEL_CACHE_DIR at image build
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+# Taken when `app.celery_app` first imports this module, i.e. right after the
+# Celery command line has been imported.
+IMPORTED_AT = time.perf_counter()
+
+logger = logging.getLogger(__name__)
+
+
+def process_age() -> Optional[float]:
+    """
+    Seconds since this process was started, from /proc; None elsewhere.
+    """
+    try:
+        with open("/proc/self/stat") as f:
+            # The command name may contain spaces, so split after it.
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return uptime - int(fields[19]) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class StartupProfile:
+    """
+    Wall-clock seconds spent in each startup phase.
+    """
+
+    def __init__(self):
+        self.phases: dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - start
+            logger.info(f"Startup phase {name} took {self.phases[name]:.3f}s")
+
+    def to_dict(self) -> dict[str, Any]:
+        age = process_age()
+        return {
+            "pid": os.getpid(),
+            "phases": {
+                name: round(seconds, 4) for name, seconds in self.phases.items()
+            },
+            "since_import_seconds": round(time.perf_counter() - IMPORTED_AT, 4),
+            "since_process_start_seconds": None if age is None else round(age, 4),
+        }
+
+
+profile = StartupProfile()
+
+
+def warm_up() -> None:
+    """
+    Do everything the first task would otherwise pay for: import torch and
+    sentence-transformers, load the embedding model and create the clients.
+    """
+    with profile.phase("import_models"):
+        import sentence_transformers  # noqa: F401
+
+    with profile.phase("load_model"):
+        from app.models.registry import load_embedder
+
+        load_embedder()
+
+    with profile.phase("clients"):
+        from app.queue.sqs import get_publisher
+        from app.store.s3 import get_s3_client
+
+        get_s3_client()
+        get_publisher()
+
+
+def mark_ready(path: str, budget: float) -> dict[str, Any]:
+    """
+    Write the startup profile to `path` to signal that the worker accepts
+    tasks, and warn when startup took longer than `budget` seconds.
+    """
+    report = profile.to_dict()
+    elapsed = report["since_process_start_seconds"] or report["since_import_seconds"]
+    report["budget_seconds"] = budget
+    report["within_budget"] = not budget or elapsed <= budget
+
+    if path:
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(report, f)
+        os.replace(tmp_path, path)
+
+    if report["within_budget"]:
+        logger.info(f"Worker ready after {elapsed:.2f}s: {report['phases']}")
+    else:
+        logger.warning(
+            f"Worker ready after {elapsed:.2f}s, over the {budget:g}s startup "
+            f"budget: {report['phases']}"
+        )
+    return report
+
+
+def mark_not_ready(path: str) -> None:
+    if path:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def bake(model_name: str, backend: str, cache_dir: str, tolerance: float) -> None:
+    """
+    Download the model into `cache_dir`, and export and validate it for the
+    ONNX backends, so a container started from the image never fetches it.
+    """
+    from app.models.backends import load_model
+
+    model = load_model(model_name, backend, cache_dir, tolerance)
+    model.encode(["warm up"])
+    logger.info(f"Baked {model_name} ({backend}) into {cache_dir}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker startup tools.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser(
+        "profile", help="Time importing the tasks and warming up, in-process"
+    )
+
+    bake_parser = commands.add_parser(
+        "bake", help="Download the embedding model into the model cache"
+    )
+    # Read from the environment directly: an image build has no queues or
+    # credentials for the full Settings.
+    bake_parser.add_argument(
+        "--model", default=os.environ.get("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+    )
+    bake_parser.add_argument(
+        "--backend", default=os.environ.get("EMBEDDING_BACKEND", "torch")
+    )
+    bake_parser.add_argument(
+        "--cache-dir", default=os.environ.get("MODEL_CACHE_DIR", "model_cache")
+    )
+    bake_parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=float(os.environ.get("EMBEDDING_TOLERANCE", "0.01")),
+    )
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+
+    if args.command == "bake":
+        bake(args.model, args.backend, args.cache_dir, args.tolerance)
+        return
+
+    with profile.phase("import_tasks"):
+        import app.tasks.process_pdf  # noqa: F401
+
+    warm_up()
+    with profile.phase("warm_encode"):
+        from app.models.registry import warm_embedder
+
+        warm_embedder()
+
+    print(json.dumps(profile.to_dict(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
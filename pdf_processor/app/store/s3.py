@@ -0,0 +1,31 @@
+import os
+from typing import Optional
+import boto3
+from botocore.client import BaseClient
+from botocore.config import Config
+from app.config import get_settings
+
+_client: Optional[BaseClient] = None
+_client_pid: Optional[int] = None
+
+
+def get_s3_client() -> BaseClient:
+    """
+    Return the process-wide S3 client, creating it on first use so importing
+    the tasks module doesn't build one.
+    """
+    global _client, _client_pid
+
+    if _client is None or _client_pid != os.getpid():
+        settings = get_settings()
+        _client = boto3.client(
+            "s3",
+            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+            region_name=settings.AWS_REGION,
+            endpoint_url=settings.AWS_ENDPOINT_URL,
+            config=Config(signature_version="s3v4"),
+        )
+        _client_pid = os.getpid()
+
+    return _client
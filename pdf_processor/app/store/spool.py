@@ -0,0 +1,221 @@
+import io
+import os
+import json
+import shutil
+import logging
+from typing import Any, Callable, Iterable, Iterator, Optional, Protocol
+import numpy as np
+from botocore.client import BaseClient
+from botocore.exceptions import ClientError
+from app.exceptions import DocumentLoadError
+
+MANIFEST = "manifest.json"
+# Spools written in another layout are discarded rather than misread.
+VERSION = 2
+# Stages are written in parts of about this size, so neither saving nor
+# resuming a stage holds all of its items in memory.
+PART_BYTES = 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+class SpoolStorage(Protocol):
+    def read(self, name: str) -> Optional[bytes]: ...
+
+    def write(self, name: str, data: bytes) -> None: ...
+
+    def clear(self) -> None: ...
+
+
+class LocalSpoolStorage:
+    """
+    Spool files in a directory on local disk.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def read(self, name: str) -> Optional[bytes]:
+        try:
+            with open(os.path.join(self.path, name), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def write(self, name: str, data: bytes) -> None:
+        os.makedirs(self.path, exist_ok=True)
+        path = os.path.join(self.path, name)
+        # Written under a temporary name first, so a crash never leaves a
+        # truncated checkpoint behind.
+        with open(f"{path}.tmp", "wb") as f:
+            f.write(data)
+        os.replace(f"{path}.tmp", path)
+
+    def clear(self) -> None:
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+class S3SpoolStorage:
+    """
+    Spool objects under a prefix in an S3 bucket, so a retry that lands on
+    another worker still finds them.
+    """
+
+    def __init__(self, s3: BaseClient, bucket: str, prefix: str):
+        self.s3 = s3
+        self.bucket = bucket
+        self.prefix = prefix.rstrip("/")
+
+    def read(self, name: str) -> Optional[bytes]:
+        try:
+            response = self.s3.get_object(
+                Bucket=self.bucket, Key=f"{self.prefix}/{name}"
+            )
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+                return None
+            raise
+        return response["Body"].read()
+
+    def write(self, name: str, data: bytes) -> None:
+        self.s3.put_object(Bucket=self.bucket, Key=f"{self.prefix}/{name}", Body=data)
+
+    def clear(self) -> None:
+        paginator = self.s3.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=f"{self.prefix}/"):
+            keys = [{"Key": item["Key"]} for item in page.get("Contents", [])]
+            if keys:
+                self.s3.delete_objects(Bucket=self.bucket, Delete={"Objects": keys})
+
+
+def spool_storage(uri: str, name: str, s3: BaseClient) -> SpoolStorage:
+    """
+    Storage for spool `name` under `uri`: a local directory, or an S3
+    location written as s3://bucket/prefix.
+    """
+    if uri.startswith("s3://"):
+        bucket, _, prefix = uri[len("s3://") :].partition("/")
+        return S3SpoolStorage(s3, bucket, f"{prefix.strip('/')}/{name}".lstrip("/"))
+    return LocalSpoolStorage(os.path.join(uri, name))
+
+
+class IngestSpool:
+    """
+    Checkpoints of one ingestion, so a retried task resumes where the failed
+    attempt stopped instead of starting over.
+
+    Stages are saved as they are produced: the extracted page texts and the
+    chunks, as JSON lines in parts of about PART_BYTES, and per embed batch
+    the embeddings (as .npy) and a marker once the batch is upserted. A
+    stage only counts once all of its parts are written. `fingerprint`
+    describes everything the checkpoints depend on (the object, chunking and
+    embedding settings, the batch size); a spool written with a different
+    fingerprint is discarded.
+    """
+
+    def __init__(self, storage: SpoolStorage, fingerprint: dict[str, Any]):
+        self.storage = storage
+        self.fingerprint = fingerprint
+        self.manifest: dict[str, Any] = {"version": VERSION, "fingerprint": fingerprint}
+
+        data = storage.read(MANIFEST)
+        if data is not None:
+            manifest = json.loads(data)
+            if (
+                manifest.get("version") == VERSION
+                and manifest.get("fingerprint") == fingerprint
+            ):
+                self.manifest = manifest
+            else:
+                logger.info("Discarding checkpoints written with other settings")
+                storage.clear()
+
+    @property
+    def page_count(self) -> Optional[int]:
+        return self.manifest.get("page_count")
+
+    @page_count.setter
+    def page_count(self, value: int) -> None:
+        self.manifest["page_count"] = value
+        self._save_manifest()
+
+    def _save_manifest(self) -> None:
+        self.storage.write(MANIFEST, json.dumps(self.manifest).encode("utf-8"))
+
+    def has(self, stage: str) -> bool:
+        return stage in self.manifest.get("stages", [])
+
+    def load(self, stage: str) -> Optional[Iterator[Any]]:
+        """
+        The items saved for a completed stage, read lazily part by part, or
+        None.
+        """
+        if not self.has(stage):
+            return None
+        return self._read_parts(stage, self.manifest["parts"][stage])
+
+    def _read_parts(self, stage: str, parts: int) -> Iterator[Any]:
+        for part in range(parts):
+            data = self.storage.read(f"{stage}-{part:05d}.jsonl")
+            if data is None:
+                raise DocumentLoadError(
+                    "Spooled stage is incomplete.",
+                    detail={"stage": stage, "part": part},
+                )
+            for line in data.decode("utf-8").splitlines():
+                yield json.loads(line)
+
+    def tee(
+        self,
+        stage: str,
+        items: Iterable[Any],
+        encode: Optional[Callable[[Any], Any]] = None,
+    ) -> Iterator[Any]:
+        """
+        Pass `items` through, saving them (or what `encode` makes of them, for
+        items that aren't JSON-serializable) as `stage`. Items are written a
+        part at a time as they are produced; the stage is marked complete
+        once all were produced.
+        """
+        parts = 0
+        lines: list[bytes] = []
+        size = 0
+        for item in items:
+            line = json.dumps(item if encode is None else encode(item)) + "\n"
+            lines.append(line.encode("utf-8"))
+            size += len(lines[-1])
+            if size >= PART_BYTES:
+                self._write_part(stage, parts, lines)
+                parts += 1
+                lines, size = [], 0
+            yield item
+
+        if lines:
+            self._write_part(stage, parts, lines)
+            parts += 1
+        self.manifest.setdefault("parts", {})[stage] = parts
+        self.manifest.setdefault("stages", []).append(stage)
+        self._save_manifest()
+
+    def _write_part(self, stage: str, part: int, lines: list[bytes]) -> None:
+        self.storage.write(f"{stage}-{part:05d}.jsonl", b"".join(lines))
+
+    def load_embeddings(self, batch: int) -> Optional[np.ndarray]:
+        data = self.storage.read(f"embeddings-{batch:05d}.npy")
+        if data is None:
+            return None
+        return np.load(io.BytesIO(data), allow_pickle=False)
+
+    def save_embeddings(self, batch: int, embeddings: np.ndarray) -> None:
+        buffer = io.BytesIO()
+        np.save(buffer, np.asarray(embeddings), allow_pickle=False)
+        self.storage.write(f"embeddings-{batch:05d}.npy", buffer.getvalue())
+
+    def is_upserted(self, batch: int) -> bool:
+        return self.storage.read(f"upserted-{batch:05d}") is not None
+
+    def mark_upserted(self, batch: int) -> None:
+        self.storage.write(f"upserted-{batch:05d}", b"")
+
+    def clear(self) -> None:
+        self.storage.clear()
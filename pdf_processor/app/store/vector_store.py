@@ -1,12 +1,68 @@
-from typing import Any
+import os
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Iterable, Optional, Union
+import httpx
 import numpy as np
 from chromadb import HttpClient
+from chromadb.api import ClientAPI
 from chromadb.config import Settings
 import logging
-from app.exceptions import VectorStoreError
+from app.config import get_settings
+from app.exceptions import VectorStoreError, VectorStoreUnavailableError
+from app.document_processing.chunk_batch import ChunkBatch
 
 logger = logging.getLogger(__name__)
 
+# Chroma couldn't be reached or didn't answer in time, as opposed to a
+# request it rejected: only these are worth retrying.
+UNAVAILABLE_ERRORS = (httpx.TransportError, ConnectionError, TimeoutError)
+
+
+def _error_class(error: Exception) -> type[VectorStoreError]:
+    if isinstance(error, UNAVAILABLE_ERRORS):
+        return VectorStoreUnavailableError
+    return VectorStoreError
+
+
+def chunk_metadata(chunk: dict[str, Any]) -> dict[str, Any]:
+    """
+    Everything on a chunk except its text is stored as metadata, e.g. doc_id,
+    chunk_id and, when the chunker provides them, page and character offsets.
+    """
+    return {key: value for key, value in chunk.items() if key != "text"}
+
+
+def chunk_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def chunk_vector_id(chunk: dict[str, Any]) -> str:
+    return f"{chunk['doc_id']}_{chunk['chunk_id']}"
+
+
+@dataclass
+class StoredChunk:
+    """
+    A chunk already in the collection, with its embedding.
+    """
+
+    metadata: dict[str, Any]
+    embedding: np.ndarray
+
+    @property
+    def chunk_hash(self) -> Optional[str]:
+        return self.metadata.get("chunk_hash")
+
+    def matches(self, chunk: dict[str, Any]) -> bool:
+        """
+        True if writing `chunk` would store exactly what is already stored.
+        """
+        expected = chunk_metadata(chunk)
+        expected["chunk_hash"] = chunk_hash(chunk["text"])
+        return all(self.metadata.get(key) == value for key, value in expected.items())
+
 
 class VectorStore:
     def __init__(
@@ -16,9 +72,17 @@ class VectorStore:
         port: int,
         auth_credentials: str,
         token_header: str = "Authorization",
+        batch_size: int = 128,
+        max_in_flight: int = 2,
+        client: Optional[ClientAPI] = None,
     ):
+        self.batch_size = max(1, batch_size)
+        self.max_in_flight = max(1, max_in_flight)
+
         try:
-            self.client = HttpClient(
+            # An already configured client (e.g. an in-process one for the
+            # benchmarks) takes the place of the HTTP connection settings.
+            self.client = client or HttpClient(
                 host=host,
                 port=port,
                 settings=Settings(
@@ -32,24 +96,65 @@ class VectorStore:
 
         except Exception as e:
             logger.exception(f"Failed to initialize VectorStore: {e}")
-            raise VectorStoreError(
+            raise _error_class(e)(
                 "Vector store initialization failed.", detail=str(e)
             ) from e
 
-    def add_embeddings(self, chunks: list[dict[str, Any]], embeddings: np.ndarray):
+    def _upsert_batch(self, chunks: ChunkBatch, embeddings: np.ndarray):
+        # The chunk texts are only materialized here, once for the documents
+        # and their hashes.
+        texts = chunks.texts()
+        metadatas = chunks.metadatas()
+        for text, metadata in zip(texts, metadatas):
+            metadata["chunk_hash"] = chunk_hash(text)
+
+        # Ids are derived from doc_id and chunk_id, so a retried task overwrites
+        # the vectors it already wrote instead of failing on duplicate ids.
+        self.collection.upsert(
+            embeddings=embeddings,
+            documents=texts,
+            metadatas=metadatas,
+            ids=chunks.ids(),
+        )
+
+    def add_embeddings(
+        self,
+        chunks: Union[ChunkBatch, list[dict[str, Any]]],
+        embeddings: np.ndarray,
+    ):
         """
-        Store embedded chunks into the Chroma collection.
+        Store embedded chunks, a ChunkBatch or chunk dicts, into the Chroma
+        collection.
+
+        Chunks are written in batches of `batch_size`, with at most
+        `max_in_flight` batches being sent at the same time.
         """
         try:
-            self.collection.add(
-                embeddings=embeddings,
-                documents=[chunk["text"] for chunk in chunks],
-                metadatas=[
-                    {"doc_id": chunk["doc_id"], "chunk_id": chunk["chunk_id"]}
-                    for chunk in chunks
-                ],
-                ids=[f"{chunk['doc_id']}_{chunk['chunk_id']}" for chunk in chunks],
-            )
+            if isinstance(chunks, list):
+                chunks = ChunkBatch.from_chunks(chunks)
+
+            if len(chunks) != len(embeddings):
+                raise ValueError(
+                    f"Got {len(chunks)} chunks but {len(embeddings)} embeddings."
+                )
+
+            batches = [
+                (chunks[i : i + self.batch_size], embeddings[i : i + self.batch_size])
+                for i in range(0, len(chunks), self.batch_size)
+            ]
+
+            if len(batches) <= 1 or self.max_in_flight == 1:
+                for batch_chunks, batch_embeddings in batches:
+                    self._upsert_batch(batch_chunks, batch_embeddings)
+                return
+
+            with ThreadPoolExecutor(max_workers=self.max_in_flight) as executor:
+                futures = [
+                    executor.submit(self._upsert_batch, batch_chunks, batch_embeddings)
+                    for batch_chunks, batch_embeddings in batches
+                ]
+                for future in futures:
+                    future.result()
 
         except (KeyError, ValueError, TypeError) as e:
             logger.error(f"Failed to prepare or add embeddings: {e}")
@@ -60,6 +165,170 @@ class VectorStore:
 
         except Exception as e:
             logger.exception(f"Unexpected error in add_embeddings: {e}")
-            raise VectorStoreError(
+            raise _error_class(e)(
                 "An unexpected error occurred while storing embeddings.", detail=str(e)
             ) from e
+
+    def get_document_chunks(self, doc_id: str) -> dict[str, StoredChunk]:
+        """
+        Return every stored chunk of `doc_id` by vector id, with metadata and
+        embedding but without the chunk text.
+        """
+        stored: dict[str, StoredChunk] = {}
+        try:
+            while True:
+                result = self.collection.get(
+                    where={"doc_id": doc_id},
+                    limit=self.batch_size,
+                    offset=len(stored),
+                    include=["embeddings", "metadatas"],
+                )
+                if not result["ids"]:
+                    return stored
+
+                for vector_id, embedding, metadata in zip(
+                    result["ids"], result["embeddings"], result["metadatas"]
+                ):
+                    stored[vector_id] = StoredChunk(
+                        dict(metadata), np.asarray(embedding, dtype=np.float32)
+                    )
+
+        except Exception as e:
+            logger.exception(f"Failed to fetch stored chunks of {doc_id}: {e}")
+            raise _error_class(e)(
+                "An unexpected error occurred while reading a document.",
+                detail=str(e),
+            ) from e
+
+    def has_document(self, doc_id: str) -> bool:
+        """
+        Whether any chunk of `doc_id` is stored.
+        """
+        try:
+            result = self.collection.get(where={"doc_id": doc_id}, limit=1, include=[])
+            return bool(result["ids"])
+
+        except Exception as e:
+            logger.exception(f"Failed to look up stored chunks of {doc_id}: {e}")
+            raise _error_class(e)(
+                "An unexpected error occurred while looking up a document.",
+                detail=str(e),
+            ) from e
+
+    def delete_chunks(self, ids: Iterable[str]):
+        ids = list(ids)
+        try:
+            for i in range(0, len(ids), self.batch_size):
+                self.collection.delete(ids=ids[i : i + self.batch_size])
+
+        except Exception as e:
+            logger.exception(f"Failed to delete {len(ids)} chunks: {e}")
+            raise _error_class(e)(
+                "An unexpected error occurred while deleting chunks.", detail=str(e)
+            ) from e
+
+    def find_document_by_hash(self, content_hash: str) -> Optional[str]:
+        """
+        Return the doc_id of a fully ingested document with the given content
+        hash, if there is one.
+        """
+        try:
+            result = self.collection.get(
+                where={"content_hash": content_hash}, limit=1, include=["metadatas"]
+            )
+            metadatas = result["metadatas"] or []
+            return str(metadatas[0]["doc_id"]) if metadatas else None
+
+        except Exception as e:
+            logger.exception(f"Failed to look up content hash {content_hash}: {e}")
+            raise _error_class(e)(
+                "An unexpected error occurred while looking up a document.",
+                detail=str(e),
+            ) from e
+
+    def register_document(self, doc_id: str, content_hash: str):
+        """
+        Mark an ingested document as the source for its content hash.
+
+        Only one chunk carries the hash, and it is written after all chunks
+        were stored, so a lookup never finds a partially ingested document.
+        """
+        try:
+            result = self.collection.get(
+                where={"doc_id": doc_id}, limit=1, include=["metadatas"]
+            )
+            if not result["ids"]:
+                return
+
+            metadata = dict(result["metadatas"][0])
+            metadata["content_hash"] = content_hash
+            self.collection.update(ids=result["ids"][:1], metadatas=[metadata])
+
+        except Exception as e:
+            logger.exception(f"Failed to register content hash for {doc_id}: {e}")
+            raise _error_class(e)(
+                "An unexpected error occurred while registering a document.",
+                detail=str(e),
+            ) from e
+
+    def copy_document(self, source_doc_id: str, doc_id: str) -> int:
+        """
+        Copy every stored chunk of `source_doc_id` under `doc_id`, reusing the
+        stored embeddings. Returns the number of chunks copied.
+        """
+        copied = 0
+        try:
+            while True:
+                result = self.collection.get(
+                    where={"doc_id": source_doc_id},
+                    limit=self.batch_size,
+                    offset=copied,
+                    include=["embeddings", "documents", "metadatas"],
+                )
+                if not result["ids"]:
+                    return copied
+
+                metadatas = [
+                    {**metadata, "doc_id": doc_id} for metadata in result["metadatas"]
+                ]
+                self.collection.upsert(
+                    embeddings=result["embeddings"],
+                    documents=result["documents"],
+                    metadatas=metadatas,
+                    ids=[f"{doc_id}_{metadata['chunk_id']}" for metadata in metadatas],
+                )
+                copied += len(result["ids"])
+
+        except Exception as e:
+            logger.exception(f"Failed to copy {source_doc_id} to {doc_id}: {e}")
+            raise _error_class(e)(
+                "An unexpected error occurred while copying a document.", detail=str(e)
+            ) from e
+
+
+# One client per worker process, keyed by pid so a forked child never reuses
+# the parent's HTTP connections.
+_vector_store: Optional[VectorStore] = None
+_vector_store_pid: Optional[int] = None
+
+
+def get_vector_store() -> VectorStore:
+    """
+    Return the long-lived VectorStore for the current process.
+    """
+    global _vector_store, _vector_store_pid
+
+    if _vector_store is None or _vector_store_pid != os.getpid():
+        settings = get_settings()
+        _vector_store = VectorStore(
+            collection_name=settings.COLLECTION_NAME,
+            host=settings.VDB_URI,
+            port=settings.VDB_PORT,
+            auth_credentials=settings.VDB_SECRET_KEY,
+            token_header=settings.VDB_HEADER,
+            batch_size=settings.VDB_BATCH_SIZE,
+            max_in_flight=settings.VDB_MAX_IN_FLIGHT,
+        )
+        _vector_store_pid = os.getpid()
+
+    return _vector_store
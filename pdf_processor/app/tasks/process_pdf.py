@@ -1,71 +1,717 @@
-import boto3
+import os
 import logging
-from typing import Literal, Optional
-from botocore.config import Config
-from app.models.embedder import Embedder
-from app.document_processing.document_loader import load_documents
+from contextlib import ExitStack, contextmanager
+from typing import IO, Any, Iterator, Literal, Optional
+import numpy as np
+from celery import chord, group
+from celery.utils.time import get_exponential_backoff_interval
+from app.models.registry import get_embedder, get_embedding_service
+from app.document_processing.document_loader import (
+    count_pages,
+    get_content_hash,
+    load_documents,
+    open_document,
+    stream_pages,
+)
+from app.document_processing.boilerplate import BoilerplateStripper, dedupe_batches
+from app.document_processing.chunk_batch import ChunkBatch
+from app.document_processing.chunker import Chunker, build_chunker
+from app.document_processing.extraction import ExtractionLimits
 from app.queue.sqs import publish_status_to_sqs
+from app.queue.progress import PageCounter, ProgressReporter
 from app.config import get_settings
-from app.store.vector_store import VectorStore
-from app.exceptions import DocumentLoadError, VectorStoreError, EmbeddingError
+from app.store.s3 import get_s3_client
+from app.store.spool import IngestSpool, spool_storage
+from app.store.vector_store import chunk_hash, chunk_vector_id, get_vector_store
+from app.exceptions import (
+    DocumentDownloadError,
+    DocumentLoadError,
+    EmbeddingError,
+    ExtractionLimitError,
+    VectorStoreError,
+    VectorStoreUnavailableError,
+)
 from app.celery_app import celery_app
+from app.metrics import IngestMetrics
 
 print("Loading function")
 
+# Chunk ids reserved per page for the page ranges of a split document.
+CHUNK_IDS_PER_PAGE = 1000
+
 logger = logging.getLogger(__name__)
 
 settings = get_settings()
 
-s3 = boto3.client(
-    "s3",
-    aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-    aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-    region_name=settings.AWS_REGION,
-    config=Config(signature_version="s3v4"),
+# Failures worth retrying: the document and the checkpoints of the failed
+# attempt are still good, only S3 or the vector store was unavailable.
+TRANSIENT_ERRORS = (DocumentDownloadError, VectorStoreUnavailableError)
+
+extraction_limits = ExtractionLimits(
+    timeout=settings.EXTRACT_TIMEOUT_S,
+    cpu_seconds=settings.EXTRACT_CPU_LIMIT_S,
+    memory_bytes=settings.EXTRACT_MEMORY_LIMIT_MB * 1024 * 1024,
 )
 
 
 def send_status_update(
-    doc_id: str, status: Literal["success", "failed"], reason: Optional[str] = None
+    doc_id: str,
+    status: Literal["success", "failed"],
+    reason: Optional[str] = None,
+    metrics: Optional[IngestMetrics] = None,
 ):
     body = {"doc_id": doc_id, "status": status, "reason": reason}
-    publish_status_to_sqs(message_body=body)
+    if metrics is None:
+        publish_status_to_sqs(message_body=body)
+        return
 
+    # The publish time itself only makes it into the histograms.
+    body["metrics"] = metrics.to_dict()
+    logger.info(f"Ingestion metrics for {doc_id}: {body['metrics']}")
+    with metrics.stage("publish"):
+        publish_status_to_sqs(message_body=body)
+    metrics.observe(status)
 
-@celery_app.task
-def process_pdf(doc_id, key):
-    try:
+
+def ingest_document(doc_id: str, key: str, metrics: IngestMetrics):
+    """
+    Load the whole document, embed every chunk and store them in one pass.
+    """
+    with metrics.stage("load"):
         chunks = load_documents(
-            bucket=settings.BUCKET_NAME, key=key, s3=s3, doc_id=doc_id
+            bucket=settings.BUCKET_NAME,
+            key=key,
+            s3=get_s3_client(),
+            doc_id=doc_id,
+            strip_boilerplate=settings.STRIP_BOILERPLATE,
+            counts=metrics.items,
+            extract_workers=settings.EXTRACT_WORKERS,
+            limits=extraction_limits,
         )
-        texts = [chunk["text"] for chunk in chunks]
+        if settings.DEDUPLICATE_CHUNKS:
+            chunks = next(
+                dedupe_batches([chunks], counts=metrics.items), ChunkBatch.empty(doc_id)
+            )
+        texts = chunks.texts()
+    metrics.items["chunk"] = len(chunks)
 
-        embedder = Embedder()
-        embeddings = embedder.embed(texts)
+    with metrics.stage("embed"):
+        embeddings = get_embedding_service().embed(texts)
 
-        vector_store = VectorStore(
-            collection_name=settings.COLLECTION_NAME,
-            host=settings.VDB_URI,
-            port=settings.VDB_PORT,
-            auth_credentials=settings.VDB_SECRET_KEY,
-        )
+    with metrics.stage("upsert"):
+        vector_store = get_vector_store()
         vector_store.add_embeddings(chunks, embeddings)
 
-        send_status_update(doc_id, "success")
 
-    except DocumentLoadError:
-        send_status_update(doc_id, "failed", "Failed to load document for processing")
+@contextmanager
+def download_document(key: str, metrics: IngestMetrics) -> Iterator[IO[bytes]]:
+    with ExitStack() as stack:
+        with metrics.stage("download"):
+            pdf_file = stack.enter_context(
+                open_document(
+                    bucket=settings.BUCKET_NAME,
+                    key=key,
+                    s3=get_s3_client(),
+                    part_size=settings.S3_PART_SIZE_MB * 1024 * 1024,
+                    max_concurrency=settings.S3_MAX_CONCURRENCY,
+                )
+            )
+        metrics.size_bytes = os.path.getsize(pdf_file.name)
+        yield pdf_file
 
-    except EmbeddingError:
-        send_status_update(
-            doc_id, "failed", "Failed to create embeddings of the document"
+
+def open_spool(
+    doc_id: str, key: str, page_range: Optional[tuple[int, int]] = None
+) -> Optional[IngestSpool]:
+    """
+    The checkpoints of earlier attempts to ingest `doc_id` (or a page range
+    of it), or None when spooling is disabled or the spool is unavailable.
+    """
+    if not settings.SPOOL_URI:
+        return None
+
+    name = (
+        doc_id
+        if page_range is None
+        else f"{doc_id}-pages-{page_range[0]}-{page_range[1]}"
+    )
+    fingerprint = {
+        "key": key,
+        "page_range": None if page_range is None else list(page_range),
+        "model": f"{settings.EMBEDDING_MODEL}:{settings.EMBEDDING_BACKEND}",
+        "chunker": [
+            settings.CHUNKER,
+            settings.CHUNK_MAX_TOKENS,
+            settings.CHUNK_OVERLAP_TOKENS,
+        ],
+        "strip_boilerplate": settings.STRIP_BOILERPLATE,
+        "deduplicate_chunks": settings.DEDUPLICATE_CHUNKS,
+        "batch_size": settings.EMBED_BATCH_SIZE,
+    }
+    try:
+        return IngestSpool(
+            spool_storage(settings.SPOOL_URI, name, get_s3_client()), fingerprint
+        )
+    except Exception as e:
+        logger.warning(f"Ingesting {doc_id} without checkpoints: {e}")
+        return None
+
+
+def discard_spool(spool: Optional[IngestSpool]):
+    if spool is None:
+        return
+    try:
+        spool.clear()
+    except Exception as e:
+        logger.warning(f"Failed to remove checkpoints: {e}")
+
+
+def replaces_stored_document(doc_id: str, spool: Optional[IngestSpool]) -> bool:
+    """
+    Whether `doc_id` is a new version of a stored document, uploaded over its
+    object, and is to be re-ingested. Chunks stored by an earlier attempt of
+    this ingestion don't count: the attempt's spool resumes from them.
+    """
+    if spool is not None and spool.page_count is not None:
+        return False
+    return get_vector_store().has_document(doc_id)
+
+
+def download_unless_spooled(
+    stack: ExitStack, key: str, metrics: IngestMetrics, spool: Optional[IngestSpool]
+) -> Optional[IO[bytes]]:
+    """
+    Download the document into `stack`, unless an earlier attempt already
+    spooled its extracted text.
+    """
+    if spool is not None and spool.has("pages"):
+        logger.info(f"Resuming {key} from spooled pages")
+        return None
+    return stack.enter_context(download_document(key, metrics))
+
+
+def retry_transient(task, error: Exception) -> bool:
+    """
+    Whether `error` is transient and `task` has retries left.
+    """
+    if not isinstance(error, TRANSIENT_ERRORS):
+        return False
+    if task.request.retries >= settings.INGEST_MAX_RETRIES:
+        return False
+
+    logger.warning(
+        f"Retrying {task.name} after transient error "
+        f"({task.request.retries + 1}/{settings.INGEST_MAX_RETRIES}): {error}"
+    )
+    return True
+
+
+def retry_countdown(retries: int) -> int:
+    return get_exponential_backoff_interval(
+        factor=settings.INGEST_RETRY_BACKOFF_S,
+        retries=retries,
+        maximum=settings.INGEST_RETRY_BACKOFF_MAX_S,
+        full_jitter=True,
+    )
+
+
+def document_chunks(
+    pdf_file: Optional[IO[bytes]],
+    doc_id: str,
+    metrics: IngestMetrics,
+    page_range: Optional[tuple[int, int]] = None,
+    spool: Optional[IngestSpool] = None,
+    chunker: Optional[Chunker] = None,
+) -> Iterator[tuple[ChunkBatch, int]]:
+    """
+    Lazily extract and chunk the document, or only the pages in `page_range`,
+    in batches of up to EMBED_BATCH_SIZE chunks. Each batch comes with the
+    number of pages chunked completely once it was produced, which are done
+    when the batch is stored.
+    Running headers and footers are stripped from the pages, and chunks that
+    repeat an earlier chunk's text are dropped before they are embedded.
+
+    Chunk ids of a page range start at `start * CHUNK_IDS_PER_PAGE`, so the
+    ranges of a split document never reuse each other's ids.
+
+    With a `spool`, the page texts and chunks are saved once complete, and
+    taken from there instead when an earlier attempt saved them; `pdf_file`
+    is only read if no page texts were spooled. `chunker` defaults to the
+    configured chunker on the shared embedder's tokenizer.
+    """
+    if spool is not None:
+        spooled_batches = spool.load("chunk_batches")
+        if spooled_batches is not None:
+            metrics.items["extract"] = spool.page_count or 0
+            batches = (
+                (ChunkBatch.from_dict(batch), batch.get("pages_done", 0))
+                for batch in spooled_batches
+            )
+            return metrics.timed(batches, "chunk", count=lambda item: len(item[0]))
+
+    if chunker is None:
+        chunker = build_chunker(
+            settings.CHUNKER,
+            embedder=get_embedder(),
+            max_tokens=settings.CHUNK_MAX_TOKENS,
+            overlap_tokens=settings.CHUNK_OVERLAP_TOKENS,
+        )
+
+    start, end = page_range or (0, None)
+    spooled_pages = spool.load("pages") if spool is not None else None
+    if spooled_pages is not None:
+        pages = (tuple(page) for page in spooled_pages)
+    else:
+        pages = stream_pages(
+            pdf_file,
+            extract_workers=settings.EXTRACT_WORKERS,
+            limits=extraction_limits,
+            start=start,
+            end=end,
         )
+        if spool is not None:
+            pages = spool.tee("pages", pages)
+    pages = metrics.timed(pages, "extract")
+    if settings.STRIP_BOILERPLATE:
+        stripper = BoilerplateStripper(sample_pages=settings.BOILERPLATE_SAMPLE_PAGES)
+        pages = stripper.strip(pages, counts=metrics.items)
+
+    counter = PageCounter()
+    pages = counter.count(pages)
+    batches = chunker.chunk(pages, doc_id=doc_id, batch_size=settings.EMBED_BATCH_SIZE)
+    if settings.DEDUPLICATE_CHUNKS:
+        batches = dedupe_batches(batches, counts=metrics.items)
+
+    if start:
+        offset = start * CHUNK_IDS_PER_PAGE
+        batches = (batch.with_id_offset(offset) for batch in batches)
+
+    batches = ((batch, counter.done) for batch in batches)
+    if spool is not None:
+        batches = spool.tee(
+            "chunk_batches",
+            batches,
+            encode=lambda item: {**item[0].to_dict(), "pages_done": item[1]},
+        )
+
+    return metrics.timed(batches, "chunk", count=lambda item: len(item[0]))
+
+
+def ingest_document_streaming(
+    doc_id: str,
+    pdf_file: Optional[IO[bytes]],
+    metrics: IngestMetrics,
+    progress: ProgressReporter,
+    page_range: Optional[tuple[int, int]] = None,
+    spool: Optional[IngestSpool] = None,
+) -> int:
+    """
+    Extract, embed and store the document batch by batch, so only one embed
+    batch is held in memory and early chunks are stored before later pages
+    are parsed. Returns the number of chunks stored.
+
+    With a `spool`, each batch's embeddings are saved before they are
+    upserted and the batch is marked once stored, so a retry skips stored
+    batches and never embeds a batch twice.
+    """
+    embedder = get_embedder()
+    embedding_service = get_embedding_service()
+    vector_store = get_vector_store()
+    chunk_count = 0
+    cache_stats = embedder.cache_stats()
+
+    resumed = 0
+
+    batches = document_chunks(pdf_file, doc_id, metrics, page_range, spool)
+    for index, (batch, pages_done) in enumerate(batches):
+        with metrics.stage("checkpoint"):
+            stored = spool is not None and spool.is_upserted(index)
+            embeddings = None
+            if spool is not None and not stored:
+                embeddings = spool.load_embeddings(index)
+
+        if stored or embeddings is not None:
+            resumed += 1
+
+        if not stored:
+            if embeddings is None:
+                with metrics.stage("embed"):
+                    embeddings = embedding_service.embed(batch.texts())
+                if spool is not None:
+                    with metrics.stage("checkpoint"):
+                        spool.save_embeddings(index, embeddings)
+
+            with metrics.stage("upsert"):
+                vector_store.add_embeddings(batch, embeddings)
+            if spool is not None:
+                with metrics.stage("checkpoint"):
+                    spool.mark_upserted(index)
+
+        chunk_count += len(batch)
+        progress.report(pages_done=pages_done, chunks_done=chunk_count)
+
+    if resumed:
+        logger.info(f"Resumed {resumed} spooled embedding batches of {doc_id}")
+
+    if cache_stats is not None:
+        task_stats = embedder.cache_stats() - cache_stats
+        logger.info(
+            f"Embedding cache for {doc_id}: {task_stats.hit_rate:.1%} hit rate "
+            f"({task_stats.hits} hits, {task_stats.misses} misses)"
+        )
+
+    # A page range without text is fine; the whole document is checked when
+    # the ranges are combined.
+    if not chunk_count and page_range is None:
+        raise DocumentLoadError(
+            "Text extraction resulted in empty content.",
+            detail={"doc_id": doc_id},
+        )
+
+    return chunk_count
+
+
+def reingest_document(
+    doc_id: str,
+    pdf_file: IO[bytes],
+    metrics: IngestMetrics,
+    progress: ProgressReporter,
+    chunker: Optional[Chunker] = None,
+):
+    """
+    Re-process a replaced document against what is already stored for
+    `doc_id`: chunks stored unchanged are left alone, chunks whose text is
+    already stored (e.g. shifted by an edit) reuse the stored embedding, only
+    new text is embedded, and chunks that no longer exist are deleted.
+    """
+    vector_store = get_vector_store()
+
+    with metrics.stage("diff"):
+        stored = vector_store.get_document_chunks(doc_id)
+        embeddings_by_hash = {
+            chunk.chunk_hash: chunk.embedding
+            for chunk in stored.values()
+            if chunk.chunk_hash is not None
+        }
+        # The old content hash no longer describes this document; its vectors
+        # are rewritten below and the new hash is registered afterwards.
+        registered = [
+            vector_id
+            for vector_id, chunk in stored.items()
+            if "content_hash" in chunk.metadata
+        ]
+        vector_store.delete_chunks(registered)
+        for vector_id in registered:
+            del stored[vector_id]
 
+    seen: set[str] = set()
+    kept = reused = embedded = 0
+
+    batches = document_chunks(pdf_file, doc_id, metrics, chunker=chunker)
+    for batch, pages_done in batches:
+        changed = []
+        for chunk in batch.chunks():
+            vector_id = chunk_vector_id(chunk)
+            seen.add(vector_id)
+            previous = stored.get(vector_id)
+            if previous is not None and previous.matches(chunk):
+                kept += 1
+            else:
+                changed.append(chunk)
+
+        if changed:
+            reused_count, embedded_count = store_changed_chunks(
+                changed, embeddings_by_hash, metrics
+            )
+            reused += reused_count
+            embedded += embedded_count
+
+        progress.report(pages_done=pages_done, chunks_done=len(seen))
+
+    if not seen:
+        raise DocumentLoadError(
+            "Text extraction resulted in empty content.",
+            detail={"doc_id": doc_id},
+        )
+
+    removed = stored.keys() - seen
+    with metrics.stage("upsert"):
+        vector_store.delete_chunks(removed)
+
+    logger.info(
+        f"Re-ingested {doc_id}: {kept} chunks unchanged, {reused} reused, "
+        f"{embedded} embedded, {len(removed)} deleted"
+    )
+
+
+def store_changed_chunks(
+    chunks: list[dict[str, Any]],
+    embeddings_by_hash: dict[str, np.ndarray],
+    metrics: IngestMetrics,
+) -> tuple[int, int]:
+    """
+    Store `chunks`, reusing stored embeddings for text that is already in the
+    collection. Returns how many embeddings were reused and how many computed.
+    """
+    hashes = [chunk_hash(chunk["text"]) for chunk in chunks]
+    missing = [
+        index
+        for index, text_hash in enumerate(hashes)
+        if text_hash not in embeddings_by_hash
+    ]
+    new_embeddings = None
+    if missing:
+        with metrics.stage("embed"):
+            new_embeddings = get_embedding_service().embed(
+                [chunks[index]["text"] for index in missing]
+            )
+
+    embeddings = []
+    new_rows = iter(range(len(missing)))
+    for text_hash in hashes:
+        if text_hash in embeddings_by_hash:
+            embeddings.append(embeddings_by_hash[text_hash])
+        else:
+            embeddings.append(new_embeddings[next(new_rows)])
+
+    with metrics.stage("upsert"):
+        get_vector_store().add_embeddings(chunks, np.stack(embeddings))
+
+    return len(chunks) - len(missing), len(missing)
+
+
+def reuse_duplicate(doc_id: str, content_hash: str) -> bool:
+    """
+    If a document with the same content was already ingested, alias its
+    vectors under `doc_id` and return True.
+    """
+    vector_store = get_vector_store()
+    source_doc_id = vector_store.find_document_by_hash(content_hash)
+    if source_doc_id is None:
+        return False
+
+    if source_doc_id == doc_id:
+        logger.info(f"Document {doc_id} was already ingested")
+        return True
+
+    copied = vector_store.copy_document(source_doc_id, doc_id)
+    logger.info(f"Reused {copied} chunks of {source_doc_id} for duplicate {doc_id}")
+    return copied > 0
+
+
+def register_content(doc_id: str, content_hash: str):
+    try:
+        get_vector_store().register_document(doc_id, content_hash)
     except VectorStoreError:
+        # The document itself is stored; only later duplicates lose the shortcut.
+        logger.warning(f"Failed to register content hash for {doc_id}")
+
+
+def failure_reason(error: Exception) -> str:
+    if isinstance(error, ExtractionLimitError):
+        return f"Document rejected: {error.message}"
+    if isinstance(error, DocumentLoadError):
+        return "Failed to load document for processing"
+    if isinstance(error, EmbeddingError):
+        return "Failed to create embeddings of the document"
+    if isinstance(error, VectorStoreError):
+        return "Failed storing processed data in vector store"
+
+    logger.error(error)
+    return "Failed processing file"
+
+
+def should_split(page_count: int) -> bool:
+    # A chord needs a result backend to collect the page range results.
+    return (
+        settings.CELERY_RESULT_BACKEND is not None
+        and settings.SPLIT_PAGE_THRESHOLD > 0
+        and page_count > settings.SPLIT_PAGE_THRESHOLD
+    )
+
+
+def split_document(
+    doc_id: str,
+    key: str,
+    page_count: int,
+    content_hash: Optional[str],
+    metrics: IngestMetrics,
+):
+    """
+    Fan the document out into page range subtasks that any worker can pick
+    up; `finalize_pdf` publishes the status once all of them finished.
+    """
+    span = max(1, settings.SPLIT_PAGES_PER_TASK)
+    ranges = [
+        (start, min(start + span, page_count)) for start in range(0, page_count, span)
+    ]
+    logger.info(f"Splitting {doc_id} ({page_count} pages) into {len(ranges)} tasks")
+
+    header = group(
+        process_pdf_range.s(doc_id, key, start, end, page_count, metrics.started_at)
+        for start, end in ranges
+    )
+    chord(header)(
+        finalize_pdf.s(
+            doc_id=doc_id,
+            content_hash=content_hash,
+            started_at=metrics.started_at,
+            summary=metrics.to_dict(),
+        )
+    )
+
+
+@celery_app.task(bind=True, ignore_result=False)
+def process_pdf_range(self, doc_id, key, start, end, page_count=None, started_at=None):
+    """
+    Ingest pages [start, end) of a split document of `page_count` pages,
+    reporting the range's progress for the status consumer to combine.
+    Transient failures are retried from the spooled checkpoints; other
+    failures are returned rather than raised, so the chord callback still
+    runs and reports them.
+    """
+    metrics = IngestMetrics()
+    progress = ProgressReporter(
+        doc_id,
+        settings.PROGRESS_INTERVAL_MS / 1000,
+        total_pages=page_count,
+        page_range=(start, end),
+        started_at=started_at,
+    )
+    spool = open_spool(doc_id, key, (start, end))
+
+    try:
+        with ExitStack() as stack:
+            pdf_file = download_unless_spooled(stack, key, metrics, spool)
+            chunk_count = ingest_document_streaming(
+                doc_id,
+                pdf_file,
+                metrics,
+                progress,
+                page_range=(start, end),
+                spool=spool,
+            )
+        # The last batches may have been within the reporting interval.
+        progress.report(pages_done=end - start, chunks_done=chunk_count, force=True)
+        discard_spool(spool)
+        return {
+            "status": "success",
+            "chunks": chunk_count,
+            "metrics": metrics.to_dict(),
+        }
+
+    except Exception as e:
+        if retry_transient(self, e):
+            raise self.retry(exc=e, countdown=retry_countdown(self.request.retries))
+
+        discard_spool(spool)
+        return {
+            "status": "failed",
+            "reason": failure_reason(e),
+            "metrics": metrics.to_dict(),
+        }
+
+
+@celery_app.task
+def finalize_pdf(results, doc_id, content_hash, started_at, summary):
+    """
+    Publish one status for a split document from its page range results.
+    """
+    metrics = IngestMetrics(started_at=started_at)
+    metrics.merge(summary)
+    for result in results:
+        metrics.merge(result["metrics"])
+
+    failures = [result for result in results if result["status"] == "failed"]
+    if failures:
+        send_status_update(doc_id, "failed", failures[0]["reason"], metrics=metrics)
+        return
+
+    if not sum(result["chunks"] for result in results):
         send_status_update(
-            doc_id, "failed", "Failed storing processed data in vector store"
+            doc_id, "failed", failure_reason(DocumentLoadError()), metrics=metrics
         )
+        return
+
+    if content_hash:
+        with metrics.stage("dedup"):
+            register_content(doc_id, content_hash)
+
+    send_status_update(doc_id, "success", metrics=metrics)
+
+
+@celery_app.task(bind=True)
+def process_pdf(self, doc_id, key, reingest=False):
+    """
+    Ingest the PDF at `key` as `doc_id`. When `doc_id` is already stored (or
+    with `reingest`), the document replaces an earlier version and only its
+    changed chunks are embedded.
+    Large documents are split into page ranges processed by several workers.
+
+    S3 and vector store failures are retried with exponential backoff; a
+    retry resumes from the stages the failed attempt spooled.
+    """
+    metrics = IngestMetrics()
+    progress = ProgressReporter(doc_id, settings.PROGRESS_INTERVAL_MS / 1000)
+    # Re-ingestion already only embeds what changed against the store.
+    spool = None if reingest else open_spool(doc_id, key)
+
+    try:
+        reingest = reingest or replaces_stored_document(doc_id, spool)
+
+        content_hash = None
+        with metrics.stage("dedup"):
+            if settings.DEDUPLICATE_DOCUMENTS:
+                content_hash = get_content_hash(
+                    settings.BUCKET_NAME, key, get_s3_client()
+                )
+
+            reused = (
+                not reingest
+                and content_hash is not None
+                and reuse_duplicate(doc_id, content_hash)
+            )
+
+        if reused:
+            send_status_update(doc_id, "success", metrics=metrics)
+            return
+
+        if reingest or settings.STREAMING_INGESTION:
+            with ExitStack() as stack:
+                pdf_file = download_unless_spooled(stack, key, metrics, spool)
+                if pdf_file is None:
+                    page_count = spool.page_count
+                else:
+                    page_count = count_pages(
+                        pdf_file, extraction_limits, settings.EXTRACT_WORKERS
+                    )
+
+                if not reingest and should_split(page_count):
+                    split_document(doc_id, key, page_count, content_hash, metrics)
+                    return
+
+                progress.start(page_count)
+                if reingest:
+                    reingest_document(doc_id, pdf_file, metrics, progress)
+                else:
+                    if spool is not None and pdf_file is not None:
+                        spool.page_count = page_count
+                    ingest_document_streaming(
+                        doc_id, pdf_file, metrics, progress, spool=spool
+                    )
+        else:
+            ingest_document(doc_id, key, metrics)
+
+        if content_hash:
+            with metrics.stage("dedup"):
+                register_content(doc_id, content_hash)
+
+        discard_spool(spool)
+        send_status_update(doc_id, "success", metrics=metrics)
 
     except Exception as e:
-        logger.error(e)
-        send_status_update(doc_id, "failed", "Failed processing file")
+        if retry_transient(self, e):
+            raise self.retry(exc=e, countdown=retry_countdown(self.request.retries))
+
+        discard_spool(spool)
+        send_status_update(doc_id, "failed", failure_reason(e), metrics=metrics)
@@ -0,0 +1,288 @@
+"""
+Offline ingestion benchmark.
+
+Runs the document loading, chunking, embedding and vector store stages on
+synthetic PDFs against local stand-ins: a moto S3 bucket and an in-process
+Chroma client (or a local Chroma server with --chroma-host). Results are
+written as JSON and can be compared with a saved baseline:
+
+    uv run --group bench python -m benchmarks.ingest --output results.json
+    uv run --group bench python -m benchmarks.ingest --baseline results.json
+"""
+
+import sys
+import json
+import time
+import uuid
+import argparse
+import platform
+import resource
+from collections import defaultdict
+from typing import Any, Optional
+import boto3
+import numpy as np
+from benchmarks.synthetic import DENSITIES, SyntheticDocument, generate_corpus
+from app.document_processing.document_loader import (
+    chunk_text,
+    iter_pdf_pages,
+    open_document,
+)
+from app.models.embedder import Embedder
+from app.store.vector_store import VectorStore
+
+BUCKET = "benchmark-documents"
+STAGES = ("download", "extract", "chunk", "embed", "upsert")
+
+# Metrics compared against a baseline, and whether a higher value is better.
+COMPARED_METRICS = {
+    "docs_per_sec": True,
+    "chunks_per_sec": True,
+    "peak_rss_mb": False,
+}
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def percentiles(values: list[float]) -> dict[str, float]:
+    return {
+        "p50": round(float(np.percentile(values, 50)), 6),
+        "p95": round(float(np.percentile(values, 95)), 6),
+        "total": round(float(sum(values)), 6),
+    }
+
+
+def create_chroma_client(host: Optional[str], port: int):
+    import chromadb
+
+    if host:
+        return chromadb.HttpClient(host=host, port=port)
+
+    try:
+        return chromadb.EphemeralClient()
+    except Exception as e:
+        raise SystemExit(
+            "An in-process Chroma needs the full `chromadb` package "
+            f"({e}); run a local Chroma server and pass --chroma-host instead."
+        ) from e
+
+
+def ingest(
+    document: SyntheticDocument,
+    doc_id: str,
+    s3,
+    embedder: Embedder,
+    vector_store: VectorStore,
+) -> tuple[dict[str, float], int]:
+    """
+    Ingest one document the way `load_documents` and `ingest_document` do,
+    timing each stage separately. Returns the stage timings and chunk count.
+    """
+    timings = {}
+
+    start = time.perf_counter()
+    with open_document(bucket=BUCKET, key=document.name, s3=s3) as pdf_file:
+        timings["download"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        text = "\n".join(page_text for _, page_text in iter_pdf_pages(pdf_file))
+        timings["extract"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    chunks = chunk_text(text, doc_id=doc_id)
+    timings["chunk"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    embeddings = embedder.embed(chunks.texts())
+    timings["embed"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vector_store.add_embeddings(chunks, embeddings)
+    timings["upsert"] = time.perf_counter() - start
+
+    return timings, len(chunks)
+
+
+def run(args: argparse.Namespace) -> dict[str, Any]:
+    from moto import mock_aws
+
+    corpus = generate_corpus(args.pages, args.densities, seed=args.seed)
+
+    embedder = Embedder(
+        model_name=args.model,
+        backend=args.backend,
+        model_cache_dir=args.model_cache_dir,
+    )
+    # Load lazy state (tokenizer, thread pools) outside the measured runs.
+    embedder.embed(["warm up"])
+
+    vector_store = VectorStore(
+        collection_name=f"benchmark-{uuid.uuid4().hex[:8]}",
+        host="",
+        port=0,
+        auth_credentials="",
+        client=create_chroma_client(args.chroma_host, args.chroma_port),
+    )
+
+    stage_timings: dict[str, list[float]] = defaultdict(list)
+    cases = []
+    total_chunks = 0
+
+    with mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket=BUCKET)
+        for document in corpus:
+            s3.put_object(Bucket=BUCKET, Key=document.name, Body=document.data)
+
+        wall_start = time.perf_counter()
+        for repeat in range(args.repeat):
+            for document in corpus:
+                doc_id = f"{document.name}-{repeat}"
+                timings, chunk_count = ingest(
+                    document, doc_id, s3, embedder, vector_store
+                )
+                total_chunks += chunk_count
+                for stage, seconds in timings.items():
+                    stage_timings[stage].append(seconds)
+                cases.append(
+                    {
+                        "name": document.name,
+                        "pages": document.pages,
+                        "density": document.density,
+                        "bytes": len(document.data),
+                        "chunks": chunk_count,
+                        "seconds": {
+                            stage: round(seconds, 6)
+                            for stage, seconds in timings.items()
+                        },
+                    }
+                )
+        wall_seconds = time.perf_counter() - wall_start
+
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+        },
+        "config": {
+            "pages": args.pages,
+            "densities": args.densities,
+            "repeat": args.repeat,
+            "seed": args.seed,
+            "model": args.model,
+            "backend": args.backend,
+        },
+        "documents": len(cases),
+        "chunks": total_chunks,
+        "wall_seconds": round(wall_seconds, 6),
+        "docs_per_sec": round(len(cases) / wall_seconds, 4),
+        "chunks_per_sec": round(total_chunks / wall_seconds, 4),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "stages": {
+            stage: percentiles(stage_timings[stage])
+            for stage in STAGES
+            if stage_timings[stage]
+        },
+        "cases": cases,
+    }
+
+
+def compare(
+    results: dict[str, Any], baseline: dict[str, Any], tolerance: float
+) -> list[str]:
+    """
+    Return a description of every metric that is more than `tolerance` worse
+    than in the baseline. Stage latencies are compared at p95.
+    """
+    checks = [
+        (name, results.get(name), baseline.get(name), higher_is_better)
+        for name, higher_is_better in COMPARED_METRICS.items()
+    ]
+    for stage, stats in baseline.get("stages", {}).items():
+        current = results.get("stages", {}).get(stage, {})
+        checks.append((f"{stage}.p95", current.get("p95"), stats.get("p95"), False))
+
+    regressions = []
+    for name, current, previous, higher_is_better in checks:
+        if current is None or not previous:
+            continue
+
+        change = (current - previous) / previous
+        if (-change if higher_is_better else change) > tolerance:
+            regressions.append(
+                f"{name}: {previous} -> {current} ({change:+.1%}, "
+                f"tolerance {tolerance:.0%})"
+            )
+
+    return regressions
+
+
+def parse_list(value: str, cast=str) -> list:
+    return [cast(item) for item in value.split(",") if item]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark PDF ingestion on synthetic documents."
+    )
+    parser.add_argument(
+        "--pages",
+        type=lambda value: parse_list(value, int),
+        default=[1, 10, 50, 200],
+        help="Comma-separated page counts",
+    )
+    parser.add_argument(
+        "--densities",
+        type=parse_list,
+        default=list(DENSITIES),
+        help=f"Comma-separated text densities ({', '.join(DENSITIES)})",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--backend", default="torch")
+    parser.add_argument("--model-cache-dir", default="model_cache")
+    parser.add_argument("--chroma-host", help="Use a local Chroma server")
+    parser.add_argument("--chroma-port", type=int, default=8000)
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare with a saved results file")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.1,
+        help="Allowed relative regression against the baseline",
+    )
+    args = parser.parse_args()
+
+    unknown = set(args.densities) - set(DENSITIES)
+    if unknown:
+        parser.error(f"Unknown densities: {', '.join(sorted(unknown))}")
+
+    results = run(args)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        results["baseline"] = {
+            "path": args.baseline,
+            "tolerance": args.tolerance,
+            "regressions": regressions,
+        }
+
+    report = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    print(report)
+
+    if args.baseline and results["baseline"]["regressions"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
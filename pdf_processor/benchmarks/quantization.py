@@ -0,0 +1,115 @@
+"""
+Offline estimate of what storing embeddings at a lower precision would cost
+in retrieval quality.
+
+Chroma keeps every vector as float32 (and rejects int8 input), so the worker
+always stores float32 embeddings; this only reports the recall@k that
+float16 or int8 (symmetric, per-vector scale) storage would reach on a given
+corpus, for a vector store that supports them:
+
+    uv run python -m benchmarks.quantization corpus.txt queries.txt
+"""
+
+import json
+import argparse
+from typing import Optional
+import numpy as np
+
+QUANTIZATION_MODES = ("none", "float16", "int8")
+INT8_MAX = 127
+
+
+def quantize(
+    embeddings: np.ndarray, mode: str
+) -> tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Reduce embeddings to the width of `mode`.
+
+    Returns the quantized values and, for int8, the per-vector scale factor
+    needed to recover the original magnitudes (`value = code / scale`).
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+
+    if mode == "none":
+        return embeddings, None
+
+    if mode == "float16":
+        return embeddings.astype(np.float16), None
+
+    if mode == "int8":
+        max_abs = np.abs(embeddings).max(axis=1, keepdims=True)
+        scales = np.where(max_abs > 0, INT8_MAX / np.maximum(max_abs, 1e-12), 1.0)
+        codes = np.clip(np.rint(embeddings * scales), -INT8_MAX, INT8_MAX)
+        return codes.astype(np.int8), scales[:, 0].astype(np.float32)
+
+    raise ValueError(f"Unknown quantization mode: {mode}")
+
+
+def dequantize(
+    values: np.ndarray, mode: str, scales: Optional[np.ndarray] = None
+) -> np.ndarray:
+    values = np.asarray(values, dtype=np.float32)
+
+    if mode == "int8":
+        if scales is None:
+            raise ValueError("int8 embeddings need their scale factors.")
+        return values / np.asarray(scales, dtype=np.float32)[:, None]
+
+    return values
+
+
+def _top_k(corpus: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    corpus = corpus / np.linalg.norm(corpus, axis=1, keepdims=True)
+    queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    scores = queries @ corpus.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def recall_at_k(
+    corpus: np.ndarray, queries: np.ndarray, mode: str, k: int = 10
+) -> float:
+    """
+    Fraction of the float32 top-k neighbours of each query that are still in
+    the top-k when the corpus is stored with `mode` quantization.
+    """
+    k = min(k, len(corpus))
+    reference = _top_k(corpus, queries, k)
+
+    values, scales = quantize(corpus, mode)
+    candidate = _top_k(dequantize(values, mode, scales), queries, k)
+
+    hits = sum(
+        len(set(expected) & set(found)) for expected, found in zip(reference, candidate)
+    )
+    return hits / (len(queries) * k)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare retrieval recall of quantized embeddings against float32."
+    )
+    parser.add_argument("corpus", help="Text file with one passage per line")
+    parser.add_argument("queries", help="Text file with one held-out query per line")
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    from app.models.registry import get_embedder
+
+    with open(args.corpus) as f:
+        passages = [line.strip() for line in f if line.strip()]
+    with open(args.queries) as f:
+        queries = [line.strip() for line in f if line.strip()]
+
+    embedder = get_embedder()
+    corpus_embeddings = embedder.embed(passages)
+    query_embeddings = embedder.embed(queries)
+
+    report = {
+        mode: recall_at_k(corpus_embeddings, query_embeddings, mode, k=args.k)
+        for mode in QUANTIZATION_MODES
+    }
+    print(json.dumps({"k": args.k, "recall": report}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import random
+from dataclasses import dataclass
+
+# Text densities in words per page: roughly a slide deck, a report and a
+# densely set paper.
+DENSITIES = {"sparse": 80, "normal": 300, "dense": 700}
+
+WORDS_PER_LINE = 12
+LINE_HEIGHT = 12
+TOP_MARGIN = 780
+
+VOCABULARY = (
+    "the of and to in a is that for it as was with be by on not he this are or "
+    "his from at which but have an they you were her she there been one all "
+    "would their we him has when who will more no if out so said what up its "
+    "about into than them can only other new some could time these two may "
+    "then do first any my now such like our over man me even most made after "
+    "also did many before must through back years where much your way well "
+    "down should because each just those people how too little state good very "
+    "make world still own see men work long get here between both life being "
+    "under never day same another know while last might us great old year off "
+    "come since against go came right used take three document processing "
+    "embedding vector storage retrieval latency throughput quarterly revenue "
+    "analysis protocol measurement experiment results method section figure"
+).split()
+
+
+@dataclass(frozen=True)
+class SyntheticDocument:
+    name: str
+    pages: int
+    density: str
+    data: bytes
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _page_lines(rng: random.Random, words: int) -> list[str]:
+    lines = []
+    for start in range(0, words, WORDS_PER_LINE):
+        count = min(WORDS_PER_LINE, words - start)
+        line = " ".join(rng.choice(VOCABULARY) for _ in range(count))
+        lines.append(line.capitalize() + ".")
+    return lines
+
+
+def build_pdf(pages: list[list[str]]) -> bytes:
+    """
+    Write a minimal PDF with one Helvetica text block per page, one string
+    per line. No external PDF library is needed to produce it.
+    """
+    page_count = len(pages)
+    kids = " ".join(f"{4 + 2 * index} 0 R" for index in range(page_count))
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{kids}] /Count {page_count} >>".encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+
+    for index, lines in enumerate(pages):
+        content = " ".join(f"({_escape(line)}) '" for line in lines)
+        stream = (
+            f"BT /F1 10 Tf 50 {TOP_MARGIN} Td {LINE_HEIGHT} TL {content} ET"
+        ).encode("latin-1")
+        objects.append(
+            (
+                "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                "/Resources << /Font << /F1 3 0 R >> >> "
+                f"/Contents {5 + 2 * index} 0 R >>"
+            ).encode()
+        )
+        objects.append(
+            b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream"
+        )
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    out += (
+        f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\n"
+        f"startxref\n{xref}\n%%EOF\n"
+    ).encode()
+    return bytes(out)
+
+
+def generate_document(pages: int, density: str, seed: int = 0) -> SyntheticDocument:
+    """
+    Generate a reproducible PDF of `pages` pages of random prose at the given
+    density (a key of DENSITIES).
+    """
+    rng = random.Random(f"{seed}-{pages}-{density}")
+    words = DENSITIES[density]
+    data = build_pdf([_page_lines(rng, words) for _ in range(pages)])
+    return SyntheticDocument(
+        name=f"{pages}p-{density}", pages=pages, density=density, data=data
+    )
+
+
+def generate_corpus(
+    page_counts: list[int], densities: list[str], seed: int = 0
+) -> list[SyntheticDocument]:
+    return [
+        generate_document(pages, density, seed=seed)
+        for pages in page_counts
+        for density in densities
+    ]
@@ -0,0 +1,25 @@
+"""
+Run with `uv run --group test pytest`.
+
+The app reads its settings from the environment when it is imported, so
+placeholder values are set before any test module imports it. No test talks
+to AWS or Chroma; the SQS tests use moto.
+"""
+
+import os
+
+for name, value in {
+    "VDB_URI": "localhost",
+    "VDB_PORT": "8000",
+    "COLLECTION_NAME": "test",
+    "VDB_SECRET_KEY": "test",
+    "CELERY_SQS_QUEUE": "https://sqs.us-east-1.amazonaws.com/000000000000/tasks",
+    "CELERY_SQS_QUEUE_NAME": "tasks",
+    "SQS_QUEUE": "https://sqs.us-east-1.amazonaws.com/000000000000/status",
+    "SQS_QUEUE_NAME": "status",
+    "AWS_SECRET_ACCESS_KEY": "test",
+    "AWS_ACCESS_KEY_ID": "test",
+    "BUCKET_NAME": "test",
+    "AWS_REGION": "us-east-1",
+}.items():
+    os.environ.setdefault(name, value)
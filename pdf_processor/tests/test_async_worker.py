@@ -0,0 +1,199 @@
+import json
+import base64
+import asyncio
+import numpy as np
+import pytest
+from app import async_worker
+from app.async_worker import AsyncIngestWorker, decode_task
+from app.document_processing.chunker import build_chunker
+from app.exceptions import VectorStoreError, VectorStoreUnavailableError
+from app.metrics import IngestMetrics
+from app.store.spool import IngestSpool, LocalSpoolStorage
+from app.tasks import process_pdf
+
+PAGE_COUNT = 10
+
+
+def celery_message(task: str, kwargs: dict, receives: int = 1) -> dict:
+    body = base64.b64encode(json.dumps([[], kwargs, {}]).encode()).decode()
+    envelope = {
+        "body": body,
+        "headers": {"task": task},
+        "properties": {"body_encoding": "base64"},
+    }
+    return {
+        "ReceiptHandle": "receipt",
+        "Body": base64.b64encode(json.dumps(envelope).encode()).decode(),
+        "Attributes": {"ApproximateReceiveCount": str(receives)},
+    }
+
+
+class FakeSQS:
+    def __init__(self):
+        self.calls = []
+
+    def change_message_visibility(self, QueueUrl, ReceiptHandle, VisibilityTimeout):
+        self.calls.append(("visibility", VisibilityTimeout))
+
+    def delete_message(self, QueueUrl, ReceiptHandle):
+        self.calls.append(("delete", None))
+
+
+class FakeEmbeddingService:
+    def __init__(self):
+        self.calls = []
+
+    def embed(self, texts):
+        self.calls.append(texts)
+        return np.zeros((len(texts), 4), dtype=np.float32)
+
+
+class FakeVectorStore:
+    def __init__(self, fail_on: int = 0):
+        self.fail_on = fail_on
+        self.batches = []
+
+    def add_embeddings(self, batch, embeddings):
+        if len(self.batches) + 1 == self.fail_on:
+            raise VectorStoreUnavailableError("Chroma is down")
+        self.batches.append(batch.texts())
+
+
+@pytest.fixture
+def worker():
+    worker = AsyncIngestWorker(
+        queue_url="tasks",
+        max_documents=2,
+        max_downloads=1,
+        embed_threads=1,
+        io_threads=2,
+        visibility_timeout=60,
+    )
+    yield worker
+    for pool in (worker.io_pool, worker.chunk_pool, worker.embed_pool):
+        pool.shutdown()
+
+
+def handle(worker: AsyncIngestWorker, sqs: FakeSQS, message: dict) -> None:
+    async def run():
+        await worker.documents.acquire()
+        await worker.handle(sqs, message)
+
+    asyncio.run(run())
+
+
+def test_decode_task_reads_base64_and_plain_envelopes():
+    message = celery_message("app.tasks.process_pdf.process_pdf", {"doc_id": "a"})
+    plain = base64.b64decode(message["Body"]).decode()
+
+    for body in (message["Body"], plain):
+        assert decode_task(body) == (
+            "app.tasks.process_pdf.process_pdf",
+            [],
+            {"doc_id": "a"},
+        )
+
+
+def test_other_tasks_are_left_to_the_redrive_policy(worker):
+    sqs = FakeSQS()
+
+    handle(worker, sqs, celery_message(process_pdf.process_pdf_range.name, {}))
+
+    assert sqs.calls == []
+
+
+@pytest.mark.parametrize(
+    "retry, expected", [(False, ("delete", None)), (True, ("visibility", 8))]
+)
+def test_documents_are_deleted_or_retried(worker, monkeypatch, retry, expected):
+    processed = []
+
+    async def process_document(doc_id, key, reingest, retries):
+        processed.append((doc_id, key, reingest, retries))
+        return retry
+
+    monkeypatch.setattr(worker, "process_document", process_document)
+    monkeypatch.setattr(async_worker, "retry_countdown", lambda retries: 4 * retries)
+    sqs = FakeSQS()
+
+    handle(
+        worker,
+        sqs,
+        celery_message(process_pdf.process_pdf.name, {"doc_id": "a", "key": "k"}, 3),
+    )
+
+    assert processed == [("a", "k", False, 2)]
+    assert sqs.calls == [expected]
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    def stream_pages(pdf_file, **kwargs):
+        for page in range(PAGE_COUNT):
+            yield page, " ".join(f"p{page}w{word}" for word in range(100))
+
+    for name, value in {
+        "EMBED_BATCH_SIZE": 2,
+        "STRIP_BOILERPLATE": False,
+        "DEDUPLICATE_CHUNKS": False,
+    }.items():
+        monkeypatch.setattr(process_pdf.settings, name, value)
+    monkeypatch.setattr(process_pdf, "stream_pages", stream_pages)
+    embedding_service = FakeEmbeddingService()
+    monkeypatch.setattr(
+        async_worker, "get_embedding_service", lambda concurrent: embedding_service
+    )
+    return embedding_service
+
+
+class FakeProgress:
+    def __init__(self):
+        self.reports = []
+
+    def report(self, pages_done, chunks_done):
+        self.reports.append((pages_done, chunks_done))
+
+
+def ingest(worker, monkeypatch, vector_store, spool=None) -> FakeProgress:
+    monkeypatch.setattr(async_worker, "get_vector_store", lambda: vector_store)
+    progress = FakeProgress()
+    asyncio.run(
+        worker.ingest_pipelined(
+            "doc", None, IngestMetrics(), progress, spool, build_chunker("fixed")
+        )
+    )
+    return progress
+
+
+def test_pipeline_stores_every_batch(worker, monkeypatch, pipeline):
+    vector_store = FakeVectorStore()
+
+    progress = ingest(worker, monkeypatch, vector_store)
+
+    assert pipeline.calls == vector_store.batches
+    assert progress.reports[-1] == (
+        PAGE_COUNT,
+        sum(len(texts) for texts in vector_store.batches),
+    )
+
+
+def test_retry_resumes_from_the_spool(worker, monkeypatch, pipeline, tmp_path):
+    storage = LocalSpoolStorage(str(tmp_path))
+    failing = FakeVectorStore(fail_on=2)
+
+    with pytest.raises(VectorStoreError):
+        ingest(worker, monkeypatch, failing, IngestSpool(storage, {}))
+    saved = len(list(tmp_path.glob("embeddings-*.npy")))
+    embedded = len(pipeline.calls)
+
+    retried = FakeVectorStore()
+    progress = ingest(worker, monkeypatch, retried, IngestSpool(storage, {}))
+
+    # The stored first batch is skipped and saved embeddings are reused; a
+    # batch whose embedding was cut short by the failure is embedded again.
+    stored = [tuple(texts) for texts in failing.batches + retried.batches]
+    assert failing.batches == pipeline.calls[:1]
+    assert len(set(stored)) == len(stored)
+    assert set(stored) == {tuple(texts) for texts in pipeline.calls}
+    assert len(pipeline.calls) - embedded == len(stored) - saved
+    assert progress.reports[-1][0] == PAGE_COUNT
@@ -0,0 +1,49 @@
+from collections import Counter
+from app.document_processing.boilerplate import BoilerplateStripper, dedupe_batches
+from app.document_processing.chunk_batch import ChunkBatch
+
+
+def make_batch(texts: list[str]) -> ChunkBatch:
+    return ChunkBatch.from_chunks(
+        [
+            {"text": text, "doc_id": "doc", "chunk_id": index}
+            for index, text in enumerate(texts)
+        ]
+    )
+
+
+def test_chunks_differing_only_in_numbers_are_kept():
+    batch = make_batch(
+        [
+            "Revenue grew by 12% in 2023.",
+            "Revenue grew by 15% in 2024.",
+            "revenue  grew by 12%\nin 2023.",
+        ]
+    )
+    counts = Counter()
+
+    texts = [text for kept in dedupe_batches([batch], counts) for text in kept.texts()]
+
+    assert texts == ["Revenue grew by 12% in 2023.", "Revenue grew by 15% in 2024."]
+    assert counts["duplicate_chunks"] == 1
+
+
+def test_duplicates_are_dropped_across_batches():
+    batches = [make_batch(["Intro.", "Body."]), make_batch(["Body.", "End."])]
+
+    kept = [batch.texts() for batch in dedupe_batches(batches)]
+
+    assert kept == [["Intro.", "Body."], ["End."]]
+
+
+def test_page_numbers_are_stripped_as_footers():
+    pages = [
+        (index, f"Annual Report\nSection {letter} text.\nPage {index + 1} of 5")
+        for index, letter in enumerate("abcde")
+    ]
+    counts = Counter()
+
+    stripped = list(BoilerplateStripper(sample_pages=5).strip(pages, counts))
+
+    assert stripped[2] == (2, "Section c text.")
+    assert counts["boilerplate_lines"] == 10
@@ -0,0 +1,93 @@
+import re
+import pytest
+from app.document_processing.chunker import SentenceChunker
+
+WORD = re.compile(r"\S+")
+MAX_TOKENS = 12
+SPECIAL_TOKENS = 2
+
+
+class WordTokenizer:
+    """
+    One token per whitespace-separated word, with a [CLS]/[SEP] pair added
+    around every sequence like a BERT tokenizer.
+    """
+
+    def num_special_tokens_to_add(self) -> int:
+        return SPECIAL_TOKENS
+
+    def __call__(self, text, add_special_tokens, return_offsets_mapping, verbose):
+        return {"offset_mapping": [match.span() for match in WORD.finditer(text)]}
+
+
+def token_count(text: str) -> int:
+    return len(WORD.findall(text)) + SPECIAL_TOKENS
+
+
+def sentence(name: str, words: int) -> str:
+    return " ".join([name] * (words - 1) + [f"{name}."])
+
+
+def chunk(pages, overlap_tokens=0):
+    chunker = SentenceChunker(
+        WordTokenizer(), max_tokens=MAX_TOKENS, overlap_tokens=overlap_tokens
+    )
+    return [
+        chunk
+        for batch in chunker.chunk(pages, doc_id="doc", batch_size=3)
+        for chunk in batch.chunks()
+    ]
+
+
+def test_chunks_fit_the_window_with_special_tokens():
+    text = " ".join(sentence(name, 4) for name in "abcdefgh")
+
+    chunks = chunk([(0, text)])
+
+    assert len(chunks) > 1
+    assert all(token_count(chunk["text"]) <= MAX_TOKENS for chunk in chunks)
+    assert [chunk["chunk_id"] for chunk in chunks] == list(range(len(chunks)))
+
+
+def test_overlap_repeats_trailing_sentences():
+    text = " ".join(sentence(name, 3) for name in "abcdefgh")
+
+    chunks = chunk([(0, text)], overlap_tokens=3)
+
+    for previous, current in zip(chunks, chunks[1:]):
+        last_sentence = previous["text"].rsplit(". ", 1)[-1]
+        assert current["text"].startswith(last_sentence)
+        assert token_count(current["text"]) <= MAX_TOKENS
+
+
+def test_long_sentence_is_split_on_token_boundaries():
+    text = sentence("long", 25)
+
+    chunks = chunk([(0, text)])
+
+    assert [token_count(chunk["text"]) - SPECIAL_TOKENS for chunk in chunks] == [
+        10,
+        10,
+        5,
+    ]
+    assert " ".join(chunk["text"] for chunk in chunks) == text
+
+
+def test_offsets_map_back_to_the_page_text():
+    pages = [
+        (3, "Intro sentence here.  Second one follows.\n\nA new paragraph."),
+        (4, sentence("x", 15) + " Tail."),
+    ]
+
+    chunks = chunk(pages)
+
+    assert {chunk["page"] for chunk in chunks} == {3, 4}
+    texts = dict(pages)
+    for item in chunks:
+        page_text = texts[item["page"]]
+        assert page_text[item["char_start"] : item["char_end"]] == item["text"]
+
+
+def test_window_without_room_for_text_is_rejected():
+    with pytest.raises(ValueError):
+        SentenceChunker(WordTokenizer(), max_tokens=SPECIAL_TOKENS)
@@ -0,0 +1,107 @@
+import os
+import time
+import resource
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from billiard.pool import Pool
+from benchmarks.synthetic import build_pdf
+from app.document_processing import extraction
+from app.document_processing.extraction import (
+    PAGES_PER_TASK,
+    ExtractionLimits,
+    count_pdf_pages,
+    iter_pdf_pages_parallel,
+)
+from app.exceptions import ExtractionLimitError
+
+PAGE_COUNT = PAGES_PER_TASK * 3
+MEMORY_LIMIT = 2 * 1024**3
+
+
+@pytest.fixture
+def pdf_path(tmp_path):
+    path = tmp_path / "document.pdf"
+    path.write_bytes(
+        build_pdf([[f"Page {index} says hello."] for index in range(PAGE_COUNT)])
+    )
+    return str(path)
+
+
+@pytest.fixture
+def prefork():
+    # Celery's prefork pool runs tasks in daemonic billiard processes.
+    pool = Pool(1)
+    yield pool
+    pool.terminate()
+    pool.join()
+
+
+def _extract_with_limits(path):
+    limits = ExtractionLimits(timeout=60, memory_bytes=MEMORY_LIMIT)
+    pages = list(iter_pdf_pages_parallel(path, workers=2, limits=limits))
+    # The document returned its pool for the next one.
+    pool = extraction._idle_pools[(2, MEMORY_LIMIT)][-1]
+    pool_pids = set(pool._processes)
+    memory_limit = pool.submit(resource.getrlimit, resource.RLIMIT_AS).result()
+    return pages, count_pdf_pages(path, limits), os.getpid(), pool_pids, memory_limit
+
+
+def _extract_parallel(path):
+    pages = list(iter_pdf_pages_parallel(path, workers=2))
+    return pages, os.getpid(), set(extraction._idle_pools[(2, 0)][-1]._processes)
+
+
+def _time_out_one_of_two_documents():
+    limits = ExtractionLimits(timeout=1)
+    with extraction._borrow_pool(1) as stuck, extraction._borrow_pool(1) as other:
+        other_future = other.submit(time.sleep, 2)
+        try:
+            extraction._result(
+                stuck.submit(time.sleep, 30),
+                stuck,
+                extraction._TimeBudget(limits.timeout),
+                limits,
+            )
+            detail = None
+        except ExtractionLimitError as e:
+            detail = e.detail
+        other_future.result()
+    return detail, stuck.retired, other.retired, len(extraction._idle_pools[(1, 0)])
+
+
+def test_parallel_extraction_runs_in_pool_under_prefork(pdf_path, prefork):
+    pages, task_pid, pool_pids = prefork.apply(_extract_parallel, (pdf_path,))
+
+    assert [index for index, _ in pages] == list(range(PAGE_COUNT))
+    assert "Page 20 says hello." in pages[20][1]
+    assert len(pool_pids) == 2
+    assert task_pid not in pool_pids
+
+
+def test_limits_are_enforced_under_prefork(pdf_path, prefork):
+    pages, page_count, task_pid, pool_pids, memory_limit = prefork.apply(
+        _extract_with_limits, (pdf_path,)
+    )
+
+    assert len(pages) == page_count == PAGE_COUNT
+    assert pool_pids and task_pid not in pool_pids
+    assert memory_limit == (MEMORY_LIMIT, MEMORY_LIMIT)
+
+
+def test_timeout_kills_only_the_documents_pool_under_prefork(prefork):
+    detail, stuck_retired, other_retired, idle = prefork.apply(
+        _time_out_one_of_two_documents
+    )
+
+    assert detail == "timeout"
+    assert stuck_retired and not other_retired
+    assert idle == 1
+
+
+def test_time_limit_is_shared_by_the_page_ranges_of_a_document():
+    budget = extraction._TimeBudget(1)
+
+    with ThreadPoolExecutor(1) as executor:
+        budget.result(executor.submit(time.sleep, 0.6))
+        with pytest.raises(TimeoutError):
+            budget.result(executor.submit(time.sleep, 0.6))
@@ -0,0 +1,32 @@
+import os
+from app import metrics
+
+
+def test_metrics_server_starts_from_an_empty_multiprocess_dir(tmp_path, monkeypatch):
+    served = []
+    monkeypatch.setattr(
+        metrics, "start_http_server", lambda port, registry: served.append(registry)
+    )
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    stale = tmp_path / "histogram_1.db"
+    own = tmp_path / f"histogram_{os.getpid()}.db"
+    stale.write_bytes(b"")
+    own.write_bytes(b"")
+
+    metrics.start_metrics_server(9100)
+
+    assert not stale.exists()
+    assert own.exists()
+    assert len(served) == 1
+
+
+def test_metrics_server_needs_a_multiprocess_dir(monkeypatch):
+    served = []
+    monkeypatch.setattr(
+        metrics, "start_http_server", lambda port, registry: served.append(registry)
+    )
+    monkeypatch.delenv("PROMETHEUS_MULTIPROC_DIR", raising=False)
+
+    metrics.start_metrics_server(9100)
+
+    assert served == []
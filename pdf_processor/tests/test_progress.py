@@ -0,0 +1,170 @@
+from types import SimpleNamespace
+import numpy as np
+import pytest
+from app.exceptions import VectorStoreError, VectorStoreUnavailableError
+from app.metrics import IngestMetrics
+from app.queue import progress as progress_module
+from app.queue.progress import PageCounter
+from app.store.spool import IngestSpool, LocalSpoolStorage
+from app.tasks import process_pdf
+
+PAGE_COUNT = 12
+
+
+class FakeProgress:
+    def __init__(self):
+        self.reports = []
+
+    def report(self, pages_done, chunks_done, force=False):
+        self.reports.append((pages_done, chunks_done))
+
+
+class FakeVectorStore:
+    def __init__(self, fail_on: int):
+        self.fail_on = fail_on
+        self.texts = []
+        self.calls = 0
+
+    def add_embeddings(self, batch, embeddings):
+        self.calls += 1
+        if self.calls == self.fail_on:
+            raise VectorStoreUnavailableError("Chroma is down")
+        self.texts.extend(batch.texts())
+
+
+class FakeEmbeddingService:
+    def embed(self, texts):
+        return np.zeros((len(texts), 4), dtype=np.float32)
+
+
+def page_marker(page: int) -> str:
+    # Letters rather than digits, which boilerplate detection ignores.
+    return "end-of-page-" + "".join(
+        chr(ord("a") + int(digit)) for digit in f"{page:03}"
+    )
+
+
+def page_text(page: int) -> str:
+    return f"Annual Report\n{'x' * 200} {page_marker(page)}\nPage {page + 1}"
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    def stream_pages(pdf_file, start=0, end=None, **kwargs):
+        for page in range(start, end or PAGE_COUNT):
+            yield page, page_text(page)
+
+    for name, value in {
+        "CHUNKER": "fixed",
+        "EMBED_BATCH_SIZE": 2,
+        "STRIP_BOILERPLATE": True,
+        "BOILERPLATE_SAMPLE_PAGES": 6,
+        "DEDUPLICATE_CHUNKS": False,
+    }.items():
+        monkeypatch.setattr(process_pdf.settings, name, value)
+    monkeypatch.setattr(process_pdf, "stream_pages", stream_pages)
+    monkeypatch.setattr(
+        process_pdf, "get_embedder", lambda: SimpleNamespace(cache_stats=lambda: None)
+    )
+    monkeypatch.setattr(
+        process_pdf, "get_embedding_service", lambda: FakeEmbeddingService()
+    )
+
+
+def test_counter_skips_the_page_being_chunked():
+    counter = PageCounter()
+    pages = counter.count(range(3))
+
+    next(pages)
+    assert counter.done == 0
+    next(pages)
+    assert counter.done == 1
+    list(pages)
+    assert counter.done == 3
+
+
+def test_progress_counts_only_stored_pages(monkeypatch, pipeline):
+    vector_store = FakeVectorStore(fail_on=3)
+    monkeypatch.setattr(process_pdf, "get_vector_store", lambda: vector_store)
+    metrics = IngestMetrics()
+    progress = FakeProgress()
+
+    with pytest.raises(VectorStoreError):
+        process_pdf.ingest_document_streaming("doc", None, metrics, progress)
+
+    # Two batches were stored before the third upsert failed.
+    assert len(progress.reports) == 2
+    pages_done = progress.reports[-1][0]
+    assert 0 < pages_done < metrics.pages
+    stored = " ".join(vector_store.texts)
+    assert "Annual Report" not in stored
+    for page in range(pages_done):
+        assert page_marker(page) in stored
+
+
+def test_progress_reaches_every_page(monkeypatch, pipeline):
+    monkeypatch.setattr(
+        process_pdf, "get_vector_store", lambda: FakeVectorStore(fail_on=0)
+    )
+    progress = FakeProgress()
+
+    process_pdf.ingest_document_streaming("doc", None, IngestMetrics(), progress)
+
+    pages = [pages_done for pages_done, _ in progress.reports]
+    assert pages == sorted(pages)
+    assert pages[-1] == PAGE_COUNT
+
+
+def test_page_range_reports_for_the_whole_document(monkeypatch, pipeline):
+    messages = []
+    monkeypatch.setattr(
+        progress_module,
+        "publish_status_to_sqs",
+        lambda message_body: messages.append(message_body),
+    )
+    monkeypatch.setattr(process_pdf.settings, "SPOOL_URI", None)
+    monkeypatch.setattr(process_pdf, "download_unless_spooled", lambda *args: None)
+    monkeypatch.setattr(process_pdf.settings, "PROGRESS_INTERVAL_MS", 60_000)
+    monkeypatch.setattr(
+        process_pdf, "get_vector_store", lambda: FakeVectorStore(fail_on=0)
+    )
+
+    result = process_pdf.process_pdf_range("doc", "key", 4, 8, PAGE_COUNT, 1000.0)
+
+    assert result["status"] == "success"
+    assert messages
+    for message in messages:
+        assert message["doc_id"] == "doc"
+        assert message["page_range"] == [4, 8]
+        assert message["pages_total"] == PAGE_COUNT
+        assert message["started_at"] == 1000.0
+    # The range's last pages are reported even within the interval.
+    assert messages[-1]["pages_done"] == 4
+
+
+def test_stored_document_is_a_replacement_unless_resumed(monkeypatch, tmp_path):
+    class StoredDocuments:
+        def has_document(self, doc_id):
+            return doc_id == "stored"
+
+    monkeypatch.setattr(process_pdf, "get_vector_store", lambda: StoredDocuments())
+    spool = IngestSpool(LocalSpoolStorage(str(tmp_path)), {})
+
+    assert process_pdf.replaces_stored_document("stored", None)
+    assert process_pdf.replaces_stored_document("stored", spool)
+    assert not process_pdf.replaces_stored_document("new", spool)
+
+    # Chunks stored by an earlier attempt are resumed from its spool.
+    spool.page_count = PAGE_COUNT
+    assert not process_pdf.replaces_stored_document("stored", spool)
+
+
+def test_clearing_a_document_spool_keeps_its_page_range_spools(monkeypatch, tmp_path):
+    monkeypatch.setattr(process_pdf.settings, "SPOOL_URI", str(tmp_path))
+    process_pdf.open_spool("doc", "key").page_count = PAGE_COUNT
+    process_pdf.open_spool("doc", "key", (4, 8)).page_count = 4
+
+    process_pdf.discard_spool(process_pdf.open_spool("doc", "key"))
+
+    assert process_pdf.open_spool("doc", "key").page_count is None
+    assert process_pdf.open_spool("doc", "key", (4, 8)).page_count == 4
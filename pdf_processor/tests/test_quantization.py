@@ -0,0 +1,26 @@
+import numpy as np
+from benchmarks.quantization import dequantize, quantize, recall_at_k
+
+
+def embeddings(count: int) -> np.ndarray:
+    return np.random.default_rng(0).normal(size=(count, 32)).astype(np.float32)
+
+
+def test_int8_round_trip_keeps_direction():
+    values = embeddings(20)
+
+    codes, scales = quantize(values, "int8")
+    restored = dequantize(codes, "int8", scales)
+
+    assert codes.dtype == np.int8
+    cosine = (restored * values).sum(axis=1) / (
+        np.linalg.norm(restored, axis=1) * np.linalg.norm(values, axis=1)
+    )
+    assert cosine.min() > 0.999
+
+
+def test_recall_is_exact_without_quantization():
+    corpus, queries = embeddings(200), embeddings(10) + 0.1
+
+    assert recall_at_k(corpus, queries, "none", k=10) == 1.0
+    assert recall_at_k(corpus, queries, "int8", k=10) >= 0.9
@@ -0,0 +1,81 @@
+import threading
+from types import SimpleNamespace
+import numpy as np
+import pytest
+from app.config import Settings
+from app.models import registry
+from app.models.microbatcher import EmbeddingMicroBatcher
+
+
+class FakeEmbedder:
+    def __init__(self):
+        self.calls = []
+
+    def embed(self, texts):
+        self.calls.append(list(texts))
+        return np.array([[len(text)] for text in texts], dtype=np.float32)
+
+
+@pytest.fixture
+def embedder(monkeypatch):
+    embedder = FakeEmbedder()
+    monkeypatch.setattr(registry, "load_embedder", lambda: embedder)
+    monkeypatch.setattr(registry, "_batcher", None)
+    return embedder
+
+
+def use_settings(monkeypatch, microbatch):
+    settings = SimpleNamespace(
+        EMBED_MICROBATCH=microbatch,
+        EMBED_MICROBATCH_SIZE=64,
+        EMBED_MICROBATCH_WAIT_MS=200,
+    )
+    monkeypatch.setattr(registry, "get_settings", lambda: settings)
+
+
+def test_microbatch_is_unset_by_default(monkeypatch):
+    monkeypatch.delenv("EMBED_MICROBATCH", raising=False)
+    assert Settings().EMBED_MICROBATCH is None
+
+    monkeypatch.setenv("EMBED_MICROBATCH", "false")
+    assert Settings().EMBED_MICROBATCH is False
+
+
+def test_unset_microbatch_only_serves_concurrent_callers(monkeypatch, embedder):
+    use_settings(monkeypatch, None)
+
+    assert registry.get_embedding_service() is embedder
+    assert isinstance(
+        registry.get_embedding_service(concurrent=True), EmbeddingMicroBatcher
+    )
+
+
+@pytest.mark.parametrize("microbatch", [True, False])
+def test_setting_overrides_the_caller(monkeypatch, embedder, microbatch):
+    use_settings(monkeypatch, microbatch)
+
+    for concurrent in (False, True):
+        service = registry.get_embedding_service(concurrent=concurrent)
+        assert isinstance(service, EmbeddingMicroBatcher) is microbatch
+
+
+def test_concurrent_requests_are_merged(monkeypatch, embedder):
+    use_settings(monkeypatch, True)
+    service = registry.get_embedding_service()
+    results = {}
+
+    def embed(name, texts):
+        results[name] = service.embed(texts)
+
+    threads = [
+        threading.Thread(target=embed, args=("a", ["x", "yy"])),
+        threading.Thread(target=embed, args=("b", ["zzz"])),
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(embedder.calls) == 1
+    assert results["a"].tolist() == [[1.0], [2.0]]
+    assert results["b"].tolist() == [[3.0]]
@@ -0,0 +1,72 @@
+import json
+import numpy as np
+import pytest
+from app.store import spool as spool_module
+from app.store.spool import IngestSpool, LocalSpoolStorage
+
+FINGERPRINT = {"key": "docs/report.pdf", "batch_size": 2}
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    # Small parts, so a few pages already span several of them.
+    monkeypatch.setattr(spool_module, "PART_BYTES", 100)
+    return LocalSpoolStorage(str(tmp_path / "spool"))
+
+
+def pages(count: int):
+    return [[index, f"Text of page {index}. " * 3] for index in range(count)]
+
+
+def test_items_are_written_while_they_are_produced(storage):
+    spool = IngestSpool(storage, FINGERPRINT)
+    teed = spool.tee("pages", iter(pages(10)))
+
+    for _ in range(5):
+        next(teed)
+
+    assert storage.read("pages-00000.jsonl") is not None
+    assert not spool.has("pages")
+    assert spool.load("pages") is None
+
+
+def test_completed_stage_is_resumed_in_order(storage):
+    assert list(IngestSpool(storage, FINGERPRINT).tee("pages", pages(10))) == pages(10)
+
+    resumed = IngestSpool(storage, FINGERPRINT)
+
+    assert resumed.has("pages")
+    assert resumed.manifest["parts"]["pages"] > 1
+    assert list(resumed.load("pages")) == pages(10)
+
+
+def test_encoded_items_are_saved(storage):
+    spool = IngestSpool(storage, FINGERPRINT)
+    batches = [np.arange(3), np.arange(2)]
+
+    assert list(spool.tee("batches", batches, encode=np.ndarray.tolist)) == batches
+    assert list(IngestSpool(storage, FINGERPRINT).load("batches")) == [
+        [0, 1, 2],
+        [0, 1],
+    ]
+
+
+def test_spool_with_other_settings_is_discarded(storage):
+    spool = IngestSpool(storage, FINGERPRINT)
+    list(spool.tee("pages", pages(2)))
+    spool.save_embeddings(0, np.ones((2, 4), dtype=np.float32))
+
+    resumed = IngestSpool(storage, {**FINGERPRINT, "batch_size": 4})
+
+    assert not resumed.has("pages")
+    assert resumed.load_embeddings(0) is None
+
+
+def test_spool_of_an_older_layout_is_discarded(storage):
+    storage.write(
+        "manifest.json",
+        json.dumps({"fingerprint": FINGERPRINT, "stages": ["pages"]}).encode(),
+    )
+    storage.write("pages.jsonl", b'[0, "Text"]\n')
+
+    assert IngestSpool(storage, FINGERPRINT).load("pages") is None
@@ -0,0 +1,144 @@
+import os
+import json
+import time
+import boto3
+import pytest
+from moto import mock_aws
+from app import celery_app
+from app.queue import sqs as sqs_module
+from app.queue.sqs import StatusPublisher, flush_status_messages
+
+# Long enough that the background thread never flushes during a test.
+NEVER = 60
+
+
+class RecordingClient:
+    """
+    Forwards to a moto SQS client, recording the size of every batch. The
+    entries listed in `fail` are reported as failed on the first call
+    instead of being sent.
+    """
+
+    def __init__(self, client, fail: dict[str, bool] | None = None):
+        self.client = client
+        self.fail = dict(fail or {})
+        self.batches = []
+
+    def send_message_batch(self, QueueUrl, Entries):
+        self.batches.append([json.loads(entry["MessageBody"]) for entry in Entries])
+        failed = [
+            {"Id": entry["Id"], "SenderFault": self.fail.pop(entry["Id"])}
+            for entry in Entries
+            if entry["Id"] in self.fail
+        ]
+        sent = [
+            entry for entry in Entries if entry["Id"] not in {f["Id"] for f in failed}
+        ]
+        if sent:
+            self.client.send_message_batch(QueueUrl=QueueUrl, Entries=sent)
+        return {"Failed": failed}
+
+
+@pytest.fixture
+def queue():
+    with mock_aws():
+        client = boto3.client("sqs", region_name="us-east-1")
+        queue_url = client.create_queue(QueueName="status")["QueueUrl"]
+        yield client, queue_url
+
+
+def received(client, queue_url) -> list[dict]:
+    messages = []
+    while True:
+        batch = client.receive_message(QueueUrl=queue_url, MaxNumberOfMessages=10).get(
+            "Messages", []
+        )
+        if not batch:
+            return messages
+        messages.extend(json.loads(message["Body"]) for message in batch)
+
+
+def publisher(queue, flush_interval=NEVER, **kwargs):
+    client, queue_url = queue
+    recording = RecordingClient(client, kwargs.pop("fail", None))
+    return StatusPublisher(
+        recording, queue_url, flush_interval=flush_interval, **kwargs
+    ), recording
+
+
+def test_full_batches_are_sent_on_publish(queue):
+    status, recording = publisher(queue, max_batch_size=3)
+
+    for index in range(7):
+        status.publish({"index": index})
+
+    assert [len(batch) for batch in recording.batches] == [3, 3]
+
+    status.flush()
+
+    assert [len(batch) for batch in recording.batches] == [3, 3, 1]
+    assert sorted(m["index"] for m in received(*queue)) == list(range(7))
+
+
+def test_batch_size_is_capped_at_the_sqs_limit(queue):
+    status, recording = publisher(queue, max_batch_size=25)
+
+    for index in range(12):
+        status.publish({"index": index})
+    status.flush()
+
+    assert [len(batch) for batch in recording.batches] == [10, 2]
+
+
+def test_partial_batch_is_sent_after_the_interval(queue):
+    status, recording = publisher(queue, flush_interval=0.05)
+
+    status.publish({"index": 0})
+    status.publish({"index": 1})
+    # Wait for the send itself, not just the call, to finish within the mock.
+    messages = []
+    deadline = time.monotonic() + 5
+    while len(messages) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+        messages.extend(received(*queue))
+
+    assert recording.batches == [[{"index": 0}, {"index": 1}]]
+    assert sorted(m["index"] for m in messages) == [0, 1]
+
+
+def test_failed_entries_are_retried(queue):
+    # Entry 1 fails transiently and is resent; SQS rejects entry 2 outright.
+    status, recording = publisher(queue, fail={"1": False, "2": True})
+
+    for index in range(4):
+        status.publish({"index": index})
+    status.flush()
+
+    assert [len(batch) for batch in recording.batches] == [4, 1]
+    assert recording.batches[1] == [{"index": 1}]
+    assert sorted(m["index"] for m in received(*queue)) == [0, 1, 3]
+
+
+def test_buffered_messages_are_flushed_on_shutdown(queue, monkeypatch):
+    status, _ = publisher(queue)
+    monkeypatch.setattr(sqs_module, "_publisher", status)
+    monkeypatch.setattr(sqs_module, "_publisher_pid", os.getpid())
+
+    status.publish({"index": 0})
+    flush_status_messages()
+    status.publish({"index": 1})
+    # A prefork pool process flushes when Celery shuts it down.
+    celery_app.flush_status(pid=os.getpid(), exitcode=0)
+
+    assert [m["index"] for m in received(*queue)] == [0, 1]
+
+
+def test_publisher_of_the_parent_is_not_flushed_in_a_child(queue, monkeypatch):
+    status, recording = publisher(queue)
+    monkeypatch.setattr(sqs_module, "_publisher", status)
+    monkeypatch.setattr(sqs_module, "_publisher_pid", os.getpid() + 1)
+
+    status.publish({"index": 0})
+    flush_status_messages()
+
+    assert recording.batches == []
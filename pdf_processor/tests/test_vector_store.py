@@ -0,0 +1,110 @@
+import httpx
+import numpy as np
+import pytest
+from chromadb.api.types import normalize_embeddings, validate_embeddings
+from app.document_processing.chunk_batch import ChunkBatch
+from app.exceptions import VectorStoreError, VectorStoreUnavailableError
+from app.store.vector_store import VectorStore
+
+
+class FakeCollection:
+    """
+    Keeps upserted records in memory and validates embeddings the way the
+    Chroma client does before sending them.
+    """
+
+    metadata = None
+
+    def __init__(self):
+        self.records = {}
+
+    def upsert(self, embeddings, documents, metadatas, ids):
+        embeddings = validate_embeddings(normalize_embeddings(embeddings))
+        for vector_id, embedding, document, metadata in zip(
+            ids, embeddings, documents, metadatas
+        ):
+            self.records[vector_id] = (embedding, document, metadata)
+
+    def get(self, where, limit, include, offset=0):
+        matching = [
+            (vector_id, record)
+            for vector_id, record in self.records.items()
+            if all(record[2].get(key) == value for key, value in where.items())
+        ][offset : offset + limit]
+        return {
+            "ids": [vector_id for vector_id, _ in matching],
+            "embeddings": [record[0] for _, record in matching],
+            "metadatas": [record[2] for _, record in matching],
+        }
+
+
+class FakeClient:
+    def __init__(self):
+        self.collection = FakeCollection()
+
+    def get_or_create_collection(self, name, metadata=None):
+        return self.collection
+
+
+def make_store(**kwargs) -> VectorStore:
+    return VectorStore(
+        "test", host="", port=0, auth_credentials="", client=FakeClient(), **kwargs
+    )
+
+
+def make_chunks(count: int) -> list[dict]:
+    return [
+        {"text": f"chunk {index}", "doc_id": "doc", "chunk_id": index}
+        for index in range(count)
+    ]
+
+
+def test_embeddings_are_stored_as_float32():
+    store = make_store(batch_size=2)
+    embeddings = np.random.default_rng(0).normal(size=(5, 4)).astype(np.float32)
+
+    store.add_embeddings(make_chunks(5), embeddings)
+
+    stored = store.get_document_chunks("doc")
+    assert sorted(stored) == [f"doc_{index}" for index in range(5)]
+    for index in range(5):
+        chunk = stored[f"doc_{index}"]
+        assert chunk.embedding.dtype == np.float32
+        np.testing.assert_array_equal(chunk.embedding, embeddings[index])
+        assert set(chunk.metadata) == {"doc_id", "chunk_id", "chunk_hash"}
+
+
+def test_stored_chunk_matches_only_unchanged_text():
+    store = make_store()
+    chunks = make_chunks(2)
+    store.add_embeddings(ChunkBatch.from_chunks(chunks), np.ones((2, 4), np.float32))
+
+    stored = store.get_document_chunks("doc")
+
+    assert stored["doc_0"].matches(chunks[0])
+    assert not stored["doc_0"].matches({**chunks[0], "text": "chunk zero"})
+
+
+def test_has_document_looks_for_any_stored_chunk():
+    store = make_store()
+    store.add_embeddings(make_chunks(1), np.ones((1, 4), np.float32))
+
+    assert store.has_document("doc")
+    assert not store.has_document("other")
+
+
+@pytest.mark.parametrize(
+    "error, unavailable",
+    [(httpx.ConnectError("refused"), True), (ValueError("bad where"), False)],
+)
+def test_only_connection_failures_are_unavailable(monkeypatch, error, unavailable):
+    store = make_store()
+
+    def get(**kwargs):
+        raise error
+
+    monkeypatch.setattr(store.collection, "get", get)
+
+    with pytest.raises(VectorStoreError) as raised:
+        store.has_document("doc")
+    assert isinstance(raised.value, VectorStoreUnavailableError) == unavailable
@@ -46,7 +46,7 @@ async def generate_augmented_response(
         answar = {
             "answer": response.candidates[0].content.parts[0].text,
             "citations": [
-                {"text": doc, "source": meta.get("doc_id")}
+                {"text": doc, "source": meta.get("doc_id"), "page": meta.get("page")}
                 for doc, meta in zip(results["documents"][0], results["metadatas"][0])
             ],
         }
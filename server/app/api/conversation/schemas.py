@@ -16,6 +16,7 @@ class MessagePayload(BaseModel):
 class Citation(BaseModel):
     text: str
     source: str
+    page: Optional[int] = None
 
 
 class RAGResponse(BaseModel):
@@ -12,11 +12,15 @@ from .models import TempDocument, Document
 logger = logging.getLogger(name=__name__)
 
 
-async def createTempDocs(key: str, title: str, db: AsyncSession) -> TempDocument:
+async def createTempDocs(
+    key: str, title: str, db: AsyncSession, id: Optional[UUID] = None
+) -> TempDocument:
     """Create a temporary document entry in the database."""
 
     try:
         data = TempDocument(key=key, title=title)
+        if id is not None:
+            data.id = id
         db.add(data)
         await db.commit()
         await db.refresh(data)
@@ -30,12 +34,18 @@ async def createTempDocs(key: str, title: str, db: AsyncSession) -> TempDocument
 
 
 async def createDocs(
-    key: str, user: UserAuthOut, title: str, db: AsyncSession
+    key: str,
+    user: UserAuthOut,
+    title: str,
+    db: AsyncSession,
+    id: Optional[UUID] = None,
 ) -> Document:
     """Create a temporary document entry in the database."""
 
     try:
         data = Document(key=key, title=title, owner_id=user.user_id)
+        if id is not None:
+            data.id = id
         db.add(data)
         await db.commit()
 
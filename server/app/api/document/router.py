@@ -15,7 +15,11 @@ from app.core.dependency import (
 )
 from app.core.schemas import UserAuthOut
 from app.core.memory_db import SQLiteKVStore, get_memory_db
-from .services import create_upload_session, create_download_url
+from .services import (
+    create_upload_session,
+    create_replace_session,
+    create_download_url,
+)
 from .schemas import UploadRequest
 
 
@@ -46,6 +50,21 @@ async def doc_upload_session(
     return upload_session
 
 
+@router.post("/replace/{doc_id}")
+async def doc_replace_session(
+    doc_id: str,
+    user: UserAuthOut = Depends(get_id_from_access_token),
+    db: AsyncSession = Depends(get_db),
+    memory_db: SQLiteKVStore = Depends(get_memory_db),
+):
+    upload_session = await create_replace_session(doc_id=UUID(doc_id), user=user, db=db)
+    # Report the document as processing again instead of the previous
+    # version's final status.
+    memory_db.delete(doc_id)
+
+    return upload_session
+
+
 @router.get("/status/{doc_id}")
 async def get_file_status(
     doc_id: str,
@@ -55,7 +74,18 @@ async def get_file_status(
     status = memory_db.get(doc_id)
 
     if not status:
-        return {"id": doc_id, "status": "processing", "desc": "Going Multidimential"}
+        return {
+            "id": doc_id,
+            "status": "processing",
+            "desc": "Going Multidimential",
+            "percent": 0,
+            "eta": None,
+        }
+
+    progress = status.pop("progress")
+    status["percent"] = round(progress * 100) if progress is not None else 0
+    if status["status"] == "processing" and not status["desc"]:
+        status["desc"] = f"Processed {status['percent']}% of the document"
 
     return status
 
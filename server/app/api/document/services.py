@@ -24,15 +24,18 @@ async def create_upload_session(
     temp = False if user else True
     temp_session_token: Optional[str] = None
 
-    unique_id = str(uuid.uuid4()) + "-" + title.strip().replace(" ", "_").lower()
+    # The key starts with the document id, so the S3 trigger can read the id
+    # from the key instead of fetching the object's metadata.
+    doc_id = uuid.uuid4()
+    unique_id = str(doc_id) + "-" + title.strip().replace(" ", "_").lower()
     key = f"temp/{unique_id}" if temp else f"docs/{unique_id}"
     logger.error(f"{key=}")
 
     if user:
-        docs = await createDocs(key=key, user=user, title=title, db=db)
+        docs = await createDocs(key=key, user=user, title=title, db=db, id=doc_id)
         # upload_session.doc_id = str(docs.id)
     else:
-        docs = await createTempDocs(key=key, title=title, db=db)
+        docs = await createTempDocs(key=key, title=title, db=db, id=doc_id)
 
         # upload_session.temp_id = str(docs.id)
         temp_session_token = docs.temp_token
@@ -45,6 +48,24 @@ async def create_upload_session(
     return upload_session, temp_session_token
 
 
+async def create_replace_session(
+    doc_id: uuid.UUID, user: UserAuthOut, db: AsyncSession
+) -> UploadSession:
+    """
+    Let the owner upload a new version of a document over its object. The
+    worker finds the document already stored and re-ingests it, so only
+    chunks that changed are embedded again.
+    """
+    doc = await get_document(db=db, document_id=doc_id, user=user)
+
+    if not doc:
+        raise NotFoundError(message=f"No file found with id: {doc_id}")
+
+    upload_session = create_presigned_upload_url(key=doc.key, doc_id=str(doc.id))
+    upload_session.doc_id = str(doc.id)
+    return upload_session
+
+
 async def create_download_url(doc_id: uuid.UUID, user: UserAuthOut, db: AsyncSession):
     doc = await get_document(db=db, document_id=doc_id, user=user)
 
@@ -49,6 +49,12 @@ class Settings(BaseSettings):
     CHROMA_AUTH_SECRET: str = ""
     CHROMA_TOKEN_HEADER: str = "Authorization"
 
+    # Embedding model
+    EMBEDDING_MODEL: str = "all-MiniLM-L6-v2"
+    EMBEDDING_BACKEND: str = "torch"
+    MODEL_CACHE_DIR: str = "model_cache"
+    EMBEDDING_TOLERANCE: float = 0.01
+
     # Queue (SQS)
     SQS_QUEUE: str = ""
     SQS_QUEUE_NAME: str = ""
@@ -2,15 +2,23 @@ import asyncio
 import logging
 import numpy
 from fastapi import Request
-from sentence_transformers import SentenceTransformer
 from app.core.exceptions import MessageProcessingError
+from app.core.model_backends import load_model
 
 logger = logging.getLogger(__name__)
 
 
 class Embedder:
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
-        self.model = SentenceTransformer(model_name)
+    def __init__(
+        self,
+        model_name: str = "all-MiniLM-L6-v2",
+        backend: str = "torch",
+        model_cache_dir: str = "model_cache",
+        tolerance: float = 0.01,
+    ):
+        self.model = load_model(
+            model_name, backend=backend, cache_dir=model_cache_dir, tolerance=tolerance
+        )
 
     async def embed(self, texts: list[str]) -> numpy.ndarray:
         """
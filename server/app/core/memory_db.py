@@ -25,50 +25,97 @@ class SQLiteKVStore:
         CREATE TABLE IF NOT EXISTS kv_store (
             id TEXT PRIMARY KEY,
             status VARCHAR(10),
-            desc TEXT NULL
+            desc TEXT NULL,
+            progress REAL NULL,
+            eta REAL NULL
+        );
+        """
+        self.conn.execute(query)
+        # Pages done per page range of a split document, added up into the
+        # document's progress.
+        query = """
+        CREATE TABLE IF NOT EXISTS page_ranges (
+            id TEXT,
+            start INTEGER,
+            pages_done INTEGER,
+            PRIMARY KEY (id, start)
         );
         """
         self.conn.execute(query)
         self.conn.commit()
 
+    def add_range_progress(self, id: str, start: int, pages_done: int) -> int:
+        """
+        Record the pages done in the page range starting at `start` and return
+        the pages done over all ranges of the document. Ranges only move
+        forward, since their messages can arrive out of order.
+        """
+        query = """
+        INSERT INTO page_ranges (id, start, pages_done)
+        VALUES (?, ?, ?)
+        ON CONFLICT(id, start) DO UPDATE SET
+            pages_done=MAX(page_ranges.pages_done, excluded.pages_done);
+        """
+        self.conn.execute(query, (id, start, pages_done))
+        self.conn.commit()
+
+        query = "SELECT SUM(pages_done) FROM page_ranges WHERE id = ?"
+        return self.conn.execute(query, (id,)).fetchone()[0]
+
     def set(
-        self, id: str, status: Literal["success", "failed"], desc: Optional[str]
+        self,
+        id: str,
+        status: Literal["processing", "success", "failed"],
+        desc: Optional[str],
+        progress: Optional[float] = None,
+        eta: Optional[float] = None,
     ) -> None:
+        # Progress messages can arrive after the final status (SQS does not
+        # keep order), so they never replace a success or failure.
         query = """
-        INSERT INTO kv_store (id, status, desc)
-        VALUES (?, ?, ?)
+        INSERT INTO kv_store (id, status, desc, progress, eta)
+        VALUES (?, ?, ?, ?, ?)
         ON CONFLICT(id) DO UPDATE SET
             status=excluded.status,
-            desc=excluded.desc;
+            desc=excluded.desc,
+            progress=excluded.progress,
+            eta=excluded.eta
+        WHERE excluded.status != 'processing'
+            OR kv_store.status NOT IN ('success', 'failed');
         """
-        self.conn.execute(query, (id, status, desc))
+        self.conn.execute(query, (id, status, desc, progress, eta))
         self.conn.commit()
 
+    @staticmethod
+    def _row_to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            "id": row["id"],
+            "status": row["status"],
+            "desc": row["desc"],
+            "progress": row["progress"],
+            "eta": row["eta"],
+        }
+
     def get(self, id: str) -> Optional[Dict[str, Any]]:
         query = "SELECT * FROM kv_store WHERE id = ?"
         cur = self.conn.execute(query, (id,))
         row = cur.fetchone()
         if row:
-            return {
-                "id": row["id"],
-                "status": row["status"],
-                "desc": row["desc"],
-            }
+            return self._row_to_dict(row)
         return None
 
     def delete(self, id: str) -> None:
         query = "DELETE FROM kv_store WHERE id = ?"
         self.conn.execute(query, (id,))
+        query = "DELETE FROM page_ranges WHERE id = ?"
+        self.conn.execute(query, (id,))
         self.conn.commit()
 
     def all(self) -> list[Dict[str, Any]]:
         query = "SELECT * FROM kv_store"
         cur = self.conn.execute(query)
         rows = cur.fetchall()
-        return [
-            {"id": row["id"], "status": row["status"], "desc": row["desc"]}
-            for row in rows
-        ]
+        return [self._row_to_dict(row) for row in rows]
 
 
 # Dependency to inject SQLiteKVStore
@@ -0,0 +1,92 @@
+import json
+import shutil
+import logging
+from pathlib import Path
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+INT8_CONFIG = "avx2"
+INT8_FILE = f"onnx/model_qint8_{INT8_CONFIG}.onnx"
+VALIDATED_MARKER = "validated.json"
+
+# Probe texts for comparing an exported model against the PyTorch reference.
+VALIDATION_TEXTS = [
+    "The tenant shall pay the rent on the first day of each month.",
+    "Quarterly revenue grew by 12% compared to the previous year.",
+    "Figure 3 shows the distribution of response times under load.",
+    "All rights reserved. No part of this publication may be reproduced.",
+    "Remove the cover and disconnect the power supply before servicing.",
+]
+
+logger = logging.getLogger(__name__)
+
+
+def _export_dir(model_name: str, backend: str, cache_dir: str) -> Path:
+    return Path(cache_dir) / f"{model_name.replace('/', '__')}-{backend}"
+
+
+def _load_exported(path: Path, backend: str) -> SentenceTransformer:
+    model_kwargs = {"file_name": INT8_FILE} if backend == "onnx-int8" else None
+    return SentenceTransformer(str(path), backend="onnx", model_kwargs=model_kwargs)
+
+
+def _export(model_name: str, backend: str, path: Path, cache_dir: str) -> None:
+    logger.info(f"Exporting {model_name} for the {backend} backend to {path}")
+    model = SentenceTransformer(model_name, backend="onnx", cache_folder=cache_dir)
+    model.save_pretrained(str(path))
+
+    if backend == "onnx-int8":
+        from sentence_transformers import export_dynamic_quantized_onnx_model
+
+        export_dynamic_quantized_onnx_model(model, INT8_CONFIG, str(path))
+
+
+def _min_cosine(model_name: str, model: SentenceTransformer, cache_dir: str) -> float:
+    reference = SentenceTransformer(model_name, backend="torch", cache_folder=cache_dir)
+    expected = reference.encode(VALIDATION_TEXTS, normalize_embeddings=True)
+    actual = model.encode(VALIDATION_TEXTS, normalize_embeddings=True)
+    return float(np.min(np.sum(expected * actual, axis=1)))
+
+
+def load_model(
+    model_name: str, backend: str, cache_dir: str, tolerance: float
+) -> SentenceTransformer:
+    """
+    Load `model_name` on the requested inference backend.
+
+    Downloaded weights are kept in `cache_dir`, so a pre-filled cache is
+    never fetched again. ONNX exports are written to `cache_dir` once and
+    reused afterwards. A new export is only kept if its embeddings stay
+    within `tolerance` cosine distance of the PyTorch model on a set of
+    probe texts; otherwise the PyTorch model is used.
+    """
+    if backend == "torch":
+        return SentenceTransformer(model_name, cache_folder=cache_dir)
+
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend: {backend}")
+
+    path = _export_dir(model_name, backend, cache_dir)
+    if (path / VALIDATED_MARKER).exists():
+        return _load_exported(path, backend)
+
+    _export(model_name, backend, path, cache_dir)
+    model = _load_exported(path, backend)
+
+    similarity = _min_cosine(model_name, model, cache_dir)
+    if similarity < 1 - tolerance:
+        logger.error(
+            f"{backend} export of {model_name} deviates from the reference model "
+            f"(min cosine {similarity:.4f}); falling back to torch"
+        )
+        shutil.rmtree(path, ignore_errors=True)
+        return SentenceTransformer(model_name, cache_folder=cache_dir)
+
+    with open(path / VALIDATED_MARKER, "w") as f:
+        json.dump({"backend": backend, "min_cosine": similarity}, f)
+
+    logger.info(
+        f"Validated {backend} export of {model_name} (min cosine {similarity:.4f})"
+    )
+    return model
@@ -20,7 +20,12 @@ async def lifespan(app: FastAPI):
     engine = create_async_engine()
     sessionmaker = create_async_sessionmaker(engine)
     memory_db = SQLiteKVStore(memory=True)  # create once
-    embedder = Embedder()
+    embedder = Embedder(
+        model_name=settings.EMBEDDING_MODEL,
+        backend=settings.EMBEDDING_BACKEND,
+        model_cache_dir=settings.MODEL_CACHE_DIR,
+        tolerance=settings.EMBEDDING_TOLERANCE,
+    )
     model_lg = LLMManager(
         api_key=settings.API_KEY,
         model_name=settings.MODEL_LG,
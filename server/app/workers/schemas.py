@@ -1,13 +1,36 @@
-from typing import Optional, Literal
+from typing import Any, Optional, Literal
 from pydantic import BaseModel, Field, model_validator
 
 
 class TaskUpdate(BaseModel):
     doc_id: str = Field(..., description="Unique document identifier")
-    status: Literal["success", "failed"] = Field(..., description="Processing status")
+    status: Literal["processing", "success", "failed"] = Field(
+        ..., description="Processing status"
+    )
     reason: Optional[str] = Field(
         None, description="Failure reason if status is failed"
     )
+    progress: Optional[float] = Field(
+        None, ge=0, le=1, description="Fraction of the document processed so far"
+    )
+    eta_seconds: Optional[float] = Field(
+        None, ge=0, description="Estimated seconds until processing finishes"
+    )
+    pages_done: Optional[int] = Field(
+        None, ge=0, description="Pages processed so far, within page_range if set"
+    )
+    pages_total: Optional[int] = Field(
+        None, ge=0, description="Page count of the whole document"
+    )
+    page_range: Optional[tuple[int, int]] = Field(
+        None, description="Pages [start, end) reported on, for a split document"
+    )
+    started_at: Optional[float] = Field(
+        None, description="Unix time the processing of a split document started"
+    )
+    metrics: Optional[dict[str, Any]] = Field(
+        None, description="Per-stage ingestion timings and document sizes"
+    )
 
     @model_validator(mode="after")
     def validate_reason(cls, values):
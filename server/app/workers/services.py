@@ -1,6 +1,7 @@
+import time
 import logging
 import json
-from typing import Any
+from typing import Any, Optional
 from app.core.memory_db import SQLiteKVStore
 from app.core.exceptions import FileStateUpdateException
 
@@ -9,12 +10,41 @@ from .schemas import TaskUpdate
 logger = logging.getLogger(__name__)
 
 
+def combine_range_progress(
+    data: TaskUpdate, memory_db: SQLiteKVStore
+) -> tuple[float, Optional[float]]:
+    """
+    The progress and ETA of a split document from the pages done in all of
+    its page ranges, counting from when the document was started.
+    """
+    pages_done = memory_db.add_range_progress(
+        data.doc_id, data.page_range[0], data.pages_done or 0
+    )
+    progress = min(pages_done / data.pages_total, 0.99)
+    if not progress or data.started_at is None:
+        return progress, None
+
+    elapsed = max(0.0, time.time() - data.started_at)
+    return progress, round(elapsed * (1 - progress) / progress, 1)
+
+
 async def update_file_state(payload: str, memory_db: SQLiteKVStore) -> dict[str, Any]:
     try:
         logger.critical(f"{payload}")
         data = json.loads(payload)
         data: TaskUpdate = TaskUpdate.model_validate(data)
-        memory_db.set(id=data.doc_id, status=data.status, desc=data.reason)
+        progress, eta = data.progress, data.eta_seconds
+        if data.page_range is not None and data.pages_total:
+            progress, eta = combine_range_progress(data, memory_db)
+        if data.status == "success":
+            progress, eta = 1.0, 0.0
+        memory_db.set(
+            id=data.doc_id,
+            status=data.status,
+            desc=data.reason,
+            progress=progress,
+            eta=eta,
+        )
 
         return {"status": "ok"}
 